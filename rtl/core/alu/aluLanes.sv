@@ -0,0 +1,57 @@
+// alu replicated LANES times on one clock, so a testbench can stream many
+// operations per cycle. Every lane field is padded to 32 bits: lane i of a
+// bus is [32*i +: width].
+module aluLanes #(
+    parameter LANES = 32
+) (
+    input   wire logic                      core_clock_i,
+    input   wire logic [32*LANES-1:0]       flush_i,
+    input   wire logic [32*LANES-1:0]       a,
+    input   wire logic [32*LANES-1:0]       b,
+    input   wire logic [32*LANES-1:0]       opc,
+    input   wire logic [32*LANES-1:0]       dest_i,
+    input   wire logic [32*LANES-1:0]       bank_i,
+    input   wire logic [32*LANES-1:0]       valid_i,
+
+    output  wire logic [32*LANES-1:0]       wb_reg_wen_o,
+    output  wire logic [32*LANES-1:0]       wb_result_o,
+    output  wire logic [32*LANES-1:0]       wb_dest_o,
+    output  wire logic [32*LANES-1:0]       wb_bank_o,
+    output  wire logic [32*LANES-1:0]       wb_valid_o,
+    output  wire logic [32*LANES-1:0]       wb_branch_exec_o,
+    output  wire logic [32*LANES-1:0]       wb_branch_taken_o
+);
+    genvar i;
+
+    generate
+        for (i = 0; i < LANES; i++) begin
+            wire reg_wen_l; wire bank_l; wire valid_l; wire exec_l; wire taken_l;
+            wire [4:0] dest_l;
+            alu lane (
+                .core_clock_i(core_clock_i),
+                .flush_i(flush_i[32*i]),
+                .a(a[32*i +: 32]),
+                .b(b[32*i +: 32]),
+                .opc(opc[32*i +: 7]),
+                .dest_i(dest_i[32*i +: 5]),
+                .bank_i(bank_i[32*i]),
+                .valid_i(valid_i[32*i]),
+                .wb_reg_wen_o(reg_wen_l),
+                .wb_result_o(wb_result_o[32*i +: 32]),
+                .wb_dest_o(dest_l),
+                .wb_bank_o(bank_l),
+                .wb_valid_o(valid_l),
+                .wb_branch_exec_o(exec_l),
+                .wb_branch_taken_o(taken_l)
+            );
+
+            assign wb_reg_wen_o[32*i +: 32] = {31'h0, reg_wen_l};
+            assign wb_dest_o[32*i +: 32] = {27'h0, dest_l};
+            assign wb_bank_o[32*i +: 32] = {31'h0, bank_l};
+            assign wb_valid_o[32*i +: 32] = {31'h0, valid_l};
+            assign wb_branch_exec_o[32*i +: 32] = {31'h0, exec_l};
+            assign wb_branch_taken_o[32*i +: 32] = {31'h0, taken_l};
+        end
+    endgenerate
+
+endmodule
@@ -0,0 +1,50 @@
+// texCoordOps -> texToInteger -> texAgen, as chained in cache.sv but
+// without its pipeline registers, replicated LANES times so a testbench
+// can evaluate many coordinates per step. Every lane field is padded to
+// 32 bits: lane i of a bus is [32*i +: width].
+module texAddrPath #(
+    parameter LANES = 32
+) (
+    input   wire logic [32*LANES-1:0]       texture_wrapS_mode_i,
+    input   wire logic [32*LANES-1:0]       texture_wrapT_mode_i,
+    input   wire logic [32*LANES-1:0]       texture_min_s_clamp_i,
+    input   wire logic [32*LANES-1:0]       texture_max_s_clamp_i,
+    input   wire logic [32*LANES-1:0]       texture_min_t_clamp_i,
+    input   wire logic [32*LANES-1:0]       texture_max_t_clamp_i,
+    input   wire logic [32*LANES-1:0]       texture_s_i,
+    input   wire logic [32*LANES-1:0]       texture_t_i,
+    input   wire logic [32*LANES-1:0]       tx_width,
+    input   wire logic [32*LANES-1:0]       tx_height,
+
+    output  wire logic [32*LANES-1:0]       s,
+    output  wire logic [32*LANES-1:0]       t,
+    output  wire logic [32*LANES-1:0]       txWidth_o,
+    output  wire logic [32*LANES-1:0]       txHeight_o,
+    output  wire logic [32*LANES-1:0]       tx_out
+);
+    genvar i;
+
+    generate
+        for (i = 0; i < LANES; i++) begin
+            wire [14:0] s_l; wire [14:0] t_l;
+            wire [10:0] x_l; wire [10:0] y_l;
+            wire [21:0] offset_l;
+            texCoordOps coordinates (texture_wrapS_mode_i[32*i +: 2],
+            texture_wrapT_mode_i[32*i +: 2],
+            texture_min_s_clamp_i[32*i +: 23],
+            texture_max_s_clamp_i[32*i +: 23],
+            texture_min_t_clamp_i[32*i +: 23],
+            texture_max_t_clamp_i[32*i +: 23],
+            texture_s_i[32*i +: 24], texture_t_i[32*i +: 24], s_l, t_l);
+            texToInteger toInt (s_l, t_l, tx_width[32*i +: 11], tx_height[32*i +: 11], x_l, y_l);
+            texAgen agen (x_l, y_l, tx_height[32*i +: 11], offset_l);
+
+            assign s[32*i +: 32] = {17'h0, s_l};
+            assign t[32*i +: 32] = {17'h0, t_l};
+            assign txWidth_o[32*i +: 32] = {21'h0, x_l};
+            assign txHeight_o[32*i +: 32] = {21'h0, y_l};
+            assign tx_out[32*i +: 32] = {10'h0, offset_l};
+        end
+    endgenerate
+
+endmodule
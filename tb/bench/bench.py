@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from datetime import datetime
+
+
+TB_DIR = Path(__file__).parent.parent
+RTL_DIR = TB_DIR.parent / 'rtl'
+TEST_DIR = TB_DIR / 'test'
+BENCH_BUILD_DIR = TB_DIR / 'sim_build' / 'bench'
+HISTORY = Path(__file__).parent / 'history.json'
+
+# One entry per benchmarked module: the cocotb test timed, the knobs that
+# fix its size and the transactions it performs with them. Every clock in
+# the testbenches is 10 ns. sfu, cache and icache_controller are left out
+# until their tests pass (they are expect_fail, which results.xml reports
+# as passed).
+SUITE = {
+    'fpu':               dict(testcase='test_fpu_operations', transactions=1650),
+    'clipper':           dict(testcase='test_clipper', transactions=1000),
+    'intersection':      dict(testcase='test_intersection', transactions=1000),
+    'z_buffer':          dict(testcase='test_new_z_buffer', transactions=1000, env={'TB_COVERAGE_PATIENCE': '0'}),
+    'genpix':            dict(testcase='test_genpix', transactions=20),
+    'alu':               dict(testcase='test_alu_stream', transactions=20000, env={'TB_ALU_VECTORS': '20000'}),
+    'aluLanes':          dict(testcase='test_alu_lanes_stream', transactions=1 << 20,
+                              env={'TB_ALU_VECTORS': str(1 << 20)}),
+    'control_unit':      dict(testcase='test_control_unit_lockstep', transactions=500,
+                              env={'TB_PROGRAM_SIZE': '500'}),
+    'texAddrPath':       dict(testcase='test_texaddr_sweep', transactions=1 << 16,
+                              env={'TB_TEXADDR_VECTORS': str(1 << 16)}),
+}
+CLOCK_NS = 10
+
+# Regression direction per metric: +1 higher is better, -1 lower is better
+METRICS = {
+    'build_seconds': -1,
+    'cycles_per_second': +1,
+    'transactions_per_second': +1,
+    'peak_rss_mb': -1,
+}
+
+
+def run_phase(name:str, phase:str, seed:int):
+    """ Builds ('build') or runs ('test') one suite entry through
+    single_test() in sim_build/bench/<name>. Runs in a child process so
+    the parent can read its peak RSS. """
+
+    sys.path.insert(0, str(TB_DIR))
+    from single_test import single_test
+
+    entry = SUITE[name]
+    module_path = next(RTL_DIR.rglob(f'{name}.sv'))
+    testbench = next(TEST_DIR.rglob(f'{name}_tb.py'))
+    build_dir = BENCH_BUILD_DIR / name
+    if phase == 'build' and build_dir.exists():
+        shutil.rmtree(build_dir)
+    build_dir.mkdir(parents=True, exist_ok=True)
+    os.environ['TB_SEED'] = str(seed)
+    os.environ.update(entry.get('env', {}))
+    single_test(
+        test_id=1,
+        dependencies=[str(module_path.parent.relative_to(RTL_DIR))],
+        top_module=name,
+        test_module=testbench.stem,
+        module_params={},
+        module_path=module_path,
+        component_path=module_path.parent,
+        sim_build_dir=build_dir,
+        test_files_dir=testbench.parent,
+        seed=seed,
+        skip_build=phase == 'test',
+        skip_test=phase == 'build',
+        testcase=entry['testcase'],
+    )
+
+
+def _child(name:str, phase:str, seed:int) -> tuple:
+    """ run_phase() in a child process: (wall seconds, peak RSS MB of it
+    and the simulator it waited for). """
+
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'bench.bench', '--phase', phase, '--seed', str(seed), name],
+                            cwd=TB_DIR)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise RuntimeError(f'{name}: {phase} exited with {proc.returncode}')
+    return time.perf_counter() - start, usage.ru_maxrss / 1024
+
+
+def measure(name:str, seed:int) -> dict:
+    """ Build time, simulated cycles/s, transactions/s and peak simulator
+    RSS of one suite entry. Rates use the test's own wall time from
+    results.xml, so simulator start-up only counts in test_seconds. """
+
+    build_dir = BENCH_BUILD_DIR / name
+    _child(name, 'build', seed)
+    build_seconds = json.loads((build_dir / 'timing.json').read_text())['build_seconds']
+    test_seconds, peak_rss = _child(name, 'test', seed)
+
+    cases = ET.parse(build_dir / 'results.xml').getroot().iter('testcase')
+    case = next(c for c in cases if c.get('name') == SUITE[name]['testcase'])
+    sim_ns, real = float(case.get('sim_time_ns', 0)), float(case.get('time', 0)) or test_seconds
+    cycles = sim_ns / CLOCK_NS
+    return {
+        'passed': case.find('failure') is None and case.find('error') is None,
+        'build_seconds': build_seconds,
+        'test_seconds': test_seconds,
+        'cycles': cycles,
+        'cycles_per_second': cycles / real,
+        'transactions': SUITE[name]['transactions'],
+        'transactions_per_second': SUITE[name]['transactions'] / real,
+        'peak_rss_mb': peak_rss,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=TB_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=HISTORY) -> list:
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else []
+
+
+def regressions(run:dict, history:list, window:int=5, tolerance:float=0.1) -> list:
+    """ Metrics of `run` worse than the median of the last `window` runs
+    of the same module on the same host by more than `tolerance`.
+
+    :return: (list) (module, metric, value, baseline, relative change) rows """
+
+    found = []
+    for name, result in run['results'].items():
+        previous = [r['results'][name] for r in history
+                    if r['host'] == run['host'] and name in r['results'] and r['results'][name].get('passed')]
+        previous = previous[-window:]
+        if not previous:
+            continue
+        for metric, direction in METRICS.items():
+            baseline = statistics.median(p[metric] for p in previous)
+            if not baseline:
+                continue
+            change = (result[metric] - baseline) / baseline
+            if -direction * change > tolerance:
+                found.append((name, metric, result[metric], baseline, change))
+    return found
+
+
+def format_results(run:dict) -> str:
+    lines = [f"{'module':<18} {'build s':>8} {'cycles/s':>10} {'trans/s':>10} {'RSS MB':>8}  status"]
+    for name, r in run['results'].items():
+        if 'error' in r:
+            lines.append(f"{name:<18} {'error: ' + r['error']}")
+            continue
+        lines.append(f"{name:<18} {r['build_seconds']:8.1f} {r['cycles_per_second']:10.0f} "
+                     f"{r['transactions_per_second']:10.1f} {r['peak_rss_mb']:8.1f}  "
+                     f"{'pass' if r['passed'] else 'FAIL'}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulation throughput benchmarks with regression tracking')
+    parser.add_argument('modules', nargs='*', default=list(SUITE), help=f'Suite entries (default all: {list(SUITE)})')
+    parser.add_argument('--seed', type=int, default=1, help='TB_SEED and cocotb seed of every run')
+    parser.add_argument('--history', type=str, default=str(HISTORY), help='JSON history the run is appended to')
+    parser.add_argument('--window', type=int, default=5, help='Previous runs the regression baseline spans')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Relative change flagged as a regression')
+    parser.add_argument('--no-record', action='store_true', help='Compare against the history without appending')
+    parser.add_argument('--phase', choices=['build', 'test'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        run_phase(args.modules[0], args.phase, args.seed)
+        return
+
+    run = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'git': git_revision(),
+           'host': platform.node(), 'seed': args.seed, 'results': {}}
+    for name in args.modules:
+        if name not in SUITE:
+            raise ValueError(f"Unknown module '{name}', expected one of {list(SUITE)}")
+        try:
+            run['results'][name] = measure(name, args.seed)
+        except (RuntimeError, OSError, StopIteration, ET.ParseError) as error:
+            run['results'][name] = {'passed': False, 'error': str(error) or type(error).__name__}
+    print(format_results(run))
+
+    # Failed or errored entries are neither compared nor recorded
+    history = load_history(args.history)
+    measured = {**run, 'results': {k: v for k, v in run['results'].items() if v['passed']}}
+    found = regressions(measured, history, args.window, args.tolerance)
+    for name, metric, value, baseline, change in found:
+        print(f'REGRESSION {name} {metric}: {value:.4g} vs median {baseline:.4g} of the last {args.window} ({change:+.1%})')
+    skipped = sorted(set(run['results']) - set(measured['results']))
+    if not args.no_record and measured['results']:
+        Path(args.history).write_text(json.dumps(history + [measured], indent=2))
+        print(f'Appended to {args.history} ({len(history) + 1} runs)'
+              + (f", not recording failed {', '.join(skipped)}" if skipped else ''))
+    sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+
+class CoverPoint:
+    """ One covered quantity and its bins.
+
+    :param name: (str) Cover point name
+    :param bins: An int n for the values 0..n-1 (enums, counts, opcodes
+            after `values` mapping), or a sequence of ascending edges for
+            the ranges [edges[i], edges[i + 1]); values in no bin are ignored
+    :param labels: (Optional) One label per bin, for reports
+    :param values: (Optional) Sampled values of an int-binned point, e.g.
+            sparse opcodes, mapped to bins 0..len(values)-1 """
+
+    def __init__(self, name:str, bins, labels=None, values=None):
+        self.name = name
+        self.edges = None
+        self.values = None
+        if values is not None:
+            self.values = np.asarray(values, dtype=np.int64)
+            self.size = len(self.values)
+        elif np.ndim(bins) == 0:
+            self.size = int(bins)
+        else:
+            self.edges = np.asarray(bins, dtype=float)
+            self.size = len(self.edges) - 1
+        if labels is None:
+            if self.values is not None:
+                labels = [str(v) for v in self.values]
+            elif self.edges is not None:
+                labels = [f'[{lo:g}, {hi:g})' for lo, hi in zip(self.edges[:-1], self.edges[1:])]
+            else:
+                labels = [str(i) for i in range(self.size)]
+        if len(labels) != self.size:
+            raise ValueError(f"{name}: {len(labels)} labels for {self.size} bins")
+        self.labels = list(labels)
+
+    def index(self, samples) -> np.ndarray:
+        """ Bin of every sample, -1 where it falls in none. """
+
+        samples = np.asarray(samples)
+        if self.values is not None:
+            order = np.argsort(self.values)
+            pos = np.searchsorted(self.values[order], samples)
+            pos = np.minimum(pos, self.size - 1)
+            found = self.values[order][pos] == samples
+            return np.where(found, order[pos], -1)
+        if self.edges is not None:
+            index = np.searchsorted(self.edges, samples, side='right') - 1
+            return np.where((index >= 0) & (index < self.size), index, -1)
+        index = samples.astype(np.int64)
+        return np.where((index >= 0) & (index < self.size), index, -1)
+
+    def spec(self) -> dict:
+        return {'name': self.name, 'size': self.size, 'labels': self.labels,
+                'edges': None if self.edges is None else self.edges.tolist(),
+                'values': None if self.values is None else self.values.tolist()}
+
+
+class Coverage:
+    """ Functional coverage group: cover points and crosses of them, with
+    a hit count per bin. Samples are buffered in plain lists and binned
+    with one np.bincount per item every `batch` samples, so sampling in
+    a testbench loop costs a few list appends; `sample_batch()` bins
+    whole arrays at once.
+
+    Counts are saved as a compact .npz next to results.xml (one per run,
+    shard or seed) and `merge()` adds runs with the same structure.
+
+    :param name: (str) Group name, written to coverage_<name>.npz
+    :param batch: (int) Samples buffered before binning
+
+    Usage:
+        cov = Coverage('clipper')
+        cov.point('inside', 4)
+        cov.point('depth', [-1e9, -1, 0, 1, 1e9], ['far', 'near -', 'near +', 'far +'])
+        cov.cross('inside_x_depth', 'inside', 'depth')
+        cov.sample(inside=2, depth=-0.5)           # or cov.sample_batch(inside=array, depth=array)
+        ...
+        cov.write()
+    Then: python -m mods.coverage_mods report sim_build/coverage_clipper.npz """
+
+    def __init__(self, name:str, batch:int=4096):
+        self.name = name
+        self.batch = batch
+        self.points = {}
+        self.crosses = {}
+        self.counts = {}
+        self.ignore = {}    # bins that cannot occur, left out of the coverage
+        self.samples = 0
+        self.last_new = 0   # sample count when a bin was last hit for the first time
+        self._pending = {}
+
+    def point(self, name:str, bins, labels=None, values=None, ignore=()) -> CoverPoint:
+        """ Adds a cover point (see `CoverPoint`).
+
+        :param ignore: (Optional) Indices of bins that cannot occur """
+
+        cp = self.points[name] = CoverPoint(name, bins, labels, values)
+        self.counts[name] = np.zeros(cp.size, dtype=np.int64)
+        self._set_ignore(name, ignore)
+        self._pending[name] = []
+        return cp
+
+    def cross(self, name:str, *points:str, ignore=()):
+        """ Adds the cross product of existing cover points.
+
+        :param ignore: (Optional) Bin index tuples (one index per point)
+                that cannot occur, e.g. a crossing edge with 0 vertices inside """
+
+        missing = [p for p in points if p not in self.points]
+        if missing:
+            raise ValueError(f'{name}: unknown cover points {missing}')
+        self.crosses[name] = tuple(points)
+        self.counts[name] = np.zeros([self.points[p].size for p in points], dtype=np.int64)
+        self._set_ignore(name, ignore)
+
+    def _set_ignore(self, name:str, ignore):
+        mask = np.zeros(self.counts[name].shape, dtype=bool)
+        for index in ignore:
+            mask[index] = True
+        self.ignore[name] = mask
+
+    def sample(self, **values):
+        """ Records one sample; every cover point must be given. """
+
+        pending = self._pending
+        for name, value in values.items():
+            pending[name].append(value)
+        if len(pending[name]) >= self.batch:
+            self.flush()
+
+    def sample_batch(self, **values):
+        """ Records many samples: one equally long array per cover point. """
+
+        self.flush()
+        self._bin({name: np.asarray(v) for name, v in values.items()})
+
+    def flush(self):
+        """ Bins the buffered samples. """
+
+        if not self._pending or not any(self._pending.values()):
+            return
+        values = {name: np.asarray(v) for name, v in self._pending.items() if v}
+        for v in self._pending.values():
+            v.clear()
+        self._bin(values)
+
+    def _bin(self, values:dict):
+        missing = [p for p in self.points if p not in values]
+        if missing:
+            raise ValueError(f'{self.name}: samples without cover points {missing}')
+        count = len(next(iter(values.values())))
+        before = self.hit_bins()
+        index = {name: self.points[name].index(values[name]) for name in self.points}
+        for name, idx in index.items():
+            idx = idx[idx >= 0]
+            self.counts[name] += np.bincount(idx, minlength=self.points[name].size)
+        for name, points in self.crosses.items():
+            shape = self.counts[name].shape
+            stacked = np.stack([index[p] for p in points])
+            valid = (stacked >= 0).all(axis=0)
+            flat = np.ravel_multi_index(stacked[:, valid], shape)
+            self.counts[name] += np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+        self.samples += count
+        if self.hit_bins() > before:
+            self.last_new = self.samples
+
+    def novelty(self, **values) -> np.ndarray:
+        """ Score of candidate samples without recording them: the sum over
+        points and crosses of 1 / (1 + hits) of the bin each would land in,
+        so a sample reaching unhit bins scores highest. Ignored bins and
+        values in no bin score 0. """
+
+        self.flush()
+        index = {name: self.points[name].index(np.asarray(values[name])) for name in self.points}
+        score = np.zeros(len(next(iter(index.values()))))
+        for name, idx in index.items():
+            weight = np.where(self.ignore[name], 0.0, 1.0 / (1.0 + self.counts[name]))
+            score += np.where(idx >= 0, weight[np.maximum(idx, 0)], 0.0)
+        for name, points in self.crosses.items():
+            stacked = np.stack([index[p] for p in points])
+            valid = (stacked >= 0).all(axis=0)
+            weight = np.where(self.ignore[name], 0.0, 1.0 / (1.0 + self.counts[name]))
+            score += np.where(valid, weight[tuple(np.maximum(stacked, 0))], 0.0)
+        return score
+
+    # ------------------------------------------------------------------ #
+    # Results
+    # ------------------------------------------------------------------ #
+
+    def _hit(self, name:str) -> int:
+        return int(np.count_nonzero(self.counts[name][~self.ignore[name]]))
+
+    def _size(self, name:str) -> int:
+        return int(np.count_nonzero(~self.ignore[name]))
+
+    def hit_bins(self) -> int:
+        return sum(self._hit(name) for name in self.counts)
+
+    def total_bins(self) -> int:
+        return sum(self._size(name) for name in self.counts)
+
+    @property
+    def coverage(self) -> float:
+        """ Fraction of all bins (points and crosses) hit at least once. """
+
+        self.flush()
+        total = self.total_bins()
+        return self.hit_bins() / total if total else 0.0
+
+    def saturated(self, patience:int) -> bool:
+        """ True once `patience` samples went by without hitting a new bin
+        (to the resolution of `batch`), or everything is covered. """
+
+        self.flush()
+        return self.hit_bins() == self.total_bins() or self.samples - self.last_new >= patience
+
+    def labels(self, name:str) -> list:
+        """ Bin labels of a point, or 'a / b' tuples of a cross, in counts order. """
+
+        if name in self.points:
+            return self.points[name].labels
+        grids = np.meshgrid(*[np.arange(self.points[p].size) for p in self.crosses[name]], indexing='ij')
+        return [' / '.join(self.points[p].labels[i] for p, i in zip(self.crosses[name], idx))
+                for idx in zip(*[g.ravel() for g in grids])]
+
+    def holes(self, name:str) -> list:
+        """ Labels of the bins of `name` never hit (ignored bins excluded). """
+
+        self.flush()
+        labels = self.labels(name)
+        unhit = (self.counts[name] == 0) & ~self.ignore[name]
+        return [labels[i] for i in np.flatnonzero(unhit.ravel())]
+
+    def report(self) -> dict:
+        self.flush()
+        items = {}
+        for name in self.counts:
+            hit, size = self._hit(name), self._size(name)
+            items[name] = {'kind': 'cross' if name in self.crosses else 'point', 'bins': size,
+                           'hit': hit, 'coverage': hit / size if size else 1.0, 'holes': self.holes(name)[:64]}
+        return {'name': self.name, 'samples': self.samples, 'coverage': self.coverage,
+                'bins': self.total_bins(), 'hit': self.hit_bins(), 'items': items}
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+
+    def _meta(self) -> dict:
+        return {'name': self.name, 'points': [p.spec() for p in self.points.values()],
+                'crosses': {name: list(points) for name, points in self.crosses.items()},
+                'ignore': {name: np.flatnonzero(mask.ravel()).tolist() for name, mask in self.ignore.items()}}
+
+    def save(self, path) -> Path:
+        """ Writes the counts and the structure as one .npz. """
+
+        self.flush()
+        path = Path(path)
+        arrays = {f'count_{name}': counts for name, counts in self.counts.items()}
+        np.savez_compressed(path, meta=json.dumps(self._meta()), samples=self.samples, **arrays)
+        return path
+
+    def write(self, directory=None) -> Path:
+        """ Saves coverage_<name>.npz next to results.xml. """
+
+        from mods.perf_mods import report_dir
+        return self.save(Path(directory or report_dir()) / f'coverage_{self.name}.npz')
+
+    @classmethod
+    def load(cls, path) -> 'Coverage':
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            cov = cls(meta['name'])
+            for spec in meta['points']:
+                bins = spec['edges'] if spec['edges'] is not None else spec['size']
+                cov.point(spec['name'], bins, spec['labels'], spec['values'])
+            for name, points in meta['crosses'].items():
+                cov.cross(name, *points)
+            for name, flat in meta['ignore'].items():
+                cov.ignore[name].ravel()[flat] = True
+            for name in cov.counts:
+                cov.counts[name] = data[f'count_{name}'].astype(np.int64)
+            cov.samples = int(data['samples'])
+        return cov
+
+    def merge(self, *others) -> 'Coverage':
+        """ Adds the counts of other groups (or .npz paths) of the same structure into this one. """
+
+        self.flush()
+        for other in others:
+            if not isinstance(other, Coverage):
+                other = Coverage.load(other)
+            other.flush()
+            if other._meta() != self._meta():
+                raise ValueError(f"Cannot merge coverage '{other.name}' into '{self.name}': different bins")
+            for name in self.counts:
+                self.counts[name] += other.counts[name]
+            self.samples += other.samples
+        return self
+
+
+def merge_files(paths) -> Coverage:
+    """ Sum of the coverage files of several runs (shards, seeds). """
+
+    paths = list(paths)
+    if not paths:
+        raise ValueError('No coverage files to merge')
+    return Coverage.load(paths[0]).merge(*paths[1:])
+
+
+def format_report(report:dict) -> str:
+    lines = [f"{report['name']}: {report['coverage']:.1%} ({report['hit']}/{report['bins']} bins, "
+             f"{report['samples']} samples)"]
+    for name, item in report['items'].items():
+        lines.append(f"  {item['kind']:<5} {name:<28} {item['coverage']:7.1%}  {item['hit']:>5}/{item['bins']:<5}")
+        if item['holes']:
+            shown = ', '.join(item['holes'][:8])
+            more = f" (+{len(item['holes']) - 8})" if len(item['holes']) > 8 else ''
+            lines.append(f'        holes: {shown}{more}')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Functional coverage reports and merging')
+    sub = parser.add_subparsers(dest='command', required=True)
+    rep = sub.add_parser('report', help='Print the coverage of one or more (merged) runs')
+    rep.add_argument('files', nargs='+', help='coverage_*.npz files of the same group')
+    rep.add_argument('--json', default=None, help='Also write the report as JSON')
+    mrg = sub.add_parser('merge', help='Merge runs of the same group into one file')
+    mrg.add_argument('files', nargs='+')
+    mrg.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    cov = merge_files(args.files)
+    if args.command == 'merge':
+        print(f'Merged {len(args.files)} runs into {cov.save(args.output)}')
+    report = cov.report()
+    print(format_report(report))
+    if args.command == 'report' and args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
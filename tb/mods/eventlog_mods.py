@@ -0,0 +1,178 @@
+import sys
+import json
+import queue
+import argparse
+import threading
+from os import getenv
+from pathlib import Path
+
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def _to_json(value):
+    """ json.dumps fallback for NumPy scalars / arrays and cocotb values. """
+
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'integer'):
+        return value.integer
+    return str(value)
+
+
+class EventLog:
+    """ Structured event log for testbench loops. Records are appended to
+    an in-memory buffer as (sim time, level, event, fields) tuples and
+    written as JSON lines by a background thread, so the simulation never
+    waits on formatting or file I/O. Disabled levels are bound to a no-op,
+    costing one call and nothing else.
+
+    Field values are serialised later, on the writer thread: pass copies
+    of anything mutated afterwards (e.g. `mem.memory.copy()`).
+
+    :param name: (str) Log name, written to events_<name>.jsonl next to results.xml
+    :param level: (Optional) Lowest recorded level, $TB_LOG_LEVEL or 'info' when None
+    :param path: (Optional) Override the output file
+    :param buffer_size: (int) Records per hand-off to the writer thread
+
+    Usage:
+        with EventLog('test_clipper') as log:
+            log.error('vertex_mismatch', iteration=i, hw=hw_v, ref=ref_v)
+            ...
+    The log is closed (and everything recorded written) when the block
+    exits, also when a failing test raises; otherwise call close().
+    Then: python mods/eventlog_mods.py sim_build/events_test_clipper.jsonl """
+
+    def __init__(self, name:str, level:str=None, path=None, buffer_size:int=4096):
+        from cocotb.utils import get_sim_time
+        from mods.perf_mods import report_dir
+
+        self.level = (level or getenv('TB_LOG_LEVEL', 'info')).lower()
+        if self.level not in LEVELS:
+            raise ValueError(f"Unknown log level '{self.level}', choose from {list(LEVELS)}.")
+        self.path = Path(path) if path else report_dir() / f'events_{name}.jsonl'
+        self.buffer_size = buffer_size
+        self.counts = dict.fromkeys(LEVELS, 0)
+        self._time = get_sim_time
+        self._buffer = []
+
+        for lvl, severity in LEVELS.items():
+            if severity >= LEVELS[self.level]:
+                setattr(self, lvl, self._recorder(lvl))
+            else:
+                setattr(self, lvl, _noop)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w')
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _recorder(self, level:str):
+        buffer = self._buffer
+        counts = self.counts
+        get_time = self._time
+
+        def record(event:str, **fields):
+            buffer.append((get_time('ns'), level, event, fields))
+            counts[level] += 1
+            if len(buffer) >= self.buffer_size:
+                self._hand_off()
+        return record
+
+    def enabled(self, level:str) -> bool:
+        """ Whether `level` is recorded, for callers that would otherwise
+        build an expensive payload for nothing. """
+
+        return LEVELS[level] >= LEVELS[self.level]
+
+    def _hand_off(self):
+        self._queue.put(self._buffer[:])
+        self._buffer.clear()
+
+    def _write_loop(self):
+        while True:
+            records = self._queue.get()
+            if records is None:
+                break
+            lines = [json.dumps({'t': t, 'level': lvl, 'event': event, **fields}, default=_to_json)
+                     for t, lvl, event, fields in records]
+            self._file.write('\n'.join(lines) + '\n')
+
+    def flush(self):
+        """ Hands the buffered records to the writer thread. """
+
+        if self._buffer:
+            self._hand_off()
+
+    def close(self):
+        """ Writes out everything recorded and closes the file.
+
+        :return: (Path) The log file """
+
+        if self._file.closed:
+            return self.path
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def format_event(record:dict, color:bool=True) -> str:
+    """ Human readable rendering of one record. Nested lists (e.g. buffer
+    dumps) are printed one row per line. """
+
+    level = record.pop('level', '')
+    header = f"{record.pop('t', 0):>14} ns  {level:<7} {record.pop('event', '')}"
+    if color:
+        from colorama import Fore, Style
+        tint = {'error': Fore.RED, 'warning': Fore.YELLOW, 'debug': Fore.WHITE}
+        header = tint.get(level, Fore.GREEN) + header + Style.RESET_ALL
+
+    lines = [header]
+    for key, value in record.items():
+        if isinstance(value, list) and value and isinstance(value[0], list):
+            lines.append(f'    {key}:')
+            lines.extend(f'      [{row}] {v}' for row, v in enumerate(value))
+        else:
+            lines.append(f'    {key:<12} = {value}')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pretty-print a testbench event log')
+    parser.add_argument('log', help='events_<test>.jsonl file')
+    parser.add_argument('-l', '--level', default='debug', choices=list(LEVELS), help='Lowest level shown')
+    parser.add_argument('-e', '--event', action='append', help='Only show these events')
+    parser.add_argument('-n', '--limit', type=int, default=None, help='Stop after N records')
+    parser.add_argument('--no-color', action='store_true')
+    args = parser.parse_args()
+
+    shown = 0
+    with open(args.log) as f:
+        for line in f:
+            record = json.loads(line)
+            if LEVELS[record['level']] < LEVELS[args.level]:
+                continue
+            if args.event and record['event'] not in args.event:
+                continue
+            print(format_event(record, color=not args.no_color and sys.stdout.isatty()))
+            shown += 1
+            if args.limit and shown >= args.limit:
+                break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+import json
+import time
+import argparse
+import itertools
+from pathlib import Path
+
+import numpy as np
+
+from mods.texcache_mods import simulate, cache_stats
+
+
+# icache_controller.sv as written: CACHE_SIZE words in 16 direct-mapped
+# lines of 32 words (set pc[10:7], tag pc[31:11]), refilled a word per beat
+ICACHE_DEFAULTS = dict(cache_size=512, line_words=32, ways=1)
+WORD_BYTES = 4
+
+
+# Synthetic PC traces, f(count, rng=...) -> uint32 byte addresses
+def straight_line(count:int, base:int=0, **kwargs) -> np.ndarray:
+    """ Sequential PCs from `base`, no branches. """
+
+    return (base + 4 * np.arange(count, dtype=np.uint64)).astype(np.uint32)
+
+
+def loops(count:int, base:int=0, body=(8, 256), iterations=(2, 64), rng=None, **kwargs) -> np.ndarray:
+    """ Back-to-back loops with random body sizes (words) and trip counts,
+    each placed right after the previous one. Bodies larger than the
+    cache thrash it, small ones hit after their first iteration. """
+
+    rng = rng or np.random.default_rng()
+    parts, total, start = [], 0, base
+    while total < count:
+        words = int(rng.integers(body[0], body[1] + 1))
+        trips = int(rng.integers(iterations[0], iterations[1] + 1))
+        part = np.tile(start + 4 * np.arange(words, dtype=np.uint64), trips)
+        parts.append(part)
+        total += len(part)
+        start += 4 * words
+    return np.concatenate(parts)[:count].astype(np.uint32)
+
+
+def branch_heavy(count:int, base:int=0, block=(2, 8), taken:float=0.5, span:int=1 << 14, near:float=0.7,
+                 reach:int=512, rng=None, **kwargs) -> np.ndarray:
+    """ Short basic blocks ending in branches. A taken branch jumps near
+    its source (within +-`reach` bytes) with probability `near`,
+    otherwise anywhere in [base, base + span).
+
+    :param block: (Optional) Inclusive range of basic block lengths in words
+    :param taken: (Optional) Probability a block ends in a taken branch """
+
+    rng = rng or np.random.default_rng()
+    parts, total, pc = [], 0, base
+    while total < count:
+        words = int(rng.integers(block[0], block[1] + 1))
+        parts.append(pc + 4 * np.arange(words, dtype=np.int64))
+        total += words
+        pc = pc + 4 * words
+        if rng.random() < taken:
+            if rng.random() < near:
+                pc = pc + 4 * int(rng.integers(-reach // 4, reach // 4 + 1))
+            else:
+                pc = base + 4 * int(rng.integers(0, span // 4))
+            pc = min(max(pc, base), base + span - 4)
+    return np.concatenate(parts)[:count].astype(np.uint32)
+
+
+TRACES = {
+    'straight': straight_line,
+    'loops': loops,
+    'branchy': branch_heavy,
+}
+
+
+
+def geometry(cache_size:int=512, line_words:int=32, ways:int=1) -> tuple:
+    """ (line bytes, sets) of a cache of `cache_size` words.
+
+    :raise ValueError: The sizes are not powers of two or leave no set """
+
+    for name, value in (('cache_size', cache_size), ('line_words', line_words), ('ways', ways)):
+        if value < 1 or value & (value - 1):
+            raise ValueError(f'{name} must be a power of two, got {value}')
+    sets = cache_size // (line_words * ways)
+    if sets < 1:
+        raise ValueError(f'{cache_size} words cannot hold {ways} ways of {line_words}-word lines')
+    return line_words * WORD_BYTES, sets
+
+
+def replay(pcs, cache_size:int=512, line_words:int=32, ways:int=1, flush=None) -> np.ndarray:
+    """ Replays fetch PCs through the icache: a miss refills the whole line,
+    `flush` (icache_flush) invalidates every line before that fetch.
+
+    :param pcs: uint32 byte addresses, in lookup order
+    :return: (np.ndarray) Boolean hit per fetch """
+
+    line_bytes, sets = geometry(cache_size, line_words, ways)
+    return simulate(pcs, line_bytes, sets, ways, flush)
+
+
+def refills(pcs, hits, line_words:int=32) -> np.ndarray:
+    """ Line addresses requested on icache_a_addr, in order. """
+
+    pcs = np.asarray(pcs, dtype=np.uint32)
+    return pcs[~np.asarray(hits, dtype=bool)] & np.uint32(~(line_words * WORD_BYTES - 1) & 0xFFFFFFFF)
+
+
+def icache_stats(pcs, hits, cache_size:int=512, line_words:int=32, ways:int=1, flush=None,
+                 latency:int=4) -> dict:
+    """ `cache_stats()` of a replay plus an estimate of the fetch cycles of
+    the controller: one per hit, and per miss the IDLE lookup, the MISS
+    state, `latency` cycles to the first beat and a beat per word.
+
+    :param latency: (Optional) Cycles from the accepted request to the first D beat """
+
+    line_bytes, sets = geometry(cache_size, line_words, ways)
+    stats = cache_stats(pcs, hits, line_bytes, sets, ways, flush)
+    miss_cycles = 2 + latency + line_words
+    cycles = stats['hits'] + stats['misses'] * miss_cycles
+    return {'cache_size': cache_size, 'line_words': line_words, **stats,
+            'cycles_per_miss': miss_cycles,
+            'cycles_estimate': cycles,
+            'instructions_per_cycle': stats['accesses'] / cycles if cycles else 0.0}
+
+
+def sweep(pcs, cache_sizes=(512,), line_words=(32,), ways=(1,), flush=None, latency:int=4) -> list:
+    """ `replay()` over the cartesian product of the parameters, skipping
+    combinations with no set. """
+
+    results = []
+    for size, words, w in itertools.product(cache_sizes, line_words, ways):
+        if words * w > size:
+            continue
+        hits = replay(pcs, size, words, w, flush)
+        results.append(icache_stats(pcs, hits, size, words, w, flush, latency))
+    return results
+
+
+def load_pcs(path) -> np.ndarray:
+    """ A PC trace from .npy, .npz ('pcs'), raw little-endian uint32 .bin
+    or text with one (hex) PC per line. """
+
+    path = Path(path)
+    if path.suffix == '.npy':
+        return np.load(path).astype(np.uint32)
+    if path.suffix == '.npz':
+        with np.load(path) as data:
+            return data['pcs'].astype(np.uint32)
+    if path.suffix == '.bin':
+        return np.fromfile(path, dtype='<u4')
+    return np.array([int(line.split()[0], 16) for line in path.read_text().splitlines() if line.strip()],
+                    dtype=np.uint32)
+
+
+def get_pcs(source:str, count:int=1_000_000, seed:int=None) -> np.ndarray:
+    """ A PC trace by file path or synthetic trace name (TRACES). """
+
+    if Path(source).suffix:
+        return load_pcs(source)
+    if source not in TRACES:
+        raise ValueError(f"Unknown trace '{source}', expected a file or one of {list(TRACES)}")
+    return TRACES[source](count, rng=np.random.default_rng(seed))
+
+
+def format_result(result:dict) -> str:
+    return (f"{result['cache_size']:>6} words {result['line_words']:>3}-word lines x {result['sets']:>4} sets x "
+            f"{result['ways']} ways: hit {result['hit_rate']:7.2%}  {result['bytes_per_access']:6.2f} B/fetch  "
+            f"~{result['instructions_per_cycle']:.3f} instr/cycle")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Behavioural icache_controller model for what-if sizing')
+    parser.add_argument('-s', '--source', default='branchy',
+                        help="PC trace (.npy / .npz / .bin / text) or 'straight', 'loops', 'branchy'")
+    parser.add_argument('-n', '--count', type=int, default=1_000_000, help='PCs of a synthetic trace')
+    parser.add_argument('-c', '--cache-size', nargs='*', type=int, default=[ICACHE_DEFAULTS['cache_size']],
+                        help='Cache sizes in words (CACHE_SIZE)')
+    parser.add_argument('-l', '--line-words', nargs='*', type=int, default=[ICACHE_DEFAULTS['line_words']])
+    parser.add_argument('-w', '--ways', nargs='*', type=int, default=[ICACHE_DEFAULTS['ways']])
+    parser.add_argument('--latency', type=int, default=4, help='Refill latency for the cycle estimate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=str, default=None, help='Write the results as JSON')
+    args = parser.parse_args()
+
+    pcs = get_pcs(args.source, args.count, args.seed)
+    start = time.perf_counter()
+    results = sweep(pcs, args.cache_size, args.line_words, args.ways, latency=args.latency)
+    elapsed = time.perf_counter() - start
+    print(f'{args.source}: {len(pcs)} PCs x {len(results)} configurations in {elapsed:.2f} s '
+          f'({len(pcs) * len(results) / elapsed / 1e6:.1f} M PCs/s)')
+    for result in results:
+        print(format_result(result))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+import re
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+
+DEF_SV = Path(__file__).parent.parent.parent / 'rtl' / 'core' / 'control_unit' / 'def.sv'
+
+# Instruction word layout (doc/ISA.txt, control_unit.sv)
+#   [31:21] O   11-bit signed immediate, or bank B source in [25:21]
+#   [20:16] S   bank A source
+#   [15]    I   immediate flag
+#   [14:9]  X   destination, bit 14 selects bank B
+#   [8:2]   P   opcode (ALU 7 bits, FPU [5:2], MEM [6:2], SFU [4:2])
+#   [1:0]       instruction type
+TYPE_ALU, TYPE_FPU, TYPE_MEM, TYPE_SFU = 0, 1, 2, 3
+TYPE_NAMES = {TYPE_ALU: 'ALU', TYPE_FPU: 'FPU', TYPE_MEM: 'MEM', TYPE_SFU: 'SFU'}
+OPC_MASK = {TYPE_ALU: 0x7F, TYPE_FPU: 0x0F, TYPE_MEM: 0x1F, TYPE_SFU: 0x07}
+
+IMM_MIN, IMM_MAX = -(1 << 10), (1 << 10) - 1
+
+# Decoded instruction fields, one row per instruction
+FIELDS_DTYPE = np.dtype([
+    ('type', 'u1'),
+    ('opc', 'u1'),
+    ('dest', 'u1'),     # 6 bits, bank in bit 5
+    ('src_a', 'u1'),    # bank A register
+    ('src_b', 'u1'),    # bank B register
+    ('imm_en', 'u1'),
+    ('imm', 'i2'),
+])
+
+# Memory opcodes ([6] texture, [5] integer register, [4:2] dc_op_o). def.sv
+# has no memory table yet, so the dc_op encoding is defined here and the
+# data cache is expected to follow it.
+MEM_OPCODES = {
+    'lb':    0b0_1_000,
+    'lh':    0b0_1_001,
+    'lw':    0b0_1_010,
+    'sb':    0b0_1_100,
+    'sh':    0b0_1_101,
+    'sw':    0b0_1_110,
+    'fl24':  0b0_0_010,
+    'fs24':  0b0_0_110,
+    'tex2d': 0b1_0_000,
+    'tex3d': 0b1_0_001,
+}
+MEM_STORES = {'sb', 'sh', 'sw', 'fs24'}
+
+# def.sv SFU_OPCODE_* name -> ISA.txt mnemonic
+SFU_MNEMONICS = {
+    'RSQRT': 'frsqrt24',
+    'RECIP': 'frcp24',
+    'LOG2': 'fblg24',
+    'EXP': 'fbxp24',
+    'SIN': 'fsin24',
+    'ATAN': 'fatan24',
+}
+
+FPU_UNARY = {'fabs24', 'fneg24', 'ffloor24', 'fceil24', 'fsign24'}
+ALU_BRANCHES = {'beq', 'bne', 'blt', 'bge', 'bltu', 'bgeu'}
+
+_REGISTER = re.compile(r'^([ab])(\d+)$')
+_COMMENT = re.compile(r'#|;|//')
+_DEFINE = re.compile(r"`define\s+(ALU|FPU|SFU)_OPCODE_(\w+)\s+(\d+)'b([01_]+)")
+
+
+class AsmError(ValueError):
+    """ Assembly error, reports the source line. """
+
+    def __init__(self, message, line_no=None, line=None):
+        if line_no is not None:
+            message = f'line {line_no}: {message}\n    {line.strip()}'
+        super().__init__(message)
+
+
+def parse_defines(path=DEF_SV) -> dict:
+    """ Reads the opcode macros from def.sv.
+
+    :param path: (Optional) Path of def.sv
+    :return: (dict) {'ALU': {'ADD': 0b0011000, ...}, 'FPU': {...}, 'SFU': {...}} """
+
+    tables = {'ALU': {}, 'FPU': {}, 'SFU': {}}
+    for unit, name, width, bits in _DEFINE.findall(Path(path).read_text()):
+        tables[unit][name] = int(bits.replace('_', ''), 2)
+    return tables
+
+
+def mnemonic_table(path=DEF_SV) -> dict:
+    """ Assembler mnemonics built from def.sv plus the memory table.
+
+    :return: (dict) {mnemonic: (type, opcode)} """
+
+    defines = parse_defines(path)
+    table = {}
+    for name, opc in defines['ALU'].items():
+        table[name.lower()] = (TYPE_ALU, opc)
+    for name, opc in defines['FPU'].items():
+        table[name.lower() + '24'] = (TYPE_FPU, opc)   # FADD -> fadd24
+    for name, opc in defines['SFU'].items():
+        table[SFU_MNEMONICS.get(name, 'f' + name.lower() + '24')] = (TYPE_SFU, opc)
+    for name, opc in MEM_OPCODES.items():
+        table[name] = (TYPE_MEM, opc)
+    return table
+
+
+def parse_register(token:str, bank:str=None, line_no=None, line=None) -> int:
+    """ Parses a0..a31 / b0..b31 into a 6-bit register number (bit 5 =
+    bank B). `bank` restricts the operand to one bank. """
+
+    m = _REGISTER.match(token.lower())
+    if m is None or int(m.group(2)) > 31:
+        raise AsmError(f"'{token}' is not a register (a0..a31, b0..b31)", line_no, line)
+    if bank is not None and m.group(1) != bank:
+        raise AsmError(f"'{token}' must be a bank {bank.upper()} register "
+                       f"(one source per bank per cycle)", line_no, line)
+    return (32 if m.group(1) == 'b' else 0) | int(m.group(2))
+
+
+def _parse_imm(token:str, line_no, line) -> int:
+    try:
+        value = int(token.lstrip('#'), 0)
+    except ValueError:
+        raise AsmError(f"'{token}' is neither a bank B register nor an immediate", line_no, line)
+    if not IMM_MIN <= value <= IMM_MAX:
+        raise AsmError(f'immediate {value} does not fit in 11 signed bits', line_no, line)
+    return value
+
+
+class Assembler:
+    """ TauriISA assembler / disassembler. Opcode tables are read from
+    def.sv, so new ALU / FPU / SFU macros are picked up without edits here.
+
+    Syntax (one instruction per line, `#`, `;` and `//` start comments):
+        add   a1, a2, b3        dest, bank A source, bank B source
+        add   b1, a2, -5        11-bit signed immediate instead of bank B
+        beq   a2, b3            branches only compare (no target field)
+        fmul24 a4, a5, b6
+        fabs24 a4, a5
+        frsqrt24 b1, a2
+        lw    a1, a2            dest, address register
+        sw    a2, b7            address register, data register (bank B)
+        fs24  a2                integer a2 is the address, fp a2 the data
+        tex2d a1, a2, b2        dest, s, t
+        .word 0x0000c018        raw instruction word
+
+    :param def_path: (Optional) Path of def.sv """
+
+    def __init__(self, def_path=DEF_SV):
+        self.table = mnemonic_table(def_path)
+        # (type, opcode) -> mnemonic, for the disassembler
+        self.names = {key: name for name, key in self.table.items()}
+        self._dis_table = np.full(4 << 7, '.word', dtype='<U10')
+        for (itype, opc), name in self.names.items():
+            self._dis_table[(itype << 7) | opc] = name
+        self._line_cache = {}
+
+    # ------------------------------------------------------------------ #
+    # Assembly
+    # ------------------------------------------------------------------ #
+
+    def parse(self, source:str):
+        """ Parses assembly text into instruction fields.
+
+        :param source: (str) Program text
+        :return: (fields, raw, is_raw) FIELDS_DTYPE array, uint32 raw
+                words (`.word`) and the mask of rows they apply to """
+
+        rows, raw, is_raw = [], [], []
+        cache = self._line_cache
+        for line_no, line in enumerate(source.splitlines(), 1):
+            code = _COMMENT.split(line, maxsplit=1)[0].strip()
+            if not code:
+                continue
+            mnemonic, _, rest = code.partition(' ')
+            mnemonic = mnemonic.lower()
+            ops = [op.strip() for op in rest.split(',')] if rest.strip() else []
+
+            if mnemonic == '.word':
+                if len(ops) != 1:
+                    raise AsmError('.word takes one value', line_no, line)
+                rows.append((0, 0, 0, 0, 0, 0, 0))
+                raw.append(int(ops[0], 0) & 0xFFFFFFFF)
+                is_raw.append(True)
+                continue
+            if mnemonic not in self.table:
+                hint = ' (not encodable in TauriISA v0.1)' if mnemonic in ('converge', 'fcos24') else ''
+                raise AsmError(f"unknown mnemonic '{mnemonic}'{hint}", line_no, line)
+
+            # Kernels repeat the same few lines, parse each distinct one once
+            row = cache.get(code)
+            if row is None:
+                row = cache[code] = self._parse_operands(mnemonic, ops, line_no, line)
+            rows.append(row)
+            raw.append(0)
+            is_raw.append(False)
+
+        fields = np.array(rows, dtype=FIELDS_DTYPE)
+        return fields, np.array(raw, dtype=np.uint32), np.array(is_raw, dtype=bool)
+
+    def _parse_operands(self, mnemonic, ops, line_no, line):
+        itype, opc = self.table[mnemonic]
+        dest = src_a = src_b = imm_en = imm = 0
+
+        def expect(n):
+            if len(ops) != n:
+                raise AsmError(f'{mnemonic} takes {n} operands, got {len(ops)}', line_no, line)
+
+        def operand_b(token):
+            if _REGISTER.match(token.lower()):
+                return parse_register(token, 'b', line_no, line) & 31, 0, 0
+            return 0, 1, _parse_imm(token, line_no, line)
+
+        if itype == TYPE_ALU and mnemonic in ALU_BRANCHES:
+            expect(2)
+            src_a = parse_register(ops[0], 'a', line_no, line)
+            src_b, imm_en, imm = operand_b(ops[1])
+        elif itype == TYPE_ALU:
+            expect(3)
+            dest = parse_register(ops[0], None, line_no, line)
+            src_a = parse_register(ops[1], 'a', line_no, line)
+            src_b, imm_en, imm = operand_b(ops[2])
+        elif itype == TYPE_FPU:
+            expect(2 if mnemonic in FPU_UNARY else 3)
+            dest = parse_register(ops[0], None, line_no, line)
+            src_a = parse_register(ops[1], 'a', line_no, line)
+            if len(ops) == 3:
+                src_b = parse_register(ops[2], 'b', line_no, line) & 31
+        elif itype == TYPE_SFU:
+            expect(2)
+            dest = parse_register(ops[0], None, line_no, line)
+            src_a = parse_register(ops[1], 'a', line_no, line)
+        elif mnemonic in MEM_STORES:
+            # fp stores take the data from the fp register file at the same index
+            expect(1 if mnemonic == 'fs24' else 2)
+            src_a = parse_register(ops[0], 'a', line_no, line)
+            if mnemonic != 'fs24':
+                src_b = parse_register(ops[1], 'b', line_no, line) & 31
+        elif mnemonic.startswith('tex'):
+            expect(3)
+            dest = parse_register(ops[0], None, line_no, line)
+            src_a = parse_register(ops[1], 'a', line_no, line)
+            src_b = parse_register(ops[2], 'b', line_no, line) & 31
+        else:
+            expect(2)
+            dest = parse_register(ops[0], None, line_no, line)
+            src_a = parse_register(ops[1], 'a', line_no, line)
+        return itype, opc, dest, src_a & 31, src_b, imm_en, imm
+
+    @staticmethod
+    def encode(fields) -> np.ndarray:
+        """ Packs instruction fields into words, all rows at once.
+
+        :param fields: FIELDS_DTYPE array
+        :return: (np.ndarray) uint32 instruction words """
+
+        f = {name: fields[name].astype(np.uint32) for name in FIELDS_DTYPE.names}
+        operand = np.where(f['imm_en'] != 0,
+                           fields['imm'].astype(np.int32).view(np.uint32) & 0x7FF,
+                           f['src_b'] & 31)
+        return ((operand << 21) | ((f['src_a'] & 31) << 16) | ((f['imm_en'] & 1) << 15)
+                | ((f['dest'] & 63) << 9) | ((f['opc'] & 0x7F) << 2) | (f['type'] & 3)).astype(np.uint32)
+
+    def assemble(self, source:str) -> np.ndarray:
+        """ Assembles a program.
+
+        :param source: (str) Program text
+        :return: (np.ndarray) uint32 instruction words """
+
+        fields, raw, is_raw = self.parse(source)
+        return np.where(is_raw, raw, self.encode(fields)).astype(np.uint32)
+
+    # ------------------------------------------------------------------ #
+    # Disassembly
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def decode(words) -> np.ndarray:
+        """ Splits instruction words into fields, all rows at once.
+
+        :param words: (array-like) uint32 words
+        :return: FIELDS_DTYPE array """
+
+        w = np.asarray(words, dtype=np.uint32)
+        fields = np.zeros(w.shape, dtype=FIELDS_DTYPE)
+        fields['type'] = w & 3
+        opc_mask = np.array([OPC_MASK[t] for t in range(4)], dtype=np.uint32)[w & 3]
+        fields['opc'] = (w >> 2) & opc_mask
+        fields['dest'] = (w >> 9) & 63
+        fields['src_a'] = (w >> 16) & 31
+        fields['src_b'] = (w >> 21) & 31
+        fields['imm_en'] = (w >> 15) & 1
+        imm = ((w >> 21) & 0x7FF).astype(np.int32)
+        fields['imm'] = np.where(imm >= 1024, imm - 2048, imm)
+        return fields
+
+    def disassemble(self, words) -> list:
+        """ Disassembles instruction words (programs or trace streams).
+        Words without a known opcode come out as `.word`.
+
+        :param words: (array-like) uint32 words
+        :return: (list[str]) One line per word """
+
+        words = np.asarray(words, dtype=np.uint32).ravel()
+        f = self.decode(words)
+        names = self._dis_table[(f['type'].astype(np.int64) << 7) | f['opc']]
+
+        def reg(values, bank=None):
+            values = values.astype(np.int64)
+            if bank is None:
+                prefix = np.where(values >= 32, 'b', 'a')
+                return np.char.add(prefix, (values & 31).astype(str))
+            return np.char.add(bank, values.astype(str))
+
+        dest = reg(f['dest'])
+        src_a = reg(f['src_a'], 'a')
+        src_b = np.where(f['imm_en'] != 0, f['imm'].astype(str), reg(f['src_b'], 'b'))
+        sep = ', '
+
+        three = np.char.add(np.char.add(np.char.add(np.char.add(dest, sep), src_a), sep), src_b)
+        two_dest = np.char.add(np.char.add(dest, sep), src_a)
+        two_src = np.char.add(np.char.add(src_a, sep), src_b)
+
+        is_branch = np.isin(names, list(ALU_BRANCHES))
+        is_unary = np.isin(names, list(FPU_UNARY)) | (f['type'] == TYPE_SFU)
+        is_load = np.isin(names, [n for n in MEM_OPCODES if n not in MEM_STORES and not n.startswith('tex')])
+        operands = np.where(is_branch | np.isin(names, list(MEM_STORES - {'fs24'})), two_src,
+                   np.where(names == 'fs24', src_a,
+                   np.where(is_unary | is_load, two_dest, three)))
+
+        lines = np.char.add(np.char.add(np.char.ljust(names, 9), ' '), operands)
+        unknown = names == '.word'
+        lines[unknown] = ['.word     0x%08x' % w for w in words[unknown]]
+        return lines.tolist()
+
+
+def write_readmemh(path, words):
+    """ Writes one 8-digit hex word per line, for $readmemh. """
+
+    np.savetxt(path, np.asarray(words, dtype=np.uint32), fmt='%08x')
+
+
+def read_readmemh(path) -> np.ndarray:
+    """ Reads a $readmemh image (comments and @address lines unsupported). """
+
+    text = re.sub(r'//[^\n]*', '', Path(path).read_text())
+    return np.array([int(tok, 16) for tok in text.split()], dtype=np.uint32)
+
+
+def write_binary(path, words):
+    """ Writes little-endian 32-bit words. """
+
+    np.asarray(words, dtype='<u4').tofile(path)
+
+
+def read_binary(path) -> np.ndarray:
+    return np.fromfile(path, dtype='<u4').astype(np.uint32)
+
+
+def load_words(path) -> np.ndarray:
+    """ Reads a program / trace image, .bin as binary, anything else as hex. """
+
+    return read_binary(path) if Path(path).suffix == '.bin' else read_readmemh(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TauriISA assembler / disassembler')
+    sub = parser.add_subparsers(dest='command', required=True)
+    asm = sub.add_parser('asm', help='Assemble a program')
+    asm.add_argument('source')
+    asm.add_argument('-o', '--output', help='Output image (.bin for binary, $readmemh hex otherwise)')
+    dis = sub.add_parser('dis', help='Disassemble a .bin or $readmemh image')
+    dis.add_argument('image')
+    dis.add_argument('--no-addr', action='store_true', help='Omit word addresses')
+    args = parser.parse_args()
+
+    assembler = Assembler()
+    if args.command == 'asm':
+        words = assembler.assemble(Path(args.source).read_text())
+        output = args.output or str(Path(args.source).with_suffix('.hex'))
+        (write_binary if output.endswith('.bin') else write_readmemh)(output, words)
+        print(f'{len(words)} instructions written to {output}')
+    else:
+        words = load_words(args.image)
+        for addr, (word, line) in enumerate(zip(words, assembler.disassemble(words))):
+            print(line if args.no_addr else f'{addr * 4:08x}:  {word:08x}  {line}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,451 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from mods.isa_mods import (Assembler, DEF_SV, TYPE_ALU, TYPE_FPU, TYPE_MEM, TYPE_SFU, TYPE_NAMES,
+                           MEM_OPCODES, parse_defines, parse_register, load_words)
+
+
+LANES = 4   # alu_a_o / fpu_a_o carry 4 lanes, one per register file copy
+
+# Architectural semantics of the ALU opcodes in def.sv, on uint32 lane
+# arrays. Known differences in alu.sv (result select on opc[5:3] sends
+# MAX/MIN to the shifter and shifts to the min/max path, LSL/LSR swapped)
+# are modelled separately by the ALU testbench reference.
+def _signed(x):
+    return x.view(np.int32)
+
+
+ALU_OPS = {
+    'ADD':  lambda a, b: a + b,
+    'SUB':  lambda a, b: a - b,
+    'XOR':  lambda a, b: a ^ b,
+    'AND':  lambda a, b: a & b,
+    'OR':   lambda a, b: a | b,
+    'MAX':  lambda a, b: np.maximum(_signed(a), _signed(b)).view(np.uint32),
+    'MAXU': lambda a, b: np.maximum(a, b),
+    'MIN':  lambda a, b: np.minimum(_signed(a), _signed(b)).view(np.uint32),
+    'MINU': lambda a, b: np.minimum(a, b),
+    'LSL':  lambda a, b: a << (b & 31),
+    'LSR':  lambda a, b: a >> (b & 31),
+    'ASR':  lambda a, b: (_signed(a) >> (b & 31).astype(np.int32)).view(np.uint32),
+}
+
+# The same ops as ufuncs over (uint32 | int32 views of the) lanes, for the
+# precompiled dispatch table. Shift amounts are masked to 5 bits first.
+ALU_UFUNCS = {
+    'ADD':  (np.add, np.uint32),
+    'SUB':  (np.subtract, np.uint32),
+    'XOR':  (np.bitwise_xor, np.uint32),
+    'AND':  (np.bitwise_and, np.uint32),
+    'OR':   (np.bitwise_or, np.uint32),
+    'MAX':  (np.maximum, np.int32),
+    'MAXU': (np.maximum, np.uint32),
+    'MIN':  (np.minimum, np.int32),
+    'MINU': (np.minimum, np.uint32),
+    'LSL':  (np.left_shift, np.uint32),
+    'LSR':  (np.right_shift, np.uint32),
+    'ASR':  (np.right_shift, np.int32),
+}
+_SHIFTS = ('LSL', 'LSR', 'ASR')
+
+# Branch conditions, evaluated per lane (branches write no register)
+BRANCH_OPS = {
+    'BEQ':  lambda a, b: a == b,
+    'BNE':  lambda a, b: a != b,
+    'BLT':  lambda a, b: _signed(a) < _signed(b),
+    'BGE':  lambda a, b: _signed(a) >= _signed(b),
+    'BLTU': lambda a, b: a < b,
+    'BGEU': lambda a, b: a >= b,
+}
+
+
+def float24_to_float32(bits):
+    """ float24 (top 24 bits of an IEEE float32) to float32, vectorised. """
+
+    return (np.asarray(bits, dtype=np.uint32) << 8).view(np.float32)
+
+
+def float32_to_float24(values):
+    """ float32 to float24 bits by truncation, as fpu_ref / the RTL do. """
+
+    return np.asarray(values, dtype=np.float32).view(np.uint32) >> 8
+
+
+def _unary(ufunc):
+    return lambda a, b, out: ufunc(a, out=out)
+
+
+# float32 forms of the FPU ops writing into `out`: f(a, b, out)
+FPU_FLOAT_OPS = {
+    'FADD':   np.add,
+    'FSUB':   np.subtract,
+    'FMAX':   np.maximum,
+    'FMIN':   np.minimum,
+    'FMUL':   np.multiply,
+    'FABS':   _unary(np.abs),
+    'FNEG':   _unary(np.negative),
+    'FFLOOR': _unary(np.floor),
+    'FCEIL':  _unary(np.ceil),
+    'FSIGN':  lambda a, b, out: np.copysign(np.float32(1.0), a, out=out),
+}
+
+
+def _fp(fn):
+    """ Wraps a float32 `FPU_FLOAT_OPS` entry into a float24-bits ->
+    float24-bits op. """
+
+    def op(a, b):
+        with np.errstate(all='ignore'):
+            a = float24_to_float32(a)
+            out = np.empty_like(a)
+            fn(a, float24_to_float32(b), out)
+            return float32_to_float24(out)
+    return op
+
+
+FPU_OPS = {name: _fp(fn) for name, fn in FPU_FLOAT_OPS.items()}
+
+# Exact SFU functions on float32, the default until a table model is plugged in
+EXACT_SFU = {
+    'RSQRT': lambda x: 1.0 / np.sqrt(x),
+    'RECIP': lambda x: 1.0 / x,
+    'LOG2':  np.log2,
+    'EXP':   np.exp2,
+    'SIN':   np.sin,
+    'ATAN':  np.arctan,
+}
+
+# Issue cost in core cycles, from the control_unit FSM: ALU / FPU issue
+# from IDLE once per cycle, MEM and SFU walk the 4 lanes one request and
+# one response at a time.
+CYCLE_COST = {TYPE_ALU: 1, TYPE_FPU: 1, TYPE_MEM: 2 * LANES, TYPE_SFU: 2 * LANES}
+
+
+class TauriISS:
+    """ Instruction-set simulator for the Tauri core (control_unit + alu +
+    fpu + sfu). Runs `warps` independent copies of the 4-lane register
+    state at once, so every instruction is a single NumPy operation over
+    (warps, 4) lanes. Each distinct instruction word is decoded once into
+    a closure and cached, with its register operands resolved to views,
+    and `run()` turns a program into a per-PC dispatch table of
+    (function, a, b, out) entries once, so repeated runs go straight to
+    the ufunc calls (~0.8 M instructions/s for one warp). Throughput
+    comes from batching warps: the per-instruction cost is nearly flat up
+    to ~64 warps, i.e. tens of millions of warp-instructions per second.
+
+    Registers are two banks of 32 for each register file (integer and
+    float24), stored as `int_regs[bank, reg, warp, lane]` and
+    `fp_regs[bank, reg, warp, lane]`. Sources always come from bank A (S
+    field) and bank B (O field), so the one-read-per-bank rule holds by
+    construction.
+
+    Branches compare and record the taken lanes but do not redirect: the
+    RTL has no branch target field or PC update yet. ALU results for
+    index 0 of either integer bank (a0 / b0) are dropped, as in alu.sv.
+
+    :param warps: (int) Independent 4-lane register states simulated together
+    :param memory_size: (int) Bytes of data memory shared by all lanes
+    :param sfu: (Optional) {def.sv SFU name: float32 -> float32 function},
+            overrides `EXACT_SFU` entries (e.g. a table approximation)
+    :param texture: (Optional) f(s, t) -> float32 lanes for tex2d / tex3d,
+            returns 0.0 when None
+    :param def_path: (Optional) Path of def.sv """
+
+    def __init__(self, warps:int=1, memory_size:int=1 << 16, sfu:dict=None, texture=None, def_path=DEF_SV):
+        self.warps = warps
+        self.int_regs = np.zeros((2, 32, warps, LANES), dtype=np.uint32)
+        self.fp_regs = np.zeros((2, 32, warps, LANES), dtype=np.uint32)
+        self.memory = np.zeros(memory_size, dtype=np.uint8)
+        self.sfu = {**EXACT_SFU, **(sfu or {})}
+        self.texture = texture
+        self.assembler = Assembler(def_path)
+
+        defines = parse_defines(def_path)
+        self._alu = {opc: name for name, opc in defines['ALU'].items()}
+        self._fpu = {opc: name for name, opc in defines['FPU'].items()}
+        self._sfu = {opc: name for name, opc in defines['SFU'].items()}
+        self._mem = {opc: name for name, opc in MEM_OPCODES.items()}
+
+        self._cache = {}
+        self._programs = {}
+        self.stats = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        """ Clears the counters (in place, decoded closures hold a reference). """
+
+        self.stats.clear()
+        self.stats.update({
+            'instructions': 0,
+            'cycles': 0,
+            'per_unit': dict.fromkeys(TYPE_NAMES.values(), 0),
+            'per_opcode': {},
+            'branches': 0,
+            'branch_lanes_taken': 0,
+        })
+
+    # ------------------------------------------------------------------ #
+    # Register access
+    # ------------------------------------------------------------------ #
+
+    def set_int(self, reg, values):
+        """ Writes an integer register ('a3', 'b7' or 0..63), broadcast over
+        warps / lanes as NumPy allows. """
+
+        reg = parse_register(reg) if isinstance(reg, str) else reg
+        self.int_regs[reg >> 5, reg & 31] = np.asarray(values, dtype=np.int64).astype(np.uint32)
+
+    def get_int(self, reg, signed=False) -> np.ndarray:
+        reg = parse_register(reg) if isinstance(reg, str) else reg
+        values = self.int_regs[reg >> 5, reg & 31].copy()
+        return values.view(np.int32) if signed else values
+
+    def set_fp(self, reg, values):
+        """ Writes a float24 register from Python / NumPy floats. """
+
+        reg = parse_register(reg) if isinstance(reg, str) else reg
+        self.fp_regs[reg >> 5, reg & 31] = float32_to_float24(np.broadcast_to(
+            np.asarray(values, dtype=np.float32), (self.warps, LANES)))
+
+    def get_fp(self, reg) -> np.ndarray:
+        reg = parse_register(reg) if isinstance(reg, str) else reg
+        return float24_to_float32(self.fp_regs[reg >> 5, reg & 31])
+
+    # ------------------------------------------------------------------ #
+    # Decode
+    # ------------------------------------------------------------------ #
+
+    def decode(self, word:int):
+        """ Returns the cached closure executing one instruction word. """
+
+        fn = self._cache.get(word)
+        if fn is None:
+            fn = self._cache[word] = self._compile(word)
+        return fn
+
+    def _compile(self, word:int):
+        itype = word & 3
+        dest = (word >> 9) & 63
+        dest_bank, dest_reg = dest >> 5, dest & 31
+        src_a = (word >> 16) & 31
+        src_b = (word >> 21) & 31
+        imm_en = (word >> 15) & 1
+        imm = ((word >> 21) & 0x7FF) - (((word >> 31) & 1) << 11)
+        imm_lanes = np.full((self.warps, LANES), imm & 0xFFFFFFFF, dtype=np.uint32)
+        int_regs, fp_regs = self.int_regs, self.fp_regs
+        fast = None
+
+        if itype == TYPE_ALU:
+            opc = (word >> 2) & 0x7F
+            name = self._alu.get(opc)
+            # Operands as views into the register file, resolved once
+            a, b = int_regs[0, src_a], imm_lanes if imm_en else int_regs[1, src_b]
+            if name in BRANCH_OPS:
+                cond = BRANCH_OPS[name]
+                stats = self.stats
+                def run():
+                    taken = cond(a, b)
+                    stats['branches'] += 1
+                    stats['branch_lanes_taken'] += int(taken.sum())
+                    return taken
+            elif name in ALU_UFUNCS:
+                ufunc, dtype = ALU_UFUNCS[name]
+                if name in _SHIFTS and imm_en:
+                    b = imm_lanes & 31
+                elif name in _SHIFTS:
+                    source, amount, shift = b, np.empty_like(b), ufunc
+                    def masked(a, b, out):
+                        np.bitwise_and(source, 31, out=amount)
+                        shift(a, b, out=out)
+                    ufunc, b = masked, amount
+                # alu.sv drops write-backs to index 0 (wb_reg_wen_o needs dest_i != 0)
+                out = int_regs[dest_bank, dest_reg] if dest_reg else np.empty((self.warps, LANES), dtype=np.uint32)
+                fast = (ufunc, a.view(dtype), b.view(dtype), out.view(dtype))
+                def run():
+                    fast[0](*fast[1:3], out=fast[3])
+            else:
+                return self._illegal(word, f'ALU opcode {opc:07b}')
+
+        elif itype == TYPE_FPU:
+            opc = (word >> 2) & 0xF
+            name = self._fpu.get(opc)
+            if name not in FPU_FLOAT_OPS:
+                return self._illegal(word, f'FPU opcode {opc:04b}')
+            op, a, b, out = FPU_FLOAT_OPS[name], fp_regs[0, src_a], fp_regs[1, src_b], fp_regs[dest_bank, dest_reg]
+            fa, fb, result = (np.empty(out.shape, dtype=np.uint32) for _ in range(3))
+            fa_f, fb_f, result_f = fa.view(np.float32), fb.view(np.float32), result.view(np.float32)
+            def fp_op(a, b, out):
+                np.left_shift(a, 8, out=fa)
+                np.left_shift(b, 8, out=fb)
+                op(fa_f, fb_f, out=result_f)
+                np.right_shift(result, 8, out=out)
+            fast = (fp_op, a, b, out)
+            def run():
+                with np.errstate(all='ignore'):
+                    fp_op(a, b, out=out)
+
+        elif itype == TYPE_SFU:
+            opc = (word >> 2) & 0x7
+            name = self._sfu.get(opc)
+            if name not in self.sfu:
+                return self._illegal(word, f'SFU opcode {opc:03b}')
+            fn = self.sfu[name]
+            def run():
+                with np.errstate(all='ignore'):
+                    x = float24_to_float32(fp_regs[0, src_a])
+                    fp_regs[dest_bank, dest_reg] = float32_to_float24(fn(x).astype(np.float32))
+
+        else:
+            opc = (word >> 2) & 0x1F
+            name = self._mem.get(opc)
+            if name is None:
+                return self._illegal(word, f'memory opcode {opc:05b}')
+            run = self._compile_mem(name, dest_bank, dest_reg, src_a, src_b)
+
+        run.name = name
+        run.unit = itype
+        run.fast = fast or (lambda a, b, out: run(), None, None, None)
+        return run
+
+    def _compile_mem(self, name, dest_bank, dest_reg, src_a, src_b):
+        int_regs, fp_regs, memory = self.int_regs, self.fp_regs, self.memory
+        size = {'b': 1, 'h': 2, 'w': 4}.get(name[1], 4)
+        offsets = np.arange(4, dtype=np.int64)
+        shifts = (8 * offsets).astype(np.uint32)
+
+        def addresses(n):
+            addr = int_regs[0, src_a].astype(np.int64)
+            if addr.min() < 0 or addr.max() + n > len(memory):
+                raise IndexError(f'{name}: address out of range (memory is {len(memory)} bytes)')
+            return addr[..., None] + offsets[:n]
+
+        def load(n):
+            data = memory[addresses(n)].astype(np.uint32)
+            return np.bitwise_or.reduce(data << shifts[:n], axis=-1)
+
+        def store(n, value):
+            memory[addresses(n)] = (value[..., None] >> shifts[:n]) & 0xFF
+
+        if name.startswith('tex'):
+            texture = self.texture
+            def run():
+                s = float24_to_float32(fp_regs[0, src_a])
+                t = float24_to_float32(fp_regs[1, src_b])
+                texel = texture(s, t) if texture else np.zeros_like(s)
+                fp_regs[dest_bank, dest_reg] = float32_to_float24(texel)
+        elif name == 'fl24':
+            def run():
+                fp_regs[dest_bank, dest_reg] = load(4) >> 8
+        elif name == 'fs24':
+            def run():
+                store(4, fp_regs[0, src_a] << 8)
+        elif name[0] == 'l':
+            shift_left, shift_right = np.uint32(32 - 8 * size), np.int32(32 - 8 * size)
+            def run():
+                value = load(size)
+                # Sign extend sub-word loads
+                int_regs[dest_bank, dest_reg] = ((value << shift_left).view(np.int32) >> shift_right).view(np.uint32)
+        else:
+            def run():
+                store(size, int_regs[1, src_b])
+        return run
+
+    def _illegal(self, word, what):
+        def run(*_):
+            raise ValueError(f'Illegal instruction 0x{word:08x} ({what}).')
+        run.name = 'illegal'
+        run.unit = word & 3
+        run.fast = (run, None, None, None)
+        return run
+
+    def compile(self, program) -> tuple:
+        """ Decodes a program once into its per-PC dispatch table and its
+        static statistics, cached by program contents.
+
+        :return: (tuple) (steps, table, counts): the decoded closures,
+                (function, a, b, out) entries and
+                {(unit, name): instructions} """
+
+        words = np.asarray(program, dtype=np.uint32)
+        key = words.tobytes()
+        compiled = self._programs.get(key)
+        if compiled is None:
+            steps = [self.decode(w) for w in words.tolist()]
+            counts = {}
+            for fn in steps:
+                counts[fn.unit, fn.name] = counts.get((fn.unit, fn.name), 0) + 1
+            compiled = self._programs[key] = (steps, [fn.fast for fn in steps], counts)
+        return compiled
+
+    # ------------------------------------------------------------------ #
+    # Execution
+    # ------------------------------------------------------------------ #
+
+    def run(self, program, trace=None) -> dict:
+        """ Executes a straight-line program.
+
+        :param program: uint32 words, or assembly text
+        :param trace: (Optional) list, receives one (index, word, fn, taken)
+                tuple per instruction; taken is the (warps, 4) branch mask
+                or None
+        :return: (dict) Accumulated statistics """
+
+        if isinstance(program, str):
+            program = self.assembler.assemble(program)
+        steps, table, counts = self.compile(program)
+
+        stats = self.stats
+        with np.errstate(all='ignore'):
+            if trace is None:
+                for f, a, b, out in table:
+                    f(a, b, out=out)
+            else:
+                words = np.asarray(program, dtype=np.uint32).tolist()
+                for index, (word, fn) in enumerate(zip(words, steps)):
+                    trace.append((index, word, fn, fn()))
+
+        # Static accounting, kept out of the execution loop
+        stats['instructions'] += len(steps)
+        for (unit, name), count in counts.items():
+            stats['cycles'] += CYCLE_COST[unit] * count
+            stats['per_unit'][TYPE_NAMES[unit]] += count
+            stats['per_opcode'][name] = stats['per_opcode'].get(name, 0) + count
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a TauriISA program on the instruction-set simulator')
+    parser.add_argument('program', help='Assembly source, .bin or $readmemh image')
+    parser.add_argument('-w', '--warps', type=int, default=1, help='4-lane register states run together')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='Run the program N times (throughput)')
+    parser.add_argument('--dump', action='store_true', help='Print non-zero registers of warp 0')
+    args = parser.parse_args()
+
+    import time
+    iss = TauriISS(warps=args.warps)
+    path = Path(args.program)
+    words = load_words(path) if path.suffix in ('.bin', '.hex', '.mem') else iss.assembler.assemble(path.read_text())
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        stats = iss.run(words)
+    elapsed = time.perf_counter() - start
+
+    print(f"{stats['instructions']} instructions, ~{stats['cycles']} cycles, {elapsed:.3f} s "
+          f"({stats['instructions'] / elapsed / 1e6:.2f} M instr/s, "
+          f"{stats['instructions'] * args.warps * LANES / elapsed / 1e6:.2f} M lane-ops/s)")
+    print('per unit:  ', stats['per_unit'])
+    print('per opcode:', dict(sorted(stats['per_opcode'].items(), key=lambda kv: -kv[1])))
+    if args.dump:
+        for bank, prefix in enumerate('ab'):
+            for r in range(32):
+                if iss.int_regs[bank, r, 0].any():
+                    print(f'int {prefix}{r:<2} {iss.int_regs[bank, r, 0].view(np.int32)}')
+                if iss.fp_regs[bank, r, 0].any():
+                    print(f'fp  {prefix}{r:<2} {float24_to_float32(iss.fp_regs[bank, r, 0])}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 from colorama import init as colorama_init
 from colorama import Fore, Back, Style
 
+from mods.port_mods import dut_interface
+
 
 colorama_init(autoreset=True)
 
@@ -59,15 +61,25 @@ def log_progress(dut, test_count, test_iters, frac=10):
         color_log(dut, f'Progress (test_alpha_compute): {test_count} / {test_iters}')
 
 
-def list_signals(dut):
-    """ Prints all signals and parameters in the DUT
+def list_signals(dut, interface=None):
+    """ Prints all signals and parameters in the DUT. Only the ports are
+    listed when the module header could be parsed (see `mods.port_mods`),
+    otherwise every attribute of the DUT is inspected.
 
     :param dut: The DUT
+    :param interface: (Optional) Interface descriptor, looked up from the
+            DUT name when None
     :return: None """
 
+    interface = interface or dut_interface(dut)
+    if interface is not None:
+        names = [port['name'] for port in interface['ports']]
+    else:
+        names = dir(dut)
+
     # Iterate over all attributes in the DUT
     i = 0
-    for attribute_name in dir(dut):
+    for attribute_name in names:
         # Get the attribute (signal, variable, etc.)
         attribute = getattr(dut, attribute_name)
         
@@ -81,14 +93,35 @@ def list_signals(dut):
                 color_log(dut, '')
 
 
-def get_in_out_ports(dut):
+def get_in_out_ports(dut, interface=None, internal=False):
     """ Takes a DUT, returns its input / output ports and internal signals
     in 3 lists of strings.
+
+    Directions come from the module header when it can be parsed (see
+    `mods.port_mods`), so ports like `buf_addr` or `data_r_valid` are
+    classified correctly and the DUT is not reflected over. Otherwise
+    the `_i` / `_o` suffix is used.
     
     :param dut: The DUT
+    :param interface: (Optional) Interface descriptor, looked up from the
+            DUT name when None
+    :param internal: (bool) Also collect internal signals when using a
+            descriptor (needs a walk over the DUT)
     :return in_ports: (list[str]) eg ['clk_i', 'resetn_i']
     :return out_ports: (list[str]) eg ['data_o', 'flag_o']
     :return internal_signals: (list[str]) eg ['intermediate_result'] """
+
+    interface = interface or dut_interface(dut)
+    if interface is not None:
+        ports = interface['ports']
+        in_ports = [p['name'] for p in ports if p['direction'] in ('input', 'inout')]
+        out_ports = [p['name'] for p in ports if p['direction'] == 'output']
+        internal_signals = []
+        if internal:
+            known = set(in_ports) | set(out_ports)
+            internal_signals = [name for name in dir(dut) if not name.startswith('_') and name not in known
+                                and hasattr(getattr(dut, name), 'value')]
+        return in_ports, out_ports, internal_signals
     
     in_ports = []
     out_ports = []
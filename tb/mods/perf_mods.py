@@ -0,0 +1,145 @@
+import json
+from os import environ
+from pathlib import Path
+
+import numpy as np
+import cocotb
+from cocotb.triggers import RisingEdge, ReadOnly
+
+
+def resolve_handle(dut, path:str):
+    """ Resolves a dotted hierarchical path (e.g. 'u_zbuf.curr_state')
+    under the DUT once, so per-cycle sampling skips the attribute lookup.
+
+    :param dut: The DUT
+    :param path: (str) Signal path relative to the DUT
+    :return: The signal handle """
+
+    handle = dut
+    for name in path.split('.'):
+        handle = getattr(handle, name)
+    return handle
+
+
+def read_int(handle, default=0):
+    """ Reads a signal as an int, mapping X/Z to `default`. """
+
+    try:
+        return handle.value.integer
+    except ValueError:
+        return default
+
+
+def report_dir():
+    """ Directory the current cocotb run writes results.xml to
+    (falls back to the working directory). """
+
+    results = environ.get('COCOTB_RESULTS_FILE')
+    return Path(results).parent if results else Path.cwd()
+
+
+class PerfMonitor:
+    """ Cycle-accurate performance monitor. Samples handshake and FSM
+    state signals on every rising edge and reports per-stage utilisation,
+    stall cycles, state occupancy and fragments per cycle.
+
+    Each stage is a dict with any of the keys:
+        'valid':    signal high while the stage holds work
+        'busy':     stall when valid and busy are both high (e.g. genpix busy_i)
+        'ready':    stall when valid is high and ready is low (e.g. data_w_ready)
+        'state':    FSM state register (e.g. 'curr_state')
+        'states':   {encoding: name} for the state register
+        'fragment': signal counted as one fragment per non-stalled high cycle
+
+    Usage:
+        perf = PerfMonitor(dut, dut.clk_i, {'zbuf': {'state': 'curr_state', 'states': {...}}})
+        perf.start()
+        ...
+        perf.stop()
+        perf.write_json('test_name') """
+
+    def __init__(self, dut, clock, stages:dict):
+        self.dut = dut
+        self.clock = clock
+        self.stages = stages
+
+        # Flatten every referenced signal into one sample row
+        self._paths = []
+        for spec in stages.values():
+            for key in ('valid', 'busy', 'ready', 'state', 'fragment'):
+                if key in spec and spec[key] not in self._paths:
+                    self._paths.append(spec[key])
+        self._handles = [resolve_handle(dut, p) for p in self._paths]
+        self._column = {p: i for i, p in enumerate(self._paths)}
+        self._rows = []
+        self._task = None
+
+    def start(self):
+        """ Starts sampling in the background. """
+
+        self._rows = []
+        self._task = cocotb.start_soon(self._sample())
+        return self
+
+    def stop(self):
+        """ Stops sampling. """
+
+        if self._task is not None:
+            self._task.kill()
+            self._task = None
+
+    async def _sample(self):
+        handles = self._handles
+        rows = self._rows
+        while True:
+            await RisingEdge(self.clock)
+            await ReadOnly()
+            rows.append([read_int(h) for h in handles])
+
+    def report(self) -> dict:
+        """ Summarises the samples collected so far.
+
+        :return: (dict) {'cycles': N, 'stages': {name: {...}}} """
+
+        samples = np.asarray(self._rows, dtype=np.int64).reshape(-1, len(self._paths))
+        cycles = len(samples)
+        report = {'cycles': cycles, 'stages': {}}
+
+        def column(spec, key, default):
+            if key not in spec:
+                return np.full(cycles, default, dtype=bool)
+            return samples[:, self._column[spec[key]]] != 0
+
+        for name, spec in self.stages.items():
+            stats = {}
+            if 'valid' in spec:
+                valid = column(spec, 'valid', True)
+                stall = valid & (column(spec, 'busy', False) | ~column(spec, 'ready', True))
+                stats['active_cycles'] = int(valid.sum())
+                stats['stall_cycles'] = int(stall.sum())
+                stats['utilisation'] = float((valid & ~stall).sum() / cycles) if cycles else 0.0
+            if 'state' in spec:
+                codes = samples[:, self._column[spec['state']]]
+                names = spec.get('states', {})
+                counts = np.bincount(codes, minlength=max(names, default=0) + 1) if cycles else []
+                stats['state_cycles'] = {
+                    names.get(code, str(code)): int(count) for code, count in enumerate(counts) if count}
+            if 'fragment' in spec:
+                stalled = column(spec, 'busy', False) | ~column(spec, 'ready', True)
+                fragments = int((column(spec, 'fragment', False) & ~stalled).sum())
+                stats['fragments'] = fragments
+                stats['fragments_per_cycle'] = fragments / cycles if cycles else 0.0
+            report['stages'][name] = stats
+        return report
+
+    def write_json(self, name:str, directory=None) -> Path:
+        """ Writes the report as perf_<name>.json next to results.xml.
+
+        :param name: (str) Report name, usually the test name
+        :param directory: (Optional) Override the output directory
+        :return: Path of the written file """
+
+        path = Path(directory or report_dir()) / f'perf_{name}.json'
+        path.write_text(json.dumps(self.report(), indent=2))
+        self.dut._log.info(f'Performance report written to {path}')
+        return path
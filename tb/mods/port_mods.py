@@ -0,0 +1,306 @@
+import re
+import json
+import argparse
+from os import environ
+from pathlib import Path
+
+
+RTL_DIR = Path(__file__).parent.parent.parent / 'rtl'
+PORT_CACHE_DIR = Path(__file__).parent.parent / 'sim_build' / 'ports'
+# Bumped when descriptors change shape or content, invalidating cached JSON
+_CACHE_VERSION = 2
+
+_DIRECTIONS = ('input', 'output', 'inout')
+_NET_TYPES = ('wire', 'var', 'reg', 'logic', 'bit', 'tri', 'integer', 'int')
+_SV_LITERAL = re.compile(r"(\d*)'([sS]?)([bBoOdDhH])([0-9a-fA-F_xXzZ]+)")
+
+
+def clog2(value) -> int:
+    """ SystemVerilog $clog2 """
+
+    value = int(value)
+    return max(value - 1, 0).bit_length()
+
+
+def _strip_comments(text:str) -> str:
+    text = re.sub(r'/\*.*?\*/', ' ', text, flags=re.S)
+    return re.sub(r'//[^\n]*', ' ', text)
+
+
+def _split_top_level(text:str, sep=',') -> list:
+    """ Splits on `sep` outside of (), [] and {}. """
+
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch in '([{':
+            depth += 1
+        elif ch in ')]}':
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    if ''.join(current).strip():
+        parts.append(''.join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _balanced(text:str, start:int) -> int:
+    """ Index just past the parenthesis group opening at text[start]. """
+
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == '(':
+            depth += 1
+        elif text[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    raise ValueError('Unbalanced parentheses in module header.')
+
+
+def eval_expr(expr:str, params:dict):
+    """ Evaluates a constant SystemVerilog expression (parameter
+    defaults, range bounds). Returns None when it cannot be resolved.
+
+    :param expr: (str) e.g. '4*WIDTH-1', '$clog2(X_RES)'
+    :param params: (dict) Known parameter values """
+
+    def literal(m):
+        base = {'b': 2, 'o': 8, 'd': 10, 'h': 16}[m.group(3).lower()]
+        digits = m.group(4).replace('_', '')
+        if re.search('[xXzZ]', digits):
+            return '0'
+        return str(int(digits, base))
+
+    py = _SV_LITERAL.sub(literal, expr).replace('$clog2', 'clog2')
+    py = re.sub(r"'([01])", r'\1', py)  # '0 / '1 fill literals
+    py = re.sub(r'(?<![/])/(?![/])', '//', py)
+    try:
+        return eval(py, {'__builtins__': {}}, {'clog2': clog2, **params})
+    except Exception:
+        return None
+
+
+def _parse_parameters(text:str, overrides:dict=None) -> tuple:
+    """ Parameter values in declaration order, each default evaluated
+    against the values before it, so defaults like $clog2(X_RES) follow
+    an overridden X_RES.
+
+    :return: (dict, dict) Values, raw default expressions """
+
+    overrides = overrides or {}
+    params, defaults = {}, {}
+    for item in _split_top_level(text):
+        item = re.sub(r'^\s*(parameter|localparam)\b', '', item).strip()
+        if '=' not in item:
+            continue
+        lhs, rhs = item.split('=', 1)
+        name = lhs.split()[-1]
+        rhs = rhs.strip()
+        defaults[name] = rhs
+        if name in overrides:
+            params[name] = overrides[name]
+        elif rhs.startswith('"'):
+            params[name] = rhs.strip('"')
+        else:
+            value = eval_expr(rhs, params)
+            params[name] = value if value is not None else rhs
+    return params, defaults
+
+
+def _parse_ports(text:str, params:dict) -> list:
+    ports = []
+    current = None  # inherited by comma-continued declarations
+    for item in _split_top_level(text):
+        dims = re.findall(r'\[([^\]]*)\]', item)
+        head = re.sub(r'\[[^\]]*\]', ' ', item).split()
+        if not head:
+            continue
+        name = head[-1]
+        keywords = head[:-1]
+
+        if keywords and keywords[0] in _DIRECTIONS:
+            packed_count = len(re.findall(r'\[[^\]]*\]', item.split(name)[0]))
+            current = {
+                'direction': keywords[0],
+                'signed': 'signed' in keywords,
+                'type': ' '.join(k for k in keywords[1:] if k in _NET_TYPES) or 'wire',
+                'packed': dims[:packed_count],
+            }
+            unpacked = dims[packed_count:]
+        elif current is None:
+            raise ValueError(f"Port '{item}' has no direction (non-ANSI headers are not supported).")
+        else:
+            unpacked = dims
+
+        width = 1
+        msb = lsb = 0
+        for i, rng in enumerate(current['packed']):
+            hi, lo = (eval_expr(b, params) for b in rng.split(':'))
+            if hi is None or lo is None:
+                width = None
+                break
+            if i == 0:
+                msb, lsb = hi, lo
+            width *= abs(hi - lo) + 1
+        if width is not None and len(current['packed']) > 1:
+            msb, lsb = width - 1, 0
+
+        unpacked_dims = []
+        for rng in unpacked:
+            bounds = [eval_expr(b, params) for b in rng.split(':')]
+            unpacked_dims.append(abs(bounds[0] - bounds[1]) + 1 if None not in bounds and len(bounds) == 2
+                                 else bounds[0])
+
+        ports.append({
+            'name': name,
+            'direction': current['direction'],
+            'width': width,
+            'msb': msb,
+            'lsb': lsb,
+            'signed': current['signed'],
+            'type': current['type'],
+            'packed': current['packed'],
+            'unpacked': unpacked_dims,
+        })
+    return ports
+
+
+def parse_module_header(text:str, module:str=None, overrides:dict=None) -> dict:
+    """ Parses an ANSI-style module header.
+
+    :param text: (str) SystemVerilog source
+    :param module: (Optional) Module name, the first module in the file when None
+    :param overrides: (Optional) Parameter values overriding the defaults
+    :return: (dict) {'module', 'parameters', 'defaults' (raw default
+            expressions), 'ports': [{name, direction, width, msb, lsb,
+            signed, type, packed, unpacked}, ...]} """
+
+    text = _strip_comments(text)
+    pattern = r'\bmodule\s+(' + (re.escape(module) if module else r'\w+') + r')\b'
+    m = re.search(pattern, text)
+    if m is None:
+        raise ValueError(f"Module {module or ''} not found.")
+    pos = m.end()
+
+    params, defaults = {}, {}
+    rest = text[pos:].lstrip()
+    offset = len(text) - len(rest)
+    if rest.startswith('#'):
+        open_paren = text.index('(', offset)
+        close = _balanced(text, open_paren)
+        params, defaults = _parse_parameters(text[open_paren + 1:close - 1], overrides)
+        offset = close
+    params.update({k: v for k, v in (overrides or {}).items() if k not in params})
+
+    open_paren = text.index('(', offset)
+    close = _balanced(text, open_paren)
+    ports = _parse_ports(text[open_paren + 1:close - 1], params)
+    return {'module': m.group(1), 'parameters': params, 'defaults': defaults, 'ports': ports}
+
+
+def find_module_source(module:str, rtl_dir:Path=RTL_DIR) -> Path:
+    """ Finds {module}.sv under rtl/ (same search as runner.py). """
+
+    for candidate in Path(rtl_dir).rglob(f'{module}.sv'):
+        if candidate.is_file():
+            return candidate
+    raise FileNotFoundError(f'Cannot find {module}.sv anywhere under {rtl_dir}.')
+
+
+def get_interface(module:str, overrides:dict=None, source:Path=None, cache_dir:Path=PORT_CACHE_DIR) -> dict:
+    """ Returns the interface descriptor of a module, parsing its header
+    only when the source changed since the cached JSON was written.
+
+    :param module: (str) Module name
+    :param overrides: (Optional) Parameter overrides (as passed to the build)
+    :param source: (Optional) Source file, searched under rtl/ when None
+    :return: (dict) see `parse_module_header()`, plus 'file' """
+
+    source = Path(source) if source else find_module_source(module)
+    stat = source.stat()
+    key = f'{module}' + ''.join(f'_{k}{v}' for k, v in sorted((overrides or {}).items()))
+    cache_file = Path(cache_dir) / f'{key}.json'
+    stamp = [str(source.resolve()), stat.st_mtime_ns, stat.st_size, _CACHE_VERSION]
+
+    if cache_file.exists():
+        cached = json.loads(cache_file.read_text())
+        if cached.get('stamp') == stamp:
+            return cached['interface']
+
+    interface = parse_module_header(source.read_text(), module, overrides)
+    interface['file'] = str(source)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(json.dumps({'stamp': stamp, 'interface': interface}, indent=1))
+    return interface
+
+
+def port_fields(interface:dict, direction:str='input', exclude=()) -> list:
+    """ Bundle fields for every port in one direction, in declaration
+    order, ready for `SignalBundle` (unpacked arrays are skipped).
+
+    :param interface: (dict) From `get_interface()`
+    :param direction: (str) 'input', 'output' or 'inout'
+    :param exclude: (iterable) Port names to leave out, e.g. clocks
+    :return: (list[tuple]) [(name, width, signed), ...] """
+
+    return [(p['name'], p['width'], p['signed']) for p in interface['ports']
+            if p['direction'] == direction and p['name'] not in exclude and not p['unpacked']]
+
+
+def run_overrides() -> dict:
+    """ Parameter values of the current run, as single_test exports them
+    (TB_PARAM_<NAME>, from runner -p). """
+
+    overrides = {}
+    for key, value in environ.items():
+        if key.startswith('TB_PARAM_'):
+            number = eval_expr(value, {})
+            overrides[key[len('TB_PARAM_'):]] = number if number is not None else value
+    return overrides
+
+
+def dut_interface(dut, overrides:dict=None):
+    """ Interface descriptor of a cocotb toplevel, or None when its
+    source cannot be found.
+
+    :param overrides: (Optional) Parameter values, the run's `run_overrides()` when None """
+
+    if overrides is None:
+        overrides = run_overrides()
+    try:
+        return get_interface(dut._name, overrides)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dump interface descriptors of RTL modules')
+    parser.add_argument('modules', nargs='*', help='Module names (all of rtl/ when empty)')
+    parser.add_argument('-p', '--param', action='append', default=[], help='Parameter override KEY=VALUE')
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.param:
+        key, value = item.split('=', 1)
+        overrides[key] = eval_expr(value, {}) if eval_expr(value, {}) is not None else value
+
+    modules = args.modules or sorted({p.stem for p in RTL_DIR.rglob('*.sv')})
+    for module in modules:
+        try:
+            interface = get_interface(module, overrides)
+        except (ValueError, FileNotFoundError) as e:
+            print(f'{module}: skipped ({e})')
+            continue
+        print(f"{interface['module']} ({interface['file']})")
+        for name, value in interface['parameters'].items():
+            print(f'  parameter {name} = {value}')
+        for p in interface['ports']:
+            sign = 's' if p['signed'] else ' '
+            print(f"  {p['direction']:<6} {sign} {str(p['width']):>4}  {p['name']}")
+
+
+if __name__ == '__main__':
+    main()
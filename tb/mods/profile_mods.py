@@ -0,0 +1,198 @@
+import re
+import json
+import pstats
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+from collections import defaultdict
+
+
+# Where the wall-clock time of a run goes, in report order
+CATEGORIES = ['rtl_eval', 'vpi', 'reference_model', 'logging', 'testbench', 'cocotb', 'other', 'unattributed']
+
+# gprof flat profile row: % time, cumulative s, self s, [calls, self/call, total/call,] name
+_FLAT_ROW = re.compile(r'^\s*([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+(?:(\d+)\s+([\d.]+)\s+([\d.]+)\s+)?(\S.*)$')
+
+# Python self time matching these goes to logging rather than the testbench
+_LOGGING = ('eventlog_mods', 'logging_mods', '/logging/', 'tqdm', 'colorama', 'builtins.print')
+
+
+def gprof_flat(binary, gmon) -> list:
+    """ Flat profile of the -prof-c model (gprof -b -p).
+
+    :return: (list) {'name', 'self_seconds', 'calls'} per function, slowest first """
+
+    if shutil.which('gprof') is None:
+        raise FileNotFoundError('gprof not found')
+    out = subprocess.run(['gprof', '-b', '-p', str(binary), str(gmon)], check=True, capture_output=True,
+                         text=True).stdout
+    rows = []
+    for line in out.splitlines():
+        match = _FLAT_ROW.match(line)
+        if match:
+            rows.append({'name': match.group(7).strip(), 'self_seconds': float(match.group(3)),
+                         'calls': int(match.group(4)) if match.group(4) else None})
+    return rows
+
+
+def classify_native(name:str) -> str:
+    """ Category of a model function: the Verilated design itself (Vtop
+    classes), the VPI layer cocotb drives it through, or the rest of the
+    Verilator runtime and libc. """
+
+    if 'vpi' in name.lower():
+        return 'vpi'
+    if re.match(r'(\w+::)?Vtop\w*', name):
+        return 'rtl_eval'
+    return 'other'
+
+
+def classify_python(filename:str, function:str) -> str:
+    """ Category of a Python function by where it lives. Builtins and
+    library code are 'other' here and take their callers' category in
+    `python_profile()`, except the simulator handle methods (VPI calls). """
+
+    where = f'{filename}:{function}'
+    if 'cocotb.simulator' in function or 'gpi' in function.lower():
+        return 'vpi'
+    if any(key in where for key in _LOGGING):
+        return 'logging'
+    if '/ref_model/' in filename or filename.endswith('_ref.py'):
+        return 'reference_model'
+    if '/cocotb/' in filename:
+        return 'cocotb'
+    if filename.endswith('_tb.py') or '/mods/' in filename:
+        return 'testbench'
+    return 'other'
+
+
+def python_profile(path) -> tuple:
+    """ Self time of the cProfile stats cocotb dumps (COCOTB_ENABLE_PROFILING)
+    per category. Time in library code and builtins (numpy, struct ...)
+    goes up the call graph to the categories of its callers, split by the
+    time each caller spent in it.
+
+    :return: (dict, list) Seconds per category, (seconds, category, function) rows slowest first """
+
+    stats = pstats.Stats(str(path)).stats
+    shares = {}
+
+    def share(key) -> dict:
+        if key in shares:
+            return shares[key]
+        filename, _, function = key
+        own = classify_python(filename, function)
+        callers = stats[key][4] if key in stats else {}
+        shares[key] = {own: 1.0}    # also ends recursion cycles
+        if own == 'other' and callers:
+            total = sum(caller[2] for caller in callers.values())
+            combined = defaultdict(float)
+            for caller_key, caller in callers.items():
+                weight = caller[2] / total if total else 1 / len(callers)
+                for category, fraction in share(caller_key).items():
+                    combined[category] += weight * fraction
+            shares[key] = dict(combined)
+        return shares[key]
+
+    seconds = defaultdict(float)
+    functions = []
+    for key, (_, _, self_time, _, _) in stats.items():
+        split = share(key)
+        for category, fraction in split.items():
+            seconds[category] += self_time * fraction
+        filename, line, function = key
+        functions.append((self_time, max(split, key=split.get), f'{Path(filename).name}:{line}({function})'))
+    return dict(seconds), sorted(functions, reverse=True)
+
+
+def profile_report(build_dir, top:int=15) -> dict:
+    """ Attributes the wall-clock time of the last run in `build_dir` to
+    RTL evaluation, VPI, reference model, logging, testbench and cocotb.
+
+    Native time comes from gprof samples of the -prof-c model (gmon.out,
+    CPU time), Python time from cocotb's cProfile dump (test_profile.pstat)
+    and the wall clock from timing.json; whatever neither profile saw (the
+    simulator scheduler, GPI glue, startup) is 'unattributed'. The native
+    VPI functions run inside the Python calls to cocotb.simulator, so VPI
+    is the larger of the two rather than their sum.
+
+    :param top: (Optional) Slowest functions listed per side
+    :return: (dict) 'seconds' and 'share' per category, 'native' and 'python' top functions """
+
+    build_dir = Path(build_dir)
+    seconds = dict.fromkeys(CATEGORIES, 0.0)
+    report = {'build_dir': str(build_dir), 'native': [], 'python': [], 'missing': []}
+
+    gmon, binary = build_dir / 'gmon.out', build_dir / 'Vtop'
+    if not (gmon.exists() and binary.exists()):
+        report['missing'].append('gmon.out')
+    else:
+        try:
+            rows = gprof_flat(binary, gmon)
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            rows = None
+            report['missing'].append('gprof')
+        for row in rows or []:
+            seconds[classify_native(row['name'])] += row['self_seconds']
+        report['native'] = [{**row, 'category': classify_native(row['name'])} for row in (rows or [])[:top]]
+
+    pstat = build_dir / 'test_profile.pstat'
+    if pstat.exists():
+        python_seconds, functions = python_profile(pstat)
+        for category, value in python_seconds.items():
+            seconds[category] = max(seconds[category], value) if category == 'vpi' else seconds[category] + value
+        report['python'] = [{'self_seconds': t, 'category': c, 'name': n} for t, c, n in functions[:top]]
+    else:
+        report['missing'].append('test_profile.pstat')
+
+    timing = build_dir / 'timing.json'
+    wall = json.loads(timing.read_text()).get('test_seconds') if timing.exists() else None
+    profiled = sum(seconds.values())
+    seconds['unattributed'] = max((wall or profiled) - profiled, 0.0)
+    total = wall or profiled or 1.0
+    report.update(wall_seconds=wall, seconds=seconds, share={k: v / total for k, v in seconds.items()})
+    return report
+
+
+def format_report(report:dict) -> str:
+    wall = report['wall_seconds']
+    lines = [f"{report['build_dir']}: " + (f'{wall:.2f} s wall clock' if wall else 'no timing.json')]
+    for category in CATEGORIES:
+        lines.append(f"  {category:<16} {report['seconds'][category]:9.3f} s  {report['share'][category]:6.1%}")
+    for side in ('native', 'python'):
+        if report[side]:
+            lines.append(f'  slowest {side} functions (self time):')
+            lines += [f"    {row['self_seconds']:8.3f} s  {row['category']:<16} {row['name'][:90]}"
+                      for row in report[side][:10]]
+    if report['missing']:
+        lines.append(f"  missing: {', '.join(report['missing'])}")
+    return '\n'.join(lines)
+
+
+def write_report(build_dir, out_dir, name:str='profile') -> dict:
+    """ `profile_report()` of `build_dir` as <name>.json and <name>.txt in `out_dir`. """
+
+    report = profile_report(build_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / f'{name}.json').write_text(json.dumps(report, indent=2))
+    (out_dir / f'{name}.txt').write_text(format_report(report) + '\n')
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Wall-clock attribution of a --profile run')
+    parser.add_argument('build_dir', nargs='?', default='sim_build',
+                        help='sim_build folder holding gmon.out, test_profile.pstat and timing.json')
+    parser.add_argument('-o', '--output', type=str, default=None, help='Write the report as JSON')
+    args = parser.parse_args()
+
+    report = profile_report(args.build_dir)
+    print(format_report(report))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,23 @@
-from numpy import random, clip
+from numpy import (random, clip, array, zeros, isin, where, arange, maximum, convolve, ones, roll, asarray, exp,
+                   log, concatenate, argsort, round as round_)
 
+from mods.isa_mods import Assembler, FIELDS_DTYPE, TYPE_NAMES, ALU_BRANCHES, FPU_UNARY
 
-def generate_random_hex(width, range_, size, distribution='uniform'):
+
+def generate_random_hex(width, range_, size, distribution='uniform', rng=None):
     """ Generate a list of random hex numbers.
 
     :param width: Bit width of the generated hex numbers
     :param range_: Range of the generated hex numbers (tuple of two integers, start and end)
     :param size: Sample size, i.e., length of the returned list
-    :param distribution: (Optional) Distribution type for random integers. Can be 'uniform' or 'normal'
+    :param distribution: (Optional) Distribution type for random integers. Can be 'uniform', 'normal',
+            'boundary' (the range ends and their neighbours) or 'log' (log-uniform distance from the
+            range start, so small and large magnitudes are equally likely)
+    :param rng: (Optional) numpy Generator
     :return: rand_hex_list - List of random hex numbers """
     
     # Initialize the random number generator
-    rng = random.default_rng()
+    rng = rng or random.default_rng()
     
     # Determine the maximum value based on the bit width
     max_value = 2**width - 1
@@ -28,10 +34,241 @@ def generate_random_hex(width, range_, size, distribution='uniform'):
         stddev = (range_[1] - range_[0]) / 6  # Assuming approx 99.7% of values in this range
         rand_ints = rng.normal(loc=mean, scale=stddev, size=size).astype(int)
         rand_ints = clip(rand_ints, range_[0], range_[1])  # Ensure values stay within range
+    elif distribution == 'boundary':
+        edges = array([range_[0], range_[0] + 1, range_[1] - 2, range_[1] - 1])
+        rand_ints = clip(edges[rng.integers(0, 4, size)], range_[0], range_[1] - 1)
+    elif distribution == 'log':
+        span = max(range_[1] - 1 - range_[0], 1)
+        rand_ints = range_[0] + round_(exp(rng.uniform(0, log(span + 1), size)) - 1).astype(int)
+        rand_ints = clip(rand_ints, range_[0], range_[1] - 1)
     else:
-        raise ValueError("Unsupported distribution. Choose 'uniform' or 'normal'.")
+        raise ValueError("Unsupported distribution. Choose 'uniform', 'normal', 'boundary' or 'log'.")
     
     # Convert the generated integers to hexadecimal
     rand_hex_list = [int(num) for num in rand_ints]
     
     return rand_hex_list
+
+
+def _opcode_table(assembler):
+    """ Opcodes per instruction type, with ALU branches kept apart. """
+
+    opcodes = {t: [] for t in TYPE_NAMES}
+    branches = []
+    for mnemonic, (itype, opc) in assembler.table.items():
+        if mnemonic in ALU_BRANCHES:
+            branches.append(opc)
+        else:
+            opcodes[itype].append(opc)
+    return opcodes, branches
+
+
+def random_program(size, units=('ALU', 'FPU'), regs=8, imm_rate=0.5, branch_rate=0.1, rng=None):
+    """ Generate a random straight-line TauriISA program.
+
+    :param size: Number of instructions
+    :param units: (Optional) Units to draw from, any of 'ALU', 'FPU', 'SFU', 'MEM'
+    :param regs: (Optional) Registers used per bank (a0..a{regs-1}, b0..b{regs-1})
+    :param imm_rate: (Optional) Fraction of ALU instructions using an immediate
+    :param branch_rate: (Optional) Fraction of ALU instructions that are branches
+    :param rng: (Optional) numpy Generator
+    :return: (np.ndarray) uint32 instruction words """
+
+    rng = rng or random.default_rng()
+    assembler = Assembler()
+    opcodes, branches = _opcode_table(assembler)
+    type_of = {name: t for t, name in TYPE_NAMES.items()}
+
+    types = array([type_of[u] for u in units])[rng.integers(0, len(units), size)]
+    is_branch = (types == type_of['ALU']) & (rng.random(size) < branch_rate)
+    return assembler.encode(_random_fields(types, is_branch, opcodes, branches, regs, imm_rate, rng))
+
+
+def _random_fields(types, is_branch, opcodes, branches, regs, imm_rate, rng):
+    """ Random opcodes / registers for a given sequence of instruction types. """
+
+    size = len(types)
+    type_of = {name: t for t, name in TYPE_NAMES.items()}
+    fields = zeros(size, dtype=FIELDS_DTYPE)
+    fields['type'] = types
+    for itype, choices in opcodes.items():
+        rows = types == itype
+        fields['opc'][rows] = array(choices or [0])[rng.integers(0, max(len(choices), 1), rows.sum())]
+
+    fields['opc'][is_branch] = array(branches)[rng.integers(0, len(branches), is_branch.sum())]
+    fields['dest'] = rng.integers(0, 2, size) * 32 + rng.integers(1, regs, size)
+    # ALU results may target index 0, whose write-back alu.sv drops
+    is_alu = types == type_of['ALU']
+    fields['dest'][is_alu] = rng.integers(0, 2, is_alu.sum()) * 32 + rng.integers(0, regs, is_alu.sum())
+    fields['dest'][is_branch] = 0
+    fields['src_a'] = rng.integers(0, regs, size)
+    fields['src_b'] = rng.integers(0, regs, size)
+    fields['imm_en'] = (types == type_of['ALU']) & (rng.random(size) < imm_rate)
+    fields['imm'] = rng.integers(-1024, 1024, size)
+    # Memory accesses all use a0 as the address register
+    is_mem = isin(types, [type_of['MEM']])
+    fields['src_a'][is_mem] = 0
+    return fields
+
+
+def hazard_program(size, distance=1, raw_rate=0.5, bank_rate=0.0, mix=None, interleave=0.5,
+                   branch_burst=0.0, burst_len=4, regs=8, imm_rate=0.3, rng=None):
+    """ Generate a TauriISA program biased towards issue hazards.
+
+    Dependencies are only injected between instructions of the same
+    register file (ALU -> ALU on the integer file, FPU / SFU -> FPU / SFU
+    on the float file), since those are the only pairs that can be RAW.
+
+    :param size: Number of instructions
+    :param distance: (Optional) Producer -> consumer distance in instructions,
+            an int or a sequence drawn from uniformly per dependency
+    :param raw_rate: (Optional) Fraction of instructions made to read the
+            result of the instruction `distance` before them
+    :param bank_rate: (Optional) Fraction of instructions writing the same
+            bank as the previous instruction (one write port per bank)
+    :param mix: (Optional) {'ALU': weight, 'FPU': weight, 'SFU': weight, 'MEM': weight}
+    :param interleave: (Optional) Probability of re-drawing the unit at each
+            instruction, 0 gives a single unit, 1 independent draws
+    :param branch_burst: (Optional) Probability of starting a burst of branches
+    :param burst_len: (Optional) Branches per burst
+    :param regs: (Optional) Registers used per bank
+    :param imm_rate: (Optional) Fraction of ALU instructions using an immediate
+    :param rng: (Optional) numpy Generator
+    :return: (np.ndarray) uint32 instruction words """
+
+    rng = rng or random.default_rng()
+    assembler = Assembler()
+    opcodes, branches = _opcode_table(assembler)
+    type_of = {name: t for t, name in TYPE_NAMES.items()}
+    mix = mix or {'ALU': 0.5, 'FPU': 0.4, 'SFU': 0.1}
+    weights = array(list(mix.values()), dtype=float)
+
+    # Unit sequence: a Markov chain that keeps the previous unit unless re-drawn
+    drawn = array([type_of[u] for u in mix])[rng.choice(len(mix), size, p=weights / weights.sum())]
+    redraw = rng.random(size) < interleave
+    redraw[0] = True
+    types = drawn[maximum.accumulate(where(redraw, arange(size), 0))]
+
+    starts = rng.random(size) < branch_burst
+    is_branch = convolve(starts, ones(burst_len, dtype=int))[:size] > 0
+    types[is_branch] = type_of['ALU']
+    fields = _random_fields(types, is_branch, opcodes, branches, regs, imm_rate, rng)
+
+    # Same-bank writes back to back
+    same_bank = rng.random(size) < bank_rate
+    same_bank[0] = False
+    same_bank &= ~is_branch
+    prev_bank = roll(fields['dest'] & 32, 1)
+    fields['dest'][same_bank] = (fields['dest'][same_bank] & 31) | prev_bank[same_bank]
+
+    # RAW dependencies on the instruction `distance` back
+    dist = asarray(distance).reshape(-1)[rng.integers(0, asarray(distance).size, size)]
+    producer = arange(size) - dist
+    regfile = where(types == type_of['ALU'], 0, where(types == type_of['MEM'], 2, 1))
+    raw = (rng.random(size) < raw_rate) & (producer >= 0)
+    producer = clip(producer, 0, None)
+    raw &= (regfile == regfile[producer]) & (regfile != 2) & ~is_branch[producer]
+
+    # SFU consumers read bank A only: move their producer's result there
+    unary = (types == type_of['SFU']) | (isin(fields['opc'], _fpu_unary(assembler)) & (types == type_of['FPU']))
+    to_a = raw & unary
+    fields['dest'][producer[to_a]] &= 31
+
+    dest = fields['dest'][producer]
+    read_a = raw & (dest < 32)
+    read_b = raw & (dest >= 32)
+    fields['src_a'][read_a] = dest[read_a] & 31
+    fields['src_b'][read_b] = dest[read_b] & 31
+    fields['imm_en'][read_b] = 0
+    return assembler.encode(fields)
+
+
+def _fpu_unary(assembler):
+    return [opc for mnemonic, (itype, opc) in assembler.table.items() if mnemonic in FPU_UNARY]
+
+
+class CoverageDirected:
+    """ Coverage-directed stimulus. Each batch, every generator proposes
+    candidates in proportion to its weight, the candidates are scored
+    against the current coverage (`Coverage.novelty()`: unhit bins count
+    most) and the best `n` are kept. Generator weights then move towards
+    the generators whose picks scored, so generation drifts to whatever
+    still reaches unhit bins (edge cases, boundary values, rare patterns)
+    and back to the others once those close.
+
+    Distributions are pluggable: a generator is any f(count, rng) -> rows
+    array, and `classify(rows)` maps rows to the coverage's cover point
+    values (the same function the testbench samples with).
+
+    :param coverage: (Coverage) Coverage being closed; rows are sampled into it by `commit()`
+    :param classify: f(rows) -> {cover point: values}
+    :param generators: {name: f(count, rng) -> (count, ...) array}
+    :param oversample: (Optional) Candidates generated per row kept
+    :param learning_rate: (Optional) Weight update step, 0 keeps the weights
+    :param floor: (Optional) Minimum share of every generator
+    :param rng: (Optional) numpy Generator
+
+    Usage:
+        cov = clipper_coverage()
+        gen = CoverageDirected(cov, clipper_samples, CLIPPER_GENERATORS, rng=rng)
+        while cov.coverage < 1.0:
+            rows = gen.next(64)
+            ...drive and check rows...
+            gen.commit(rows)          # only now counted as covered """
+
+    def __init__(self, coverage, classify, generators:dict, oversample:int=8, learning_rate:float=0.5,
+                 floor:float=0.02, rng=None):
+        self.coverage = coverage
+        self.classify = classify
+        self.generators = generators
+        self.oversample = oversample
+        self.learning_rate = learning_rate
+        self.floor = floor
+        self.rng = rng or random.default_rng()
+        self.weights = ones(len(generators)) / len(generators)
+        self.picked = dict.fromkeys(generators, 0)
+        self.history = []   # (rows so far, coverage) after each batch
+        self.rows = 0
+
+    def next(self, n:int):
+        """ The next `n` rows. They are not sampled into the coverage:
+        call `commit()` once they have been driven and checked. """
+
+        names = list(self.generators)
+        counts = self.rng.multinomial(n * self.oversample, self.weights)
+        parts, source = [], []
+        for i, (name, count) in enumerate(zip(names, counts)):
+            if count:
+                parts.append(asarray(self.generators[name](int(count), self.rng)))
+                source.append(zeros(count, dtype=int) + i)
+        candidates, source = concatenate(parts), concatenate(source)
+
+        # Best scores first, random order among equal scores
+        score = self.coverage.novelty(**self.classify(candidates))
+        order = argsort(-(score + 1e-9 * self.rng.random(len(score))), kind='stable')[:n]
+        rows = candidates[order]
+
+        # Weight of each generator: share of the novelty it contributed
+        gain = zeros(len(names))
+        for i in range(len(names)):
+            gain[i] = score[order][source[order] == i].sum()
+            self.picked[names[i]] += int((source[order] == i).sum())
+        if gain.sum() > 0:
+            target = gain / gain.sum()
+            self.weights = (1 - self.learning_rate) * self.weights + self.learning_rate * target
+        self.weights = maximum(self.weights, self.floor)
+        self.weights /= self.weights.sum()
+        return rows
+
+    def commit(self, rows):
+        """ Samples rows returned by `next()` into the coverage, once the
+        testbench has driven and checked them. """
+
+        self.coverage.sample_batch(**self.classify(rows))
+        self.rows += len(rows)
+        self.history.append((self.rows, self.coverage.coverage))
+
+    def report(self) -> dict:
+        return {'rows': self.rows, 'coverage': self.coverage.coverage,
+                'weights': dict(zip(self.generators, self.weights.tolist())),
+                'picked': self.picked, 'history': self.history}
@@ -0,0 +1,386 @@
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from mods.isa_mods import (Assembler, AsmError, ALU_BRANCHES, FPU_UNARY, MEM_STORES, TYPE_ALU, TYPE_FPU,
+                           TYPE_SFU, _REGISTER, _COMMENT, _parse_imm, parse_register, load_words)
+from mods.iss_mods import CYCLE_COST
+
+
+# Register files: a register is identified as file * 64 + bank * 32 + index
+FILE_INT, FILE_FP = 0, 1
+FILE_NAMES = ('int', 'fp')
+BANK_SIZE = 32
+NO_REG = -1
+# alu.sv only writes back when dest_i != 0: index 0 of either bank is never
+# handed out by the re-allocation pass, and a0 / b0 keep their names
+RESERVED_INDEX = 0
+
+# Ops whose two sources may be swapped to put them in the right slots
+COMMUTATIVE = {'add', 'xor', 'and', 'or', 'max', 'maxu', 'min', 'minu', 'beq', 'bne',
+               'fadd24', 'fmax24', 'fmin24', 'fmul24'}
+
+
+def register_name(reg:int) -> str:
+    return f"{'ab'[(reg >> 5) & 1]}{reg & 31}"
+
+
+def _full_name(reg:int) -> str:
+    return f'{FILE_NAMES[reg >> 6]} {register_name(reg)}'
+
+
+def parse_relaxed(source:str, assembler:Assembler=None) -> list:
+    """ Parses TauriISA assembly without the bank rule: either source slot
+    may name a bank A or bank B register, as code does before bank
+    assignment. Anything the assembler accepts parses the same way.
+
+    :return: (list[dict]) One row per instruction: mnemonic, dest and the
+            slot A / slot B sources as register ids (NO_REG when unused),
+            imm (slot B immediate or None), or raw for .word lines """
+
+    assembler = assembler or Assembler()
+    rows = []
+    for line_no, line in enumerate(source.splitlines(), 1):
+        code = _COMMENT.split(line, maxsplit=1)[0].strip()
+        if not code:
+            continue
+        mnemonic, _, rest = code.partition(' ')
+        mnemonic = mnemonic.lower()
+        ops = [op.strip() for op in rest.split(',')] if rest.strip() else []
+        if mnemonic == '.word':
+            rows.append({'mnemonic': mnemonic, 'raw': ops[0], 'dest': NO_REG, 'a': NO_REG, 'b': NO_REG,
+                         'imm': None, 'pinned': ()})
+            continue
+        if mnemonic not in assembler.table:
+            raise AsmError(f"unknown mnemonic '{mnemonic}'", line_no, line)
+        itype = assembler.table[mnemonic][0]
+
+        def reg(token, file):
+            return file << 6 | parse_register(token, None, line_no, line)
+
+        def operand_b(token, file):
+            if _REGISTER.match(token.lower()):
+                return reg(token, file), None
+            return NO_REG, _parse_imm(token, line_no, line)
+
+        def expect(n):
+            if len(ops) != n:
+                raise AsmError(f'{mnemonic} takes {n} operands, got {len(ops)}', line_no, line)
+
+        row = {'mnemonic': mnemonic, 'dest': NO_REG, 'a': NO_REG, 'b': NO_REG, 'imm': None, 'pinned': ()}
+        if itype == TYPE_ALU and mnemonic in ALU_BRANCHES:
+            expect(2)
+            row['a'] = reg(ops[0], FILE_INT)
+            row['b'], row['imm'] = operand_b(ops[1], FILE_INT)
+        elif itype == TYPE_ALU:
+            expect(3)
+            row['dest'], row['a'] = reg(ops[0], FILE_INT), reg(ops[1], FILE_INT)
+            row['b'], row['imm'] = operand_b(ops[2], FILE_INT)
+        elif itype in (TYPE_FPU, TYPE_SFU):
+            expect(2 if mnemonic in FPU_UNARY or itype == TYPE_SFU else 3)
+            row['dest'], row['a'] = reg(ops[0], FILE_FP), reg(ops[1], FILE_FP)
+            if len(ops) == 3:
+                row['b'] = reg(ops[2], FILE_FP)
+        elif mnemonic == 'fs24':
+            # Address and data share the index (integer and fp a<n>): keep both
+            expect(1)
+            row['a'] = reg(ops[0], FILE_INT)
+            row['pinned'] = (row['a'], FILE_FP << 6 | row['a'] & 63)
+        elif mnemonic in MEM_STORES:
+            expect(2)
+            row['a'], row['b'] = reg(ops[0], FILE_INT), reg(ops[1], FILE_INT)
+        elif mnemonic.startswith('tex'):
+            expect(3)
+            row['dest'], row['a'], row['b'] = reg(ops[0], FILE_FP), reg(ops[1], FILE_FP), reg(ops[2], FILE_FP)
+        else:
+            expect(2)
+            row['dest'] = reg(ops[0], FILE_FP if mnemonic == 'fl24' else FILE_INT)
+            row['a'] = reg(ops[1], FILE_INT)
+        rows.append(row)
+    return rows
+
+
+def format_relaxed(rows:list, mapping:dict=None) -> str:
+    """ Assembly text of parsed rows, registers renamed through `mapping`
+    ({register id: register id}). Commutative ops get their sources
+    swapped when that puts them in bank A / bank B order. """
+
+    mapping = mapping or {}
+    lines = []
+    for row in rows:
+        mnemonic = row['mnemonic']
+        if mnemonic == '.word':
+            lines.append(f"{'.word':<9} {row['raw']}")
+            continue
+        dest, a, b = (mapping.get(row[k], row[k]) for k in ('dest', 'a', 'b'))
+        if mnemonic in COMMUTATIVE and b != NO_REG and (a >> 5) & 1 and not (b >> 5) & 1:
+            a, b = b, a
+        ops = [register_name(r) for r in (dest, a) if r != NO_REG]
+        if b != NO_REG:
+            ops.append(register_name(b))
+        elif row['imm'] is not None:
+            ops.append(str(row['imm']))
+        lines.append(f"{mnemonic:<9} {', '.join(ops)}")
+    return '\n'.join(lines) + '\n'
+
+
+class _Reads:
+    """ The source operands of a program as arrays, for vectorised scoring. """
+
+    def __init__(self, rows:list, weights=None):
+        self.a = np.array([r['a'] for r in rows], dtype=np.int64).reshape(-1)
+        self.b = np.array([r['b'] for r in rows], dtype=np.int64).reshape(-1)
+        self.commutes = np.array([r['mnemonic'] in COMMUTATIVE for r in rows], dtype=bool).reshape(-1)
+        self.weights = np.ones(len(rows)) if weights is None else np.asarray(weights, dtype=float)
+        self.two = (self.a != NO_REG) & (self.b != NO_REG)
+        self.one = (self.a != NO_REG) & (self.b == NO_REG)
+
+    def banks(self, bank) -> tuple:
+        """ Banks of the slot A and slot B sources for bank[reg] in {0, 1}. """
+
+        return bank[np.maximum(self.a, 0)], bank[np.maximum(self.b, 0)]
+
+    def violations(self, ba, bb) -> tuple:
+        """ (conflicts, misplaced) masks per instruction. """
+
+        conflicts = self.two & (ba == bb)
+        misplaced = (self.two & ~conflicts & ~self.commutes & (ba == 1)) | (self.one & (ba == 1))
+        return conflicts, misplaced
+
+    def _bad(self, ba, bb) -> np.ndarray:
+        conflicts, misplaced = self.violations(ba, bb)
+        return (conflicts | misplaced).astype(float)
+
+    def cost(self, bank) -> float:
+        return float(self.weights @ self._bad(*self.banks(bank)))
+
+    def flip_gains(self, bank) -> np.ndarray:
+        """ Change of cost when each register alone moves to the other bank. """
+
+        ba, bb = self.banks(bank)
+        base = self._bad(ba, bb)
+        delta_a = self._bad(1 - ba, bb) - base
+        delta_b = self._bad(ba, 1 - bb) - base
+        # Reading one register twice conflicts whatever its bank
+        same = self.two & (self.a == self.b)
+        delta_a[same] = delta_b[same] = 0
+        gains = np.bincount(np.maximum(self.a, 0), self.weights * delta_a * (self.a != NO_REG), len(bank))
+        return gains + np.bincount(np.maximum(self.b, 0), self.weights * delta_b * (self.b != NO_REG), len(bank))
+
+
+def analyse(program, weights=None, penalty:int=1, assembler:Assembler=None) -> dict:
+    """ Counts register bank conflicts: instructions reading both sources
+    from one bank, which a bank can only serve once per cycle, and
+    misplaced reads, sources in the wrong bank for their slot (bank A
+    for the first, bank B for the second) that swapping a commutative
+    op does not fix. Either costs `penalty` cycles, a second read cycle
+    or a copy into the other bank.
+
+    :param program: Relaxed assembly text (see `parse_relaxed()`), or
+            uint32 words (bank-correct by construction)
+    :param weights: (Optional) Executions per instruction (e.g. loop trip
+            counts or a trace histogram), 1 each by default
+    :return: (dict) Counts, stall cycles and the offending instructions """
+
+    assembler = assembler or Assembler()
+    if not isinstance(program, str):
+        program = '\n'.join(assembler.disassemble(program))
+    rows = parse_relaxed(program, assembler)
+    reads = _Reads(rows, weights)
+    bank = np.arange(2 * 2 * BANK_SIZE) >> 5 & 1
+    conflicts, misplaced = reads.violations(*reads.banks(bank))
+    w = reads.weights
+
+    types = [assembler.table[r['mnemonic']][0] for r in rows if r['mnemonic'] != '.word']
+    base_cycles = float(sum(CYCLE_COST[t] for t in types))
+    stalls = penalty * float(w[conflicts | misplaced].sum())
+    files = np.maximum(reads.a, 0) >> 6
+    text = format_relaxed(rows).splitlines()
+    return {
+        'instructions': len(rows),
+        'two_source': int(reads.two.sum()),
+        'conflicts': float(w[conflicts].sum()),
+        'conflicts_int': float(w[conflicts & (files == FILE_INT)].sum()),
+        'conflicts_fp': float(w[conflicts & (files == FILE_FP)].sum()),
+        'misplaced': float(w[misplaced].sum()),
+        'stall_cycles': stalls,
+        'cycles': base_cycles + stalls,
+        'encodable': not (conflicts | misplaced).any(),
+        'offending': [{'index': int(i), 'line': text[i], 'kind': 'conflict' if conflicts[i] else 'misplaced'}
+                      for i in np.flatnonzero(conflicts | misplaced)],
+    }
+
+
+def _improve(reads:_Reads, bank, movable, capacity, max_flips:int):
+    """ Best-improvement single register moves until none helps. """
+
+    bank = bank.copy()
+    for _ in range(max_flips):
+        gains = reads.flip_gains(bank)
+        gains[~movable] = np.inf
+        # A move must leave room in the target bank of the register's file
+        files = np.arange(len(bank)) >> 6
+        target = 1 - bank
+        room = capacity[files, target] > 0
+        gains[~room] = np.inf
+        best = int(np.argmin(gains))
+        if not gains[best] < 0:
+            break
+        capacity[files[best], bank[best]] += 1
+        capacity[files[best], target[best]] -= 1
+        bank[best] = target[best]
+    return bank
+
+
+def live_ins(program, assembler:Assembler=None) -> list:
+    """ Registers a program reads before writing them, i.e. the values it
+    expects on entry, which `reallocate()` must not rename.
+
+    :return: (list) Full names ('int a3', 'fp b1') in program order """
+
+    written, found = set(), {}
+    for row in parse_relaxed(program, assembler):
+        for reg in (row['a'], row['b']):
+            if reg != NO_REG and reg not in written:
+                found.setdefault(reg, _full_name(reg))
+        if row['dest'] != NO_REG:
+            written.add(row['dest'])
+    return list(found.values())
+
+
+def reallocate(program:str, weights=None, pinned=(), restarts:int=8, penalty:int=1, rng=None,
+               assembler:Assembler=None) -> dict:
+    """ Reassigns registers across banks to minimise `analyse()` stalls.
+
+    Every register keeps one name for the whole program (a renaming, so
+    the program computes the same values), stays in its register file,
+    and moves to the other bank only where that lowers the weighted
+    conflict + misplaced count. The search is best-improvement single
+    moves from the original assignment, then from `restarts` random
+    perturbations of the best one, keeping at most 31 renamed registers
+    per bank. No register is renamed to index 0, which alu.sv never
+    writes (`wb_reg_wen_o` needs dest_i != 0), and the index 0 registers
+    of both files keep their names.
+
+    :param pinned: (Optional) Register names ('a1', 'int b3', 'fp a1') to
+            keep, e.g. live-in / live-out values; fs24 operands and a0 / b0
+            are always kept
+    :return: (dict) 'source' (renamed assembly), 'mapping' ({'int a3':
+            'int b1', ...}, moved registers only), 'before' and 'after'
+            `analyse()` results """
+
+    assembler = assembler or Assembler()
+    rng = rng or np.random.default_rng(0)
+    rows = parse_relaxed(program, assembler)
+    reads = _Reads(rows, weights)
+    registers = 2 * 2 * BANK_SIZE
+
+    used = np.zeros(registers, dtype=bool)
+    for row in rows:
+        for key in ('dest', 'a', 'b'):
+            if row[key] != NO_REG:
+                used[row[key]] = True
+    index = np.arange(registers) & 31
+    movable = used & (index != RESERVED_INDEX)
+    for row in rows:
+        for reg in row['pinned']:
+            movable[reg] = False
+    for name in pinned:
+        file, _, reg = name.rpartition(' ')
+        reg = parse_register(reg)
+        for f in [FILE_NAMES.index(file)] if file else [FILE_INT, FILE_FP]:
+            movable[f << 6 | reg] = False
+
+    original = np.arange(registers) >> 5 & 1
+    files = np.arange(registers) >> 6
+
+    def capacity_of(bank):
+        # Index 0 registers never move, so slot 0 is out of every bank's room
+        counts = np.zeros((2, 2), dtype=np.int64)
+        rest = used & (index != RESERVED_INDEX)
+        np.add.at(counts, (files[rest], bank[rest]), 1)
+        return BANK_SIZE - 1 - counts
+
+    best = _improve(reads, original, movable, capacity_of(original), 4 * registers)
+    best_cost = reads.cost(best)
+    for _ in range(restarts):
+        if best_cost == 0:
+            break
+        start = best.copy()
+        kick = movable & (rng.random(registers) < 0.2)
+        start[kick] ^= 1
+        if (capacity_of(start) < 0).any():
+            continue
+        bank = _improve(reads, start, movable, capacity_of(start), 4 * registers)
+        cost = reads.cost(bank)
+        if cost < best_cost:
+            best, best_cost = bank, cost
+
+    # Indices: moved registers take their own index in the new bank when free
+    taken = {(f, b): {RESERVED_INDEX} for f in (FILE_INT, FILE_FP) for b in (0, 1)}
+    for reg in np.flatnonzero(used & (best == original)):
+        taken[files[reg], best[reg]].add(reg & 31)
+    mapping = {}
+    for reg in np.flatnonzero(used & (best != original)):
+        slots = taken[files[reg], best[reg]]
+        slot = reg & 31 if reg & 31 not in slots else min(set(range(BANK_SIZE)) - slots)
+        slots.add(slot)
+        mapping[int(reg)] = int(files[reg] << 6 | best[reg] << 5 | slot)
+
+    source = format_relaxed(rows, mapping)
+    return {
+        'source': source,
+        'mapping': {_full_name(old): _full_name(new) for old, new in mapping.items()},
+        'before': analyse(program, weights, penalty, assembler),
+        'after': analyse(source, weights, penalty, assembler),
+    }
+
+
+def format_report(result:dict) -> str:
+    return (f"{result['instructions']} instructions, {result['two_source']} with two register sources: "
+            f"{result['conflicts']:g} bank conflicts ({result['conflicts_int']:g} int, {result['conflicts_fp']:g} fp), "
+            f"{result['misplaced']:g} misplaced, {result['stall_cycles']:g} stall cycles "
+            f"(~{result['cycles']:g} cycles{', encodable' if result['encodable'] else ''})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TauriISA register bank conflict analyser and re-allocation pass')
+    parser.add_argument('program', help='Assembly source (sources may use either bank), .bin or $readmemh image')
+    parser.add_argument('-o', '--output', default=None, help='Write the re-allocated assembly here')
+    parser.add_argument('--pin', default='', help="Comma separated registers to keep, e.g. 'a1,fp b1'")
+    parser.add_argument('--pin-live-ins', action='store_true', help='Also keep every register read before written')
+    parser.add_argument('--weights', default=None, help='Text file, executions per instruction (one per line)')
+    parser.add_argument('--penalty', type=int, default=1, help='Stall cycles per conflict')
+    parser.add_argument('--restarts', type=int, default=8)
+    parser.add_argument('--json', default=None, help='Write both analyses and the mapping as JSON')
+    args = parser.parse_args()
+
+    assembler = Assembler()
+    path = Path(args.program)
+    if path.suffix in ('.bin', '.hex', '.mem'):
+        source = '\n'.join(assembler.disassemble(load_words(path)))
+    else:
+        source = path.read_text()
+    weights = np.loadtxt(args.weights) if args.weights else None
+    pinned = [p.strip() for p in args.pin.split(',') if p.strip()]
+    if args.pin_live_ins:
+        pinned += live_ins(source, assembler)
+
+    result = reallocate(source, weights, pinned, args.restarts, args.penalty, assembler=assembler)
+    print('before:', format_report(result['before']))
+    for item in result['before']['offending'][:20]:
+        print(f"  {item['index']:>5}  {item['kind']:<9} {item['line']}")
+    print('after: ', format_report(result['after']))
+    for old, new in result['mapping'].items():
+        print(f'  {old} -> {new}')
+    if args.output:
+        Path(args.output).write_text(result['source'])
+        print(f'Wrote {args.output}')
+    if args.json:
+        Path(args.json).write_text(json.dumps({k: v for k, v in result.items() if k != 'source'}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import numpy as np
+
+from mods.scene_mods import triangle_areas
+
+
+# Reference renderer for the rasteriser back end
+#
+# Follows the fixed-point arithmetic of setup.sv (s.11.4 vertices, s.20.4
+# edge functions, +1 LSB bias on non axis-aligned edges) and the traversal of
+# genpix.sv (every pixel of the bounding box, one per cycle), then applies
+# the z_buffer.sv depth test. Gives fragment counts and cycle budgets for
+# captured / synthetic scenes without simulating the RTL, and the fragment
+# streams of the texture cache traces (mods/texcache_mods.py).
+SUBPIXEL_BITS = 4
+
+DEPTH_FUNCS = {
+    0b000: lambda f, s: np.zeros_like(f, dtype=bool),  # GL_NEVER
+    0b001: lambda f, s: f < s,                          # GL_LESS
+    0b010: lambda f, s: f <= s,                         # GL_LEQUAL
+    0b011: lambda f, s: f > s,                          # GL_GREATER
+    0b100: lambda f, s: f >= s,                         # GL_GEQUAL
+    0b101: lambda f, s: f == s,                         # GL_EQUAL
+    0b110: lambda f, s: f != s,                         # GL_NOTEQUAL
+    0b111: lambda f, s: np.ones_like(f, dtype=bool),   # GL_ALWAYS
+}
+
+
+def to_s11_4(values):
+    """ Pixel coordinates to s.11.4 fixed point (int64). """
+
+    return np.round(np.asarray(values, dtype=np.float64) * (1 << SUBPIXEL_BITS)).astype(np.int64)
+
+
+def _edge_cross(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def setup_triangles(tris):
+    """ Vectorised model of `setup.sv` for a batch of triangles. Values
+    are plain signed integers, not yet masked to port widths.
+
+    :param tris: (T, 3, >=2) screen-space vertices in pixels
+    :return: (dict) (T,) int64 arrays named after the genpix inputs (area,
+            dl_w*_col, dl_w*_row, w*_row, x_min, y_min, x_max, y_max) """
+
+    fx = to_s11_4(tris[:, :, 0])
+    fy = to_s11_4(tris[:, :, 1])
+    ax, bx, cx = fx[:, 0], fx[:, 1], fx[:, 2]
+    ay, by, cy = fy[:, 0], fy[:, 1], fy[:, 2]
+
+    x_min = fx.min(axis=1) >> SUBPIXEL_BITS
+    y_min = fy.min(axis=1) >> SUBPIXEL_BITS
+    x_max = fx.max(axis=1) >> SUBPIXEL_BITS
+    y_max = fy.max(axis=1) >> SUBPIXEL_BITS
+
+    half = 1 << (SUBPIXEL_BITS - 1)
+    p0_x = (x_min << SUBPIXEL_BITS) + half
+    p0_y = (y_min << SUBPIXEL_BITS) + half
+
+    def bias(sx, sy, ex, ey):
+        return ((ex - sx != 0) & (ey - sy != 0)).astype(np.int64)
+
+    return {
+        'area': _edge_cross(ax, ay, bx, by, cx, cy) >> SUBPIXEL_BITS,
+        'dl_w0_col': by - cy,
+        'dl_w1_col': cy - ay,
+        'dl_w2_col': ay - by,
+        'dl_w0_row': cx - bx,
+        'dl_w1_row': ax - cx,
+        'dl_w2_row': bx - ax,
+        'w0_row': (_edge_cross(bx, by, cx, cy, p0_x, p0_y) >> SUBPIXEL_BITS) + bias(bx, by, cx, cy),
+        'w1_row': (_edge_cross(cx, cy, ax, ay, p0_x, p0_y) >> SUBPIXEL_BITS) + bias(bx, by, ax, ay),
+        'w2_row': (_edge_cross(ax, ay, bx, by, p0_x, p0_y) >> SUBPIXEL_BITS) + bias(ax, ay, bx, by),
+        'x_min': x_min,
+        'y_min': y_min,
+        'x_max': x_max,
+        'y_max': y_max,
+    }
+
+
+def rasterise_triangle(setup, i):
+    """ Pixels genpix emits for triangle i of a `setup_triangles()` batch.
+
+    :return: (tuple) (xs, ys, w0, w1, w2, inside) flattened over the
+            bounding box in genpix traversal order (row by row) """
+
+    xs = np.arange(setup['x_min'][i], setup['x_max'][i] + 1)
+    ys = np.arange(setup['y_min'][i], setup['y_max'][i] + 1)
+    dx = (xs - setup['x_min'][i])[None, :]
+    dy = (ys - setup['y_min'][i])[:, None]
+    w = [setup[f'w{k}_row'][i] + dx * setup[f'dl_w{k}_col'][i] + dy * setup[f'dl_w{k}_row'][i] for k in range(3)]
+    inside = (w[0] >= 0) & (w[1] >= 0) & (w[2] >= 0)
+    gx, gy = np.meshgrid(xs, ys)
+    return gx.ravel(), gy.ravel(), w[0].ravel(), w[1].ravel(), w[2].ravel(), inside.ravel()
+
+
+class ReferenceRenderer:
+    """ Renders scenes (see `mods.scene_mods`) into a Z_SIZE-bit depth
+    buffer and collects the back-end statistics the testbenches compare
+    against. """
+
+    def __init__(self, width, height, z_size=16):
+        self.width = width
+        self.height = height
+        self.z_size = z_size
+        self.z_max = (1 << z_size) - 1
+        self.depth = np.full((height, width), self.z_max, dtype=np.uint32)
+        self.overdraw = np.zeros((height, width), dtype=np.uint16)
+        self.stats = {
+            'triangles': 0,
+            'culled': 0,
+            'bbox_pixels': 0,   # genpix cycles, one pixel of the bbox per cycle
+            'fragments': 0,     # inside pixels emitted with valid_o
+            'depth_passed': 0,
+        }
+
+    def flush(self):
+        """ Fills the depth buffer with the maximum depth value. """
+
+        self.depth.fill(self.z_max)
+        self.overdraw.fill(0)
+
+    def draw(self, tris, z_func=0b001, z_write=True):
+        """ Rasterises and depth tests a batch of triangles in submission order.
+
+        :param tris: (T, 3, 4) screen-space vertices
+        :param z_func: (Optional) z_depth_func_i encoding, GL_LESS by default
+        :param z_write: (Optional) Update the depth buffer on pass """
+
+        tris = np.asarray(tris, dtype=np.float64)
+        # setup.sv does not expect negative areas: treat them as culled
+        keep = triangle_areas(tris) > 0
+        self.stats['triangles'] += len(tris)
+        self.stats['culled'] += int((~keep).sum())
+        tris = tris[keep]
+        if not len(tris):
+            return
+
+        setup = setup_triangles(tris)
+        compare = DEPTH_FUNCS[z_func]
+        for i in range(len(tris)):
+            xs, ys, w0, w1, w2, inside = rasterise_triangle(setup, i)
+            self.stats['bbox_pixels'] += len(xs)
+            on_screen = inside & (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+            if not on_screen.any():
+                continue
+            xs, ys = xs[on_screen], ys[on_screen]
+            self.stats['fragments'] += len(xs)
+
+            # Barycentric depth interpolation, quantised to Z_SIZE bits
+            w = np.stack([w0[on_screen], w1[on_screen], w2[on_screen]]).astype(np.float64)
+            w /= np.maximum(w.sum(axis=0), 1)
+            z = np.clip(w.T @ tris[i, :, 2], 0.0, 1.0)
+            frag_z = np.floor(z * self.z_max).astype(np.uint32)
+
+            passed = compare(frag_z, self.depth[ys, xs])
+            self.stats['depth_passed'] += int(passed.sum())
+            self.overdraw[ys[passed], xs[passed]] += 1
+            if z_write:
+                self.depth[ys[passed], xs[passed]] = frag_z[passed]
+
+    def render(self, scene):
+        """ Renders every draw of a scene with its own depth state. """
+
+        for d in range(len(scene.draws)):
+            draw = scene.draws[d]
+            self.draw(scene.triangles(d), int(draw['z_depth_func']), bool(draw['z_write']))
+        return self.stats
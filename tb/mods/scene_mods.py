@@ -0,0 +1,479 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+
+# Tauri scene format (*.scene)
+#
+# A scene is a captured (or synthesised) workload: one vertex buffer, one
+# index buffer, a pool of clip planes and a list of draws. Every array is
+# stored raw and 64-byte aligned behind a fixed header, so `load_scene()`
+# returns `np.memmap` views and large captures never need to be read in full.
+#
+# Vertices are post-viewport: x, y in pixels (origin top-left, y down), z in
+# [0, 1] depth, w = 1. Clip planes are (nx, ny, nz, offset) in the same space,
+# a vertex v is inside when nx*x + ny*y + nz*z + offset*w >= 0 (same
+# convention as `clipper.sv`).
+
+SCENE_MAGIC = b'TSCN'
+SCENE_VERSION = 1
+SCENE_ALIGN = 64
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u4'),
+    ('num_vertices', '<u4'),
+    ('num_indices', '<u4'),
+    ('num_planes', '<u4'),
+    ('num_draws', '<u4'),
+    ('width', '<u2'),
+    ('height', '<u2'),
+])
+
+# Per-draw render state. Function encodings match `z_buffer.sv`
+# (z_depth_func_i) and `stencil_buffer.sv` (stencil_func_i, s*_i ops).
+DRAW_DTYPE = np.dtype([
+    ('first_index', '<u4'),
+    ('index_count', '<u4'),
+    ('first_plane', '<u2'),
+    ('plane_count', '<u2'),
+    ('z_depth_func', 'u1'),
+    ('z_write', 'u1'),
+    ('stencil_func', 'u1'),
+    ('stencil_ref', 'u1'),
+    ('stencil_sfail', 'u1'),
+    ('stencil_dpfail', 'u1'),
+    ('stencil_dppass', 'u1'),
+    ('stencil_enable', 'u1'),
+])
+
+GL_NEVER, GL_LESS, GL_LEQUAL, GL_GREATER, GL_GEQUAL, GL_EQUAL, GL_NOTEQUAL, GL_ALWAYS = range(8)
+
+DEFAULT_WIDTH = 1280
+DEFAULT_HEIGHT = 720
+
+# Where `get_scene()` caches the bundled synthetic scenes
+SCENE_DIR = Path(__file__).parent.parent / 'scenes'
+
+
+class Scene:
+    """ Container for one scene. Arrays may be in-memory `np.ndarray`s or
+    read-only `np.memmap`s returned by `load_scene()`.
+
+    :param vertices: (N, 4) float32, x y z w
+    :param indices: (M,) uint32, three per triangle
+    :param planes: (P, 4) float32, nx ny nz offset
+    :param draws: (D,) `DRAW_DTYPE`
+    :param width: Viewport width in pixels
+    :param height: Viewport height in pixels """
+
+    def __init__(self, vertices, indices, planes, draws, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+        self.vertices = vertices
+        self.indices = indices
+        self.planes = planes
+        self.draws = draws
+        self.width = int(width)
+        self.height = int(height)
+
+    @property
+    def num_triangles(self):
+        return len(self.indices) // 3
+
+    def triangles(self, draw=None):
+        """ Gathers triangles through the index buffer.
+
+        :param draw: (Optional) Draw index, all draws when None
+        :return: (T, 3, 4) float32 array of vertices """
+
+        if draw is None:
+            idx = self.indices
+        else:
+            d = self.draws[draw]
+            idx = self.indices[d['first_index']:d['first_index'] + d['index_count']]
+        return np.asarray(self.vertices)[np.asarray(idx).reshape(-1, 3)]
+
+    def draw_planes(self, draw):
+        """ :return: (plane_count, 4) float32 clip planes of a draw """
+
+        d = self.draws[draw]
+        return np.asarray(self.planes[d['first_plane']:d['first_plane'] + d['plane_count']])
+
+
+def make_draws(count):
+    """ Returns `count` zeroed draw records with GL_LESS depth test and
+    depth writes on, stencil disabled. """
+
+    draws = np.zeros(count, dtype=DRAW_DTYPE)
+    draws['z_depth_func'] = GL_LESS
+    draws['z_write'] = 1
+    draws['stencil_func'] = GL_ALWAYS
+    return draws
+
+
+def viewport_planes(width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    """ The six planes bounding the viewport and [0, 1] depth range.
+
+    :return: (6, 4) float32 array """
+
+    return np.array([
+        [ 1.0,  0.0,  0.0, 0.0],            # x >= 0
+        [-1.0,  0.0,  0.0, float(width)],   # x <= width
+        [ 0.0,  1.0,  0.0, 0.0],            # y >= 0
+        [ 0.0, -1.0,  0.0, float(height)],  # y <= height
+        [ 0.0,  0.0,  1.0, 0.0],            # z >= 0
+        [ 0.0,  0.0, -1.0, 1.0],            # z <= 1
+    ], dtype=np.float32)
+
+
+def _aligned(offset):
+    return (offset + SCENE_ALIGN - 1) // SCENE_ALIGN * SCENE_ALIGN
+
+
+def _layout(num_vertices, num_indices, num_planes, num_draws):
+    """ Byte offsets of each array in a scene file, in file order. """
+
+    sections = [
+        ('vertices', np.dtype('<f4'), (num_vertices, 4)),
+        ('indices', np.dtype('<u4'), (num_indices,)),
+        ('planes', np.dtype('<f4'), (num_planes, 4)),
+        ('draws', DRAW_DTYPE, (num_draws,)),
+    ]
+    layout = []
+    offset = _aligned(HEADER_DTYPE.itemsize)
+    for name, dtype, shape in sections:
+        layout.append((name, dtype, shape, offset))
+        offset = _aligned(offset + dtype.itemsize * int(np.prod(shape)))
+    return layout, offset
+
+
+def save_scene(path, scene):
+    """ Writes a scene to a *.scene file.
+
+    :param path: Destination file
+    :param scene: The `Scene`
+    :return: None """
+
+    arrays = {
+        'vertices': np.ascontiguousarray(scene.vertices, dtype='<f4').reshape(-1, 4),
+        'indices': np.ascontiguousarray(scene.indices, dtype='<u4').reshape(-1),
+        'planes': np.ascontiguousarray(scene.planes, dtype='<f4').reshape(-1, 4),
+        'draws': np.ascontiguousarray(scene.draws, dtype=DRAW_DTYPE).reshape(-1),
+    }
+    if len(arrays['indices']) % 3:
+        raise ValueError(f'Index count {len(arrays["indices"])} is not a multiple of 3.')
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = SCENE_MAGIC
+    header['version'] = SCENE_VERSION
+    header['num_vertices'] = len(arrays['vertices'])
+    header['num_indices'] = len(arrays['indices'])
+    header['num_planes'] = len(arrays['planes'])
+    header['num_draws'] = len(arrays['draws'])
+    header['width'] = scene.width
+    header['height'] = scene.height
+
+    layout, total = _layout(*(len(arrays[k]) for k in ('vertices', 'indices', 'planes', 'draws')))
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('wb') as f:
+        f.write(header.tobytes())
+        for name, _, _, offset in layout:
+            f.seek(offset)
+            f.write(arrays[name].tobytes())
+        f.truncate(total)
+
+
+def load_scene(path, mmap=True):
+    """ Opens a *.scene file.
+
+    :param path: Source file
+    :param mmap: (Optional) Return `np.memmap` views instead of copies
+    :return: `Scene` """
+
+    path = Path(path)
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header['magic'][0] != SCENE_MAGIC:
+        raise ValueError(f'{path} is not a Tauri scene file.')
+    if header['version'][0] != SCENE_VERSION:
+        raise ValueError(f'{path}: unsupported scene version {header["version"][0]}.')
+
+    layout, _ = _layout(int(header['num_vertices'][0]), int(header['num_indices'][0]),
+                        int(header['num_planes'][0]), int(header['num_draws'][0]))
+    arrays = {}
+    for name, dtype, shape, offset in layout:
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        elif mmap:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        else:
+            arrays[name] = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+    return Scene(arrays['vertices'], arrays['indices'], arrays['planes'], arrays['draws'],
+                 int(header['width'][0]), int(header['height'][0]))
+
+
+def triangle_areas(tris):
+    """ Signed screen-space area of each triangle, positive when the
+    winding matches what `setup.sv` expects (edge_cross(a, b, c) > 0).
+
+    :param tris: (T, 3, >=2) array
+    :return: (T,) float64 array """
+
+    a, b, c = tris[:, 0, :2].astype(np.float64), tris[:, 1, :2].astype(np.float64), tris[:, 2, :2].astype(np.float64)
+    return 0.5 * ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+
+
+def _wind_positive(tris):
+    """ Swaps vertices 1 and 2 of every negatively wound triangle. """
+
+    flip = triangle_areas(tris) < 0
+    tris[flip, 1], tris[flip, 2] = tris[flip, 2].copy(), tris[flip, 1].copy()
+    return tris
+
+
+def scene_from_triangles(tris, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, draw_sizes=None, planes=None):
+    """ Builds an unindexed scene from a triangle soup.
+
+    :param tris: (T, 3, 4) array
+    :param draw_sizes: (Optional) Triangles per draw, one draw when None
+    :param planes: (Optional) (P, 4) clip planes shared by every draw,
+            the viewport planes when None
+    :return: `Scene` """
+
+    tris = np.asarray(tris, dtype=np.float32).reshape(-1, 3, 4)
+    draw_sizes = [len(tris)] if draw_sizes is None else list(draw_sizes)
+    if sum(draw_sizes) != len(tris):
+        raise ValueError(f'draw_sizes sum to {sum(draw_sizes)}, expected {len(tris)}.')
+    planes = viewport_planes(width, height) if planes is None else np.asarray(planes, dtype=np.float32)
+
+    draws = make_draws(len(draw_sizes))
+    draws['index_count'] = np.asarray(draw_sizes) * 3
+    draws['first_index'] = np.concatenate([[0], np.cumsum(draws['index_count'])[:-1]])
+    draws['plane_count'] = len(planes)
+    return Scene(tris.reshape(-1, 4), np.arange(len(tris) * 3, dtype=np.uint32),
+                 planes, draws, width, height)
+
+
+def load_obj(path, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, fit=True):
+    """ Loads a simple Wavefront OBJ mesh (`v` and `f` records only,
+    polygons are fan-triangulated, texture / normal indices are ignored).
+
+    :param path: The *.obj file
+    :param fit: (Optional) Orthographically fit x/y into the viewport and
+            z into [0, 1], otherwise positions are taken as screen space
+    :return: `Scene` with a single draw """
+
+    positions = []
+    indices = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0] == 'v':
+                xyz = [float(v) for v in fields[1:4]]
+                w = float(fields[4]) if len(fields) > 4 else 1.0
+                positions.append(xyz + [w])
+            elif fields[0] == 'f':
+                corners = []
+                for ref in fields[1:]:
+                    i = int(ref.split('/')[0])
+                    # OBJ is 1-based, negative indices are relative to the end
+                    corners.append(i - 1 if i > 0 else len(positions) + i)
+                for k in range(1, len(corners) - 1):
+                    indices.extend((corners[0], corners[k], corners[k + 1]))
+
+    vertices = np.asarray(positions, dtype=np.float64).reshape(-1, 4)
+    if fit and len(vertices):
+        lo, hi = vertices[:, :3].min(axis=0), vertices[:, :3].max(axis=0)
+        extent = np.where(hi - lo > 0, hi - lo, 1.0)
+        scale = 0.9 * min(width / extent[0], height / extent[1])
+        centre = (lo + hi) / 2
+        vertices[:, 0] = (vertices[:, 0] - centre[0]) * scale + width / 2
+        vertices[:, 1] = (centre[1] - vertices[:, 1]) * scale + height / 2  # y down
+        vertices[:, 2] = (vertices[:, 2] - lo[2]) / extent[2]
+        vertices[:, 3] = 1.0
+
+    # Fix winding through the index buffer so every triangle rasterises
+    idx3 = np.asarray(indices, dtype=np.uint32).reshape(-1, 3)
+    flip = triangle_areas(vertices[idx3]) < 0
+    idx3[flip, 1], idx3[flip, 2] = idx3[flip, 2].copy(), idx3[flip, 1].copy()
+    indices = idx3.reshape(-1)
+
+    draws = make_draws(1)
+    draws['index_count'] = len(indices)
+    draws['plane_count'] = 6
+    return Scene(vertices.astype(np.float32), indices, viewport_planes(width, height), draws, width, height)
+
+
+# ----------------------------------------------------------------
+# Synthetic scenes
+# ----------------------------------------------------------------
+
+def _project(points, width, height, focal, near):
+    """ Pinhole projection of camera-space (X, Y, Z) points, Z forward.
+    Returns (..., 4) screen-space vertices with z = 1 - near / Z. """
+
+    points = np.asarray(points, dtype=np.float64)
+    z = np.maximum(points[..., 2], near)
+    out = np.empty(points.shape[:-1] + (4,))
+    out[..., 0] = width / 2 + focal * points[..., 0] / z
+    out[..., 1] = height / 2 - focal * points[..., 1] / z
+    out[..., 2] = 1.0 - near / z
+    out[..., 3] = 1.0
+    # Keep within the clipper's 12.12 range (guard band of half a screen)
+    out[..., 0] = np.clip(out[..., 0], -width / 2, 1.5 * width)
+    out[..., 1] = np.clip(out[..., 1], -height / 2, 1.5 * height)
+    return out
+
+
+def _quads_to_tris(quads):
+    """ (Q, 4, C) quads, corners in order -> (2Q, 3, C) triangles. """
+
+    return np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+
+
+def corridor_scene(width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, segments=48, subdiv=4, seed=0):
+    """ A Doom-like corridor: floor, ceiling and two walls receding from
+    the camera, tessellated so triangle size falls off with distance.
+    One draw per surface, front-to-back.
+
+    :param segments: Number of depth slices
+    :param subdiv: Quads across each surface per slice """
+
+    rng = np.random.default_rng(seed)
+    near, focal = 0.5, width / 2
+    half_w, half_h = 2.0, 1.5
+    z_edges = near + np.cumsum(np.concatenate([[0.0], rng.uniform(0.5, 1.5, segments)]))
+    u = np.linspace(0.0, 1.0, subdiv + 1)
+
+    surfaces = {
+        # (fixed axis, fixed value, varying axis, varying range)
+        'floor': (1, -half_h, 0, (-half_w, half_w)),
+        'ceiling': (1, half_h, 0, (-half_w, half_w)),
+        'left_wall': (0, -half_w, 1, (-half_h, half_h)),
+        'right_wall': (0, half_w, 1, (-half_h, half_h)),
+    }
+    tris, sizes = [], []
+    for fixed_axis, fixed_val, var_axis, (lo, hi) in surfaces.values():
+        quads = []
+        for z0, z1 in zip(z_edges[:-1], z_edges[1:]):
+            for a0, a1 in zip(lo + u[:-1] * (hi - lo), lo + u[1:] * (hi - lo)):
+                corners = np.zeros((4, 3))
+                corners[:, fixed_axis] = fixed_val
+                corners[:, var_axis] = [a0, a1, a1, a0]
+                corners[:, 2] = [z0, z0, z1, z1]
+                quads.append(corners)
+        surf = _wind_positive(_quads_to_tris(_project(np.asarray(quads), width, height, focal, near)))
+        tris.append(surf)
+        sizes.append(len(surf))
+    return scene_from_triangles(np.concatenate(tris), width, height, sizes)
+
+
+def overdraw_scene(width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, layers=16, tris_per_layer=8, seed=0):
+    """ Overdraw stress: `layers` sheets of large triangles covering the
+    screen, submitted back-to-front so every layer passes GL_LESS. """
+
+    rng = np.random.default_rng(seed)
+    tris = []
+    for layer in range(layers):
+        depth = 1.0 - (layer + 1) / (layers + 1)
+        # Two triangles per sheet cover the viewport; extra ones jitter around it
+        quad = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float64)
+        quad += rng.uniform(-8, 8, quad.shape)
+        sheet = [quad[[0, 1, 2]], quad[[0, 2, 3]]]
+        for _ in range(max(tris_per_layer - 2, 0)):
+            centre = rng.uniform([0, 0], [width, height])
+            sheet.append(centre + rng.uniform(-width / 3, width / 3, (3, 2)))
+        sheet = np.asarray(sheet)
+        layer_tris = np.concatenate([sheet, np.full(sheet.shape[:2] + (1,), depth), np.ones(sheet.shape[:2] + (1,))], axis=2)
+        tris.append(layer_tris)
+    tris = _wind_positive(np.concatenate(tris))
+    return scene_from_triangles(tris, width, height, [tris_per_layer] * layers)
+
+
+def tiny_triangle_scene(width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, count=20000, max_size=2.0, seed=0):
+    """ Tiny-triangle stress: `count` triangles with sub-pixel to
+    `max_size`-pixel extents scattered over the screen (setup-bound load). """
+
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform([0, 0], [width, height], (count, 1, 2))
+    offsets = rng.uniform(-max_size / 2, max_size / 2, (count, 3, 2))
+    xy = centres + offsets
+    z = np.broadcast_to(rng.uniform(0.05, 0.95, (count, 1, 1)), (count, 3, 1))
+    tris = np.concatenate([xy, z, np.ones((count, 3, 1))], axis=2)
+    return scene_from_triangles(_wind_positive(tris), width, height)
+
+
+SYNTHETIC_SCENES = {
+    'corridor': corridor_scene,
+    'overdraw': overdraw_scene,
+    'tiny': tiny_triangle_scene,
+}
+
+
+def get_scene(name, mmap=True):
+    """ Returns a scene by *.scene / *.obj path or bundled synthetic name.
+    Synthetic scenes are built once with their default (fixed) seed and
+    cached under `tb/scenes/`.
+
+    :param name: Path or one of `SYNTHETIC_SCENES`
+    :return: `Scene` """
+
+    path = Path(name)
+    if path.suffix == '.obj':
+        return load_obj(path)
+    if path.suffix == '.scene':
+        return load_scene(path, mmap)
+    if name not in SYNTHETIC_SCENES:
+        raise ValueError(f'Unknown scene {name!r}, expected a path or one of {list(SYNTHETIC_SCENES)}.')
+
+    cached = SCENE_DIR / f'{name}.scene'
+    if not cached.exists():
+        save_scene(cached, SYNTHETIC_SCENES[name]())
+    return load_scene(cached, mmap)
+
+
+def scene_stats(scene):
+    """ Summarises the triangle size and overdraw distribution of a scene.
+
+    :param scene: The `Scene`
+    :return: (dict) triangle count, area percentiles (pixels) and the
+            total-area / screen-area overdraw estimate """
+
+    tris = scene.triangles()
+    areas = np.abs(triangle_areas(tris)) if len(tris) else np.zeros(1)
+    return {
+        'triangles': int(scene.num_triangles),
+        'draws': int(len(scene.draws)),
+        'area_mean': float(areas.mean()),
+        'area_p10': float(np.percentile(areas, 10)),
+        'area_p50': float(np.percentile(areas, 50)),
+        'area_p90': float(np.percentile(areas, 90)),
+        'subpixel_fraction': float(np.mean(areas < 1.0)),
+        'overdraw_estimate': float(areas.sum() / (scene.width * scene.height)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tauri scene tool')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Write a synthetic scene or convert an OBJ mesh')
+    build.add_argument('source', help=f'*.obj file or one of {list(SYNTHETIC_SCENES)}')
+    build.add_argument('-o', '--output', type=str, required=True, help='Destination *.scene file')
+    stats = sub.add_parser('stats', help='Print triangle size / overdraw statistics')
+    stats.add_argument('source', help='*.scene, *.obj or synthetic scene name')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        source = Path(args.source)
+        scene = load_obj(source) if source.suffix == '.obj' else SYNTHETIC_SCENES[args.source]()
+        save_scene(args.output, scene)
+        print(f'Wrote {scene.num_triangles} triangles to {args.output}')
+    else:
+        for key, value in scene_stats(get_scene(args.source)).items():
+            print(f'{key:<20} {value}')
+
+
+if __name__ == '__main__':
+    main()
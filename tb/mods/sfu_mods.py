@@ -0,0 +1,254 @@
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+
+SFU_DIR = Path(__file__).parent.parent.parent / 'rtl' / 'core' / 'sfu'
+TABLE_CACHE_DIR = Path(__file__).parent.parent / 'sim_build' / 'sfu_tables'
+
+ROM_DEPTH = 1024    # SFULookup: reg [15:0] ram [1023:0]
+ROM_WIDTH = 16
+INTERPOLATIONS = ('floor', 'midpoint', 'linear')
+
+# Function tables over their reduced argument range. A table splits its
+# entries evenly across `segments`, so the ROM address is {segment,
+# top bits of the offset}. Entries are fixed point with `frac_bits`
+# fraction bits ('fixed', two's complement when any value is negative), or the 15-bit
+# mantissa of a value whose exponent `exp` is implied ('mantissa').
+TABLES = {
+    # 1/sqrt(m), m in [1, 4): the exponent parity picks the half
+    'rsqrt': dict(fn=lambda x: 1.0 / np.sqrt(x), segments=[(1.0, 2.0), (2.0, 4.0)], fmt='mantissa', exp=-1),
+    'recip': dict(fn=lambda x: 1.0 / x, segments=[(1.0, 2.0)], fmt='mantissa', exp=-1),
+    'log2':  dict(fn=np.log2, segments=[(1.0, 2.0)], fmt='fixed'),
+    'exp2':  dict(fn=np.exp2, segments=[(0.0, 1.0)], fmt='fixed'),
+    # sin(pi * t), t in [0, 1): half a period, the sign comes from the reduction
+    'sin':   dict(fn=lambda t: np.sin(np.pi * t), segments=[(0.0, 1.0)], fmt='fixed'),
+    'atan':  dict(fn=np.arctan, segments=[(0.0, 1.0)], fmt='fixed'),
+}
+
+# ROM image -> tables packed into it, in address order. sfu.sv has two
+# SFULookup ROMs; tranc.mem shares its 1024 entries between four tables.
+ROMS = {
+    'rsqrt.mem': ('rsqrt',),
+    'tranc.mem': ('log2', 'exp2', 'sin', 'atan'),
+}
+
+DEFAULTS = dict(frac_bits=15, interpolation='midpoint')
+
+
+def table_config(entries:dict=None, frac_bits=None, interpolation=None, roms:dict=None,
+                 rom_depth:int=ROM_DEPTH) -> dict:
+    """ Full parameter set of a table build; also the cache key.
+
+    :param entries: (Optional) {table: entries}, defaults to an even share
+            of its ROM
+    :param frac_bits: (Optional) Fraction bits, an int or {table: int}
+    :param interpolation: (Optional) 'floor', 'midpoint' or 'linear', a
+            str or {table: str}
+    :param roms: (Optional) {rom file: (table, ...)}, defaults to ROMS
+    :param rom_depth: (Optional) Entries per ROM, larger values are for
+            exploring table sizes beyond SFULookup
+    :return: (dict) {'roms': {...}, 'rom_depth': int, 'tables': {table: {entries, frac_bits, interpolation}}} """
+
+    roms = {name: tuple(tables) for name, tables in (roms or ROMS).items()}
+    per_table = lambda value, table, default: value.get(table, default) if isinstance(value, dict) else \
+        (default if value is None else value)
+    tables = {}
+    for rom, names in roms.items():
+        for table in names:
+            tables[table] = {
+                'entries': int(per_table(entries or {}, table, rom_depth // len(names))),
+                'frac_bits': int(per_table(frac_bits, table, DEFAULTS['frac_bits'])),
+                'interpolation': per_table(interpolation, table, DEFAULTS['interpolation']),
+            }
+            if tables[table]['interpolation'] not in INTERPOLATIONS:
+                raise ValueError(f"{table}: unknown interpolation '{tables[table]['interpolation']}'")
+        depth = sum(tables[t]['entries'] for t in names)
+        if depth > rom_depth:
+            raise ValueError(f'{rom}: {depth} entries do not fit the {rom_depth}-entry ROM')
+    return {'roms': roms, 'rom_depth': rom_depth, 'tables': tables}
+
+
+def sample_points(table:str, entries:int, interpolation:str) -> np.ndarray:
+    """ Arguments the table entries are evaluated at.
+
+    'floor' samples the left edge of every segment, 'midpoint' its centre
+    (half the worst-case error of a piecewise constant table), 'linear'
+    stores (value, slope) pairs, so `entries` / 2 segments are sampled at
+    both edges and the result is interleaved [y0, dy0, y1, dy1, ...]. """
+
+    segments = TABLES[table]['segments']
+    per_segment = entries // len(segments) if interpolation != 'linear' else entries // (2 * len(segments))
+    points = []
+    for lo, hi in segments:
+        step = (hi - lo) / per_segment
+        edges = lo + step * np.arange(per_segment, dtype=np.float64)
+        if interpolation == 'midpoint':
+            edges = edges + step / 2
+        elif interpolation == 'linear':
+            edges = np.stack([edges, edges + step], axis=1).reshape(-1)
+        points.append(edges)
+    return np.concatenate(points)
+
+
+def quantise(values, table:str, frac_bits:int) -> np.ndarray:
+    """ Float values to 16-bit table words (round to nearest, saturating). """
+
+    spec = TABLES[table]
+    if spec['fmt'] == 'mantissa':
+        values = values / 2.0 ** spec['exp'] - 1.0
+    scaled = np.round(np.asarray(values, dtype=np.float64) * (1 << frac_bits))
+    if spec['fmt'] == 'mantissa':
+        # The implied exponent leaves no room for m = 1.0 (e.g. rsqrt(1)): saturate below it
+        return np.clip(scaled, 0, min((1 << frac_bits), 1 << ROM_WIDTH) - 1).astype(np.uint16)
+    if scaled.min() >= 0:
+        return np.clip(scaled, 0, (1 << ROM_WIDTH) - 1).astype(np.uint16)
+    half = 1 << (ROM_WIDTH - 1)
+    return np.clip(scaled, -half, half - 1).astype(np.int64).astype(np.uint16)
+
+
+def dequantise(words, table:str, frac_bits:int, signed:bool=False) -> np.ndarray:
+    """ Inverse of `quantise()` (slopes of linear tables are always signed). """
+
+    spec = TABLES[table]
+    words = np.asarray(words, dtype=np.uint16)
+    values = (words.view(np.int16) if signed else words).astype(np.float64) / (1 << frac_bits)
+    if spec['fmt'] == 'mantissa' and not signed:
+        values = (values + 1.0) * 2.0 ** spec['exp']
+    elif spec['fmt'] == 'mantissa':
+        values = values * 2.0 ** spec['exp']
+    return values
+
+
+def build_table(table:str, entries:int, frac_bits:int=15, interpolation:str='midpoint') -> np.ndarray:
+    """ Builds one function table in a single vectorised evaluation.
+
+    :return: (np.ndarray) uint16 words, `entries` long """
+
+    spec = TABLES[table]
+    x = sample_points(table, entries, interpolation)
+    with np.errstate(all='ignore'):
+        y = spec['fn'](x)
+    if interpolation != 'linear':
+        return quantise(y, table, frac_bits)
+
+    # [y0, y0', y1, y1', ...] -> [y0, y0' - y0, ...]: stored value plus signed delta per segment
+    y = y.reshape(-1, 2)
+    words = np.empty(entries, dtype=np.uint16)
+    words[0::2] = quantise(y[:, 0], table, frac_bits)
+    scale = 2.0 ** -spec['exp'] if spec['fmt'] == 'mantissa' else 1.0
+    delta = np.round((y[:, 1] - y[:, 0]) * scale * (1 << frac_bits))
+    words[1::2] = np.clip(delta, -(1 << 15), (1 << 15) - 1).astype(np.int64).astype(np.uint16)
+    return words
+
+
+def config_key(config:dict) -> str:
+    """ Cache key of a configuration, also covering the generator source. """
+
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode())
+    digest.update(Path(__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def build_roms(config:dict=None, cache_dir=TABLE_CACHE_DIR) -> dict:
+    """ Builds every ROM image of a configuration, reusing a cached build
+    with the same parameters.
+
+    :param config: (Optional) From `table_config()`, defaults included
+    :return: (dict) {rom file: uint16 words (rom_depth long, zero padded)} """
+
+    config = config or table_config()
+    cache_file = Path(cache_dir) / f'{config_key(config)}.npz' if cache_dir else None
+    if cache_file is not None and cache_file.exists():
+        with np.load(cache_file) as cached:
+            return {rom: cached[rom] for rom in config['roms']}
+
+    images = {}
+    for rom, names in config['roms'].items():
+        image = np.zeros(config.get('rom_depth', ROM_DEPTH), dtype=np.uint16)
+        base = 0
+        for table in names:
+            params = config['tables'][table]
+            words = build_table(table, params['entries'], params['frac_bits'], params['interpolation'])
+            image[base:base + len(words)] = words
+            base += len(words)
+        images[rom] = image
+
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_file, **images)
+        cache_file.with_suffix('.json').write_text(json.dumps(config, indent=1))
+    return images
+
+
+def table_base(config:dict, table:str) -> tuple:
+    """ (rom file, first address) of a table inside its ROM image. """
+
+    for rom, names in config['roms'].items():
+        base = 0
+        for name in names:
+            if name == table:
+                return rom, base
+            base += config['tables'][name]['entries']
+    raise KeyError(table)
+
+
+def write_mem(path, words) -> Path:
+    """ Writes a $readmemh image, replacing any previous file. """
+
+    path = Path(path)
+    path.write_text('@00000000\n' + ''.join(f'{int(w):04X}\n' for w in words))
+    return path
+
+
+def read_mem(path) -> np.ndarray:
+    words = [int(tok, 16) for line in Path(path).read_text().splitlines()
+             for tok in line.split('//')[0].split() if not tok.startswith('@')]
+    return np.array(words, dtype=np.uint16)
+
+
+def write_roms(directory=SFU_DIR, config:dict=None, cache_dir=TABLE_CACHE_DIR) -> list:
+    """ Builds (or loads from cache) and writes every ROM image of a configuration.
+
+    :return: (list) Written paths """
+
+    images = build_roms(config, cache_dir)
+    return [write_mem(Path(directory) / rom, words) for rom, words in images.items()]
+
+
+def _parse_overrides(items, cast):
+    """ ['rsqrt=12', '14'] -> {'rsqrt': 12} / 14 """
+
+    if not items:
+        return None
+    single = [cast(v) for v in items if '=' not in v]
+    named = {k: cast(v) for k, v in (item.split('=', 1) for item in items if '=' in item)}
+    return named if not single else (single[-1] if not named else {**{t: single[-1] for t in TABLES}, **named})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the SFU lookup ROM images ($readmemh)')
+    parser.add_argument('-o', '--output', default=str(SFU_DIR), help='Output directory')
+    parser.add_argument('-e', '--entries', nargs='*', help="Entries per table, 'table=N'")
+    parser.add_argument('-f', '--frac-bits', nargs='*', help="Fraction bits, 'N' or 'table=N'")
+    parser.add_argument('-i', '--interpolation', nargs='*',
+                        help=f"{' / '.join(INTERPOLATIONS)}, 'scheme' or 'table=scheme'")
+    parser.add_argument('--no-cache', action='store_true', help='Always rebuild')
+    args = parser.parse_args()
+
+    config = table_config(entries=_parse_overrides(args.entries, int),
+                          frac_bits=_parse_overrides(args.frac_bits, int),
+                          interpolation=_parse_overrides(args.interpolation, str))
+    for path in write_roms(args.output, config, None if args.no_cache else TABLE_CACHE_DIR):
+        print(f'Wrote {path}')
+    for table, params in config['tables'].items():
+        rom, base = table_base(config, table)
+        print(f"  {table:<6} {rom}[{base}:{base + params['entries']}] "
+              f"Q.{params['frac_bits']} {params['interpolation']}")
+
+
+if __name__ == '__main__':
+    main()
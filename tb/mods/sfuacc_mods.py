@@ -0,0 +1,294 @@
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from mods.sfu_mods import TABLES, INTERPOLATIONS, table_config, build_roms, table_base, dequantise
+from mods.iss_mods import EXACT_SFU, float24_to_float32, float32_to_float24
+
+
+MANT_BITS = 15      # float24: 1 sign, 8 exponent, 15 mantissa bits
+DOMAIN = 1 << 24
+
+# Input ranges the error histograms are split into, by unbiased exponent of |x|
+RANGE_EDGES = (-126, -24, -8, 0, 8, 24, 128)
+# ULP error histogram bin edges
+ULP_BINS = (0, 0.5, 1, 2, 4, 16, 256, np.inf)
+# Below this |x|, sin(x) and atan(x) round to x in float24 and bypass the table
+SMALL_ARG = 2.0 ** -8
+
+
+class TableModel:
+    """ Evaluates the SFU operations the way a table-based sfu.sv would:
+    range reduction on the float24 fields, a ROM lookup (with the
+    configured interpolation) on the reduced argument, and reconstruction,
+    truncated to float24 like the FPU. Reductions are computed exactly in
+    float64, so the error measured is that of the tables and of the final
+    truncation.
+
+    RECIP has no ROM of its own in the default layout and is computed as
+    rsqrt(|x|)^2; ATAN folds |x| > 1 onto 1 / |x|. SIN and ATAN return x
+    itself below SMALL_ARG, and inf / NaN inputs are special-cased exactly.
+
+    :param config: (Optional) Table configuration from `sfu_mods.table_config()` """
+
+    def __init__(self, config:dict=None, cache_dir=None):
+        self.config = config or table_config()
+        images = build_roms(self.config, cache_dir)
+        self.tables = {}
+        for table, params in self.config['tables'].items():
+            rom, base = table_base(self.config, table)
+            self.tables[table] = (images[rom][base:base + params['entries']], params)
+
+    def lookup(self, table:str, t) -> np.ndarray:
+        """ Table value at reduced arguments `t` (inside the table's segments). """
+
+        words, params = self.tables[table]
+        segments = TABLES[table]['segments']
+        linear = params['interpolation'] == 'linear'
+        per_segment = params['entries'] // len(segments) // (2 if linear else 1)
+
+        t = np.asarray(t, dtype=np.float64)
+        los = np.array([lo for lo, hi in segments])
+        his = np.array([hi for lo, hi in segments])
+        seg = np.clip(np.searchsorted(los, t, side='right') - 1, 0, len(segments) - 1)
+        pos = (t - los[seg]) / (his[seg] - los[seg]) * per_segment
+        index = np.clip(np.floor(pos).astype(np.int64), 0, per_segment - 1)
+        address = seg * per_segment + index
+        if not linear:
+            return dequantise(words[address], table, params['frac_bits'])
+        base = dequantise(words[2 * address], table, params['frac_bits'])
+        slope = dequantise(words[2 * address + 1], table, params['frac_bits'], signed=True)
+        return base + slope * (pos - index)
+
+    def _rsqrt(self, x):
+        mant, exp = np.frexp(x)             # x = mant * 2^exp, mant in [0.5, 1)
+        m, e = mant * 2, exp - 1            # m in [1, 2)
+        odd = (e & 1).astype(bool)
+        t = np.where(odd, 2 * m, m)
+        k = np.where(odd, e - 1, e) // 2
+        return self.lookup('rsqrt', t) * np.exp2(-k.astype(np.float64))
+
+    def evaluate(self, name:str, x) -> np.ndarray:
+        """ Approximates a def.sv SFU operation on float64 arguments.
+
+        :return: (np.ndarray) float64 results, before float24 truncation """
+
+        x = np.asarray(x, dtype=np.float64)
+        special = ~np.isfinite(x)
+        with np.errstate(all='ignore'):
+            if special.any():
+                y = self.evaluate(name, np.where(special, 1.0, x))
+                return np.where(special, EXACT_SFU[name](x), y)
+            if name == 'RSQRT':
+                y = np.where(x > 0, self._rsqrt(np.where(x > 0, x, 1.0)), np.where(x == 0, np.copysign(np.inf, x), np.nan))
+            elif name == 'RECIP':
+                a = np.abs(x)
+                if 'recip' in self.tables:
+                    mant, exp = np.frexp(np.where(a > 0, a, 1.0))
+                    y = self.lookup('recip', mant * 2) * np.exp2(1.0 - exp)
+                else:
+                    y = self._rsqrt(np.where(a > 0, a, 1.0)) ** 2
+                y = np.where(a > 0, np.copysign(y, x), np.copysign(np.inf, x))
+            elif name == 'LOG2':
+                mant, exp = np.frexp(np.where(x > 0, x, 1.0))
+                y = (exp - 1) + self.lookup('log2', mant * 2)
+                y = np.where(x > 0, y, np.where(x == 0, -np.inf, np.nan))
+            elif name == 'EXP':
+                n = np.floor(x)
+                y = np.ldexp(self.lookup('exp2', np.nan_to_num(x - n)), np.clip(np.nan_to_num(n), -1000, 1000).astype(np.int64))
+                y = np.where(np.isnan(x), np.nan, y)
+            elif name == 'SIN':
+                t = np.mod(x / np.pi, 2.0)
+                y = self.lookup('sin', np.mod(t, 1.0))
+                y = np.where(t >= 1.0, -y, y)
+                y = np.where(np.abs(x) < SMALL_ARG, x, y)
+            elif name == 'ATAN':
+                a = np.abs(x)
+                inner = self.lookup('atan', np.where(a <= 1, a, 1 / a))
+                y = np.copysign(np.where(a <= 1, inner, np.pi / 2 - inner), x)
+                y = np.where(a < SMALL_ARG, x, y)
+            else:
+                raise KeyError(name)
+        return y
+
+    def evaluate24(self, name:str, bits) -> np.ndarray:
+        """ float24 bits in, float24 bits out (inputs flushed to zero when denormal). """
+
+        bits = np.asarray(bits, dtype=np.uint32)
+        x = float24_to_float32(np.where((bits >> MANT_BITS) & 0xFF, bits, bits & 0x800000))
+        with np.errstate(all='ignore'):
+            return float32_to_float24(self.evaluate(name, x.astype(np.float64)).astype(np.float32))
+
+    def iss_functions(self) -> dict:
+        """ {def.sv SFU name: float32 -> float32} for `TauriISS(sfu=...)`. """
+
+        def wrap(name):
+            return lambda x: float24_to_float32(self.evaluate24(name, float32_to_float24(x)))
+        return {name: wrap(name) for name in EXACT_SFU}
+
+
+def ulp_error(bits, exact) -> np.ndarray:
+    """ |approx - exact| in float24 ULPs of the exact value (the ULP of the
+    smallest normal below it). """
+
+    approx = float24_to_float32(bits).astype(np.float64)
+    with np.errstate(all='ignore'):
+        _, exp = np.frexp(np.abs(exact))
+        ulp = np.exp2(np.maximum(exp - 1, -126).astype(np.float64) - MANT_BITS)
+        return np.abs(approx - exact) / ulp
+
+
+def input_domain(step:int=1) -> np.ndarray:
+    """ One float24 bit pattern out of every `step` (all 16M when step is
+    1). Samples are jittered inside their stride, a fixed stride would
+    only hit the same few mantissa bits (often the table segment edges). """
+
+    base = np.arange(0, DOMAIN, step, dtype=np.uint32)
+    if step == 1:
+        return base
+    jitter = np.random.default_rng(0).integers(0, step, len(base), dtype=np.uint32)
+    return np.minimum(base + jitter, DOMAIN - 1).astype(np.uint32)
+
+
+def measure(model:TableModel, name:str, step:int=1, chunk:int=1 << 21) -> dict:
+    """ ULP error of one operation over the float24 domain.
+
+    Inputs whose exact result is not a finite float24 normal (overflow,
+    NaN, poles) only count towards `special_mismatches`, when the model
+    does not produce the matching inf / NaN.
+
+    :param step: (Optional) Sample every `step`-th bit pattern
+    :return: (dict) max / mean ULP, counts and per-range histograms """
+
+    exact_fn = EXACT_SFU[name]
+    hist = np.zeros((len(RANGE_EDGES) - 1, len(ULP_BINS) - 1), dtype=np.int64)
+    total = special = 0
+    max_ulp, sum_ulp, worst = 0.0, 0.0, None
+    domain = input_domain(step)
+    for start in range(0, len(domain), chunk):
+        bits = domain[start:start + chunk]
+        # Flush denormal inputs, as evaluate24 does
+        bits = np.where((bits >> MANT_BITS) & 0xFF, bits, bits & 0x800000)
+        with np.errstate(all='ignore'):
+            x = float24_to_float32(bits).astype(np.float64)
+            exact = exact_fn(x)
+            # Results beyond the float24 range compare as the inf they round to
+            exact = np.where(np.abs(exact) > np.finfo(np.float32).max, np.copysign(np.inf, exact), exact)
+        got = model.evaluate24(name, bits)
+
+        finite = np.isfinite(exact)
+        approx = float24_to_float32(got)
+        special += int(np.count_nonzero(~finite & ~(
+            (np.isnan(exact) & np.isnan(approx)) | (np.isinf(exact) & (approx == exact)))))
+
+        err = ulp_error(got[finite], exact[finite])
+        err = np.where(np.isnan(err), np.inf, err)
+        if len(err):
+            i = int(np.argmax(err))
+            if err[i] > max_ulp or worst is None:
+                max_ulp = float(err[i])
+                worst = int(bits[finite][i])
+            sum_ulp += float(np.sum(err[np.isfinite(err)]))
+        total += len(err)
+
+        _, exp = np.frexp(np.abs(x[finite]))
+        rng = np.clip(np.searchsorted(RANGE_EDGES, exp - 1, side='right') - 1, 0, len(RANGE_EDGES) - 2)
+        col = np.clip(np.searchsorted(ULP_BINS, err, side='right') - 1, 0, len(ULP_BINS) - 2)
+        np.add.at(hist, (rng, col), 1)
+
+    return {
+        'op': name,
+        'points': total,
+        'max_ulp': max_ulp,
+        'mean_ulp': sum_ulp / total if total else 0.0,
+        'within_1ulp': float(hist[:, :2].sum() / total) if total else 0.0,
+        'worst_input': worst,
+        'special_mismatches': special,
+        'ranges': [f'[2^{lo}, 2^{hi})' for lo, hi in zip(RANGE_EDGES[:-1], RANGE_EDGES[1:])],
+        'ulp_bins': [f'<{hi}' if np.isfinite(hi) else f'>={lo}' for lo, hi in zip(ULP_BINS[:-1], ULP_BINS[1:])],
+        'histogram': hist.tolist(),
+    }
+
+
+# Table each operation reads
+OP_TABLES = {'RSQRT': 'rsqrt', 'RECIP': 'rsqrt', 'LOG2': 'log2', 'EXP': 'exp2', 'SIN': 'sin', 'ATAN': 'atan'}
+
+
+def sweep(name:str, entries=(64, 128, 256, 512, 1024, 2048), interpolations=INTERPOLATIONS,
+          frac_bits=(15,), step:int=1, cache_dir=None) -> list:
+    """ Error of one operation against table depth, interpolation and fraction bits.
+
+    :return: (list) One `measure()` dict per point, with the table parameters added """
+
+    table = OP_TABLES[name]
+    results = []
+    for interpolation in interpolations:
+        for n in entries:
+            for bits in frac_bits:
+                config = table_config(entries={table: n}, frac_bits=bits, interpolation=interpolation,
+                                      roms={'sweep': (table,)}, rom_depth=max(n, 1))
+                result = measure(TableModel(config, cache_dir), name, step)
+                result.update(table=table, entries=n, frac_bits=bits, interpolation=interpolation,
+                              rom_bits=n * 16)
+                results.append(result)
+    return results
+
+
+def smallest_table(results:list, target_ulp:float) -> dict:
+    """ Cheapest sweep point whose max ULP error meets the target (None if none do). """
+
+    passing = [r for r in results if r['max_ulp'] <= target_ulp]
+    return min(passing, key=lambda r: (r['rom_bits'], r['max_ulp'])) if passing else None
+
+
+def format_measure(result:dict) -> str:
+    lines = [f"{result['op']:<6} max {result['max_ulp']:10.2f} ulp  mean {result['mean_ulp']:8.3f} ulp  "
+             f"<=1ulp {result['within_1ulp']:6.1%}  specials {result['special_mismatches']}  "
+             f"worst 0x{result['worst_input'] or 0:06x}"]
+    lines.append(f"       {'range':<16}" + ''.join(f'{b:>10}' for b in result['ulp_bins']))
+    for label, row in zip(result['ranges'], result['histogram']):
+        if sum(row):
+            lines.append(f'       {label:<16}' + ''.join(f'{v:>10}' for v in row))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SFU table accuracy over the float24 domain')
+    parser.add_argument('ops', nargs='*', default=list(OP_TABLES), help='def.sv SFU operations')
+    parser.add_argument('-s', '--step', type=int, default=1, help='Sample every n-th float24 input')
+    parser.add_argument('--sweep', action='store_true', help='Sweep table depth and interpolation')
+    parser.add_argument('-e', '--entries', type=int, nargs='*', default=[64, 128, 256, 512, 1024, 2048])
+    parser.add_argument('-f', '--frac-bits', type=int, nargs='*', default=[15])
+    parser.add_argument('-i', '--interpolation', nargs='*', default=list(INTERPOLATIONS))
+    parser.add_argument('-t', '--target', type=float, help='Max ULP target, reports the smallest table meeting it')
+    parser.add_argument('-o', '--output', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    results = {}
+    if not args.sweep:
+        model = TableModel()
+        for name in args.ops:
+            results[name] = measure(model, name, args.step)
+            print(format_measure(results[name]))
+    else:
+        for name in args.ops:
+            points = sweep(name, args.entries, args.interpolation, args.frac_bits, args.step)
+            results[name] = points
+            print(f"{name} ({OP_TABLES[name]} table)")
+            print(f"  {'interp':<9}{'entries':>8}{'frac':>6}{'max ulp':>12}{'mean ulp':>10}{'<=1ulp':>8}")
+            for r in points:
+                print(f"  {r['interpolation']:<9}{r['entries']:>8}{r['frac_bits']:>6}"
+                      f"{r['max_ulp']:>12.2f}{r['mean_ulp']:>10.3f}{r['within_1ulp']:>8.1%}")
+            if args.target is not None:
+                best = smallest_table(points, args.target)
+                print(f"  smallest meeting {args.target} ulp: " + (
+                    f"{best['entries']} x 16b {best['interpolation']} Q.{best['frac_bits']}" if best else 'none'))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=1))
+
+
+if __name__ == '__main__':
+    main()
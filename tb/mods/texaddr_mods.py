@@ -0,0 +1,152 @@
+import numpy as np
+
+
+# texCoordOps.sv wrap modes (texture_wrapS/T_mode_i); 3 falls through to mirror
+GL_REPEAT, GL_CLAMP, GL_MIRROR = 0, 1, 2
+WRAP_MODES = {'repeat': GL_REPEAT, 'clamp': GL_CLAMP, 'mirror': GL_MIRROR}
+
+COORD_BITS = 15     # s, t out of texCoordOps: 0.15 fixed point
+DIM_BITS = 11       # tx_width / tx_height, txWidth_o / txHeight_o
+AGEN_BITS = 22      # texAgen tx_out
+
+# Clamp bounds [0.0, 1.0) by default: float24 fields {exponent, mantissa}
+CLAMP_MIN = 0
+CLAMP_MAX = (126 << 15) | 0x7FFF
+
+
+def _u32(x):
+    return np.asarray(x, dtype=np.uint32)
+
+
+def coord_fields(bits):
+    """ Splits float24 coordinates into the fields texCoordOps uses.
+
+    :return: (sign, exponent, mantissa) uint32 arrays, mantissa is the
+            15-bit stored fraction """
+
+    bits = _u32(bits)
+    return bits >> 23 & 1, bits >> 15 & 0xFF, bits & 0x7FFF
+
+
+def wrap_coord(bits, mode, clamp_min=CLAMP_MIN, clamp_max=CLAMP_MAX):
+    """ One coordinate of texCoordOps.sv, bit exact, including the way the
+    RTL writes its comparisons (the clamp bounds are unsigned {exponent,
+    mantissa} fields, and `&&` binds tighter than `||` in the max clamp).
+
+    :param bits: float24 coordinates (uint32 array)
+    :param mode: Wrap mode, scalar or array (GL_REPEAT / GL_CLAMP / other = mirror)
+    :param clamp_min: 23-bit texture_min_*_clamp_i, scalar or array
+    :param clamp_max: 23-bit texture_max_*_clamp_i, scalar or array
+    :return: (np.ndarray) 15-bit s / t """
+
+    sign, exponent, fraction = coord_fields(bits)
+    mantissa = np.where(exponent == 0, 0, fraction | 0x8000).astype(np.uint32)
+    shamt = np.where((exponent >= 112) & (exponent <= 142), exponent - 111, 0).astype(np.uint32)
+    container = np.where(shamt == 0, 0, (mantissa.astype(np.uint64) << shamt) & 0xFFFFFFFF).astype(np.uint32)
+    coord_abs = container >> 16 & 0x7FFF
+    flip = (~coord_abs + 1) & 0x7FFF
+
+    repeat = np.where(sign == 1, flip, coord_abs)
+
+    min_exp, min_frac = _u32(clamp_min) >> 15 & 0xFF, _u32(clamp_min) & 0x7FFF
+    max_exp, max_frac = _u32(clamp_max) >> 15 & 0xFF, _u32(clamp_max) & 0x7FFF
+    min_clamped = (sign == 1) | (exponent < min_exp) | ((fraction < min_frac) & (exponent == min_exp))
+    max_clamped = ((sign == 0) & (exponent > max_exp)) | ((fraction > max_frac) & (exponent == max_exp))
+    clamp = np.where(min_clamped, 0, np.where(max_clamped, 0x7FFF, coord_abs))
+
+    mirror = np.where((container >> 31) ^ sign == 1, flip, coord_abs)
+
+    mode = _u32(mode)
+    return np.where(mode == GL_REPEAT, repeat, np.where(mode == GL_CLAMP, clamp, mirror)).astype(np.uint32)
+
+
+def tex_coord_ops(s_bits, t_bits, wrap_s=GL_REPEAT, wrap_t=GL_REPEAT,
+                  min_s=CLAMP_MIN, max_s=CLAMP_MAX, min_t=CLAMP_MIN, max_t=CLAMP_MAX):
+    """ texCoordOps.sv for vectors of float24 (s, t).
+
+    :return: (s, t) 15-bit uint32 arrays """
+
+    return wrap_coord(s_bits, wrap_s, min_s, max_s), wrap_coord(t_bits, wrap_t, min_t, max_t)
+
+
+def tex_to_integer(s, t, width, height):
+    """ texToInteger.sv: (s * tx_width)[25:15], (t * tx_height)[25:15].
+
+    :return: (txWidth_o, txHeight_o) 11-bit uint32 arrays """
+
+    width = _u32(width) & 0x7FF
+    height = _u32(height) & 0x7FF
+    x = (_u32(s) & 0x7FFF) * width >> COORD_BITS
+    y = (_u32(t) & 0x7FFF) * height >> COORD_BITS
+    return x & 0x7FF, y & 0x7FF
+
+
+def tex_agen(x, y, height):
+    """ texAgen.sv: y * tx_height + x, 22 bits. The row pitch is the
+    texture height as written, which only matches a linear layout for
+    square textures. """
+
+    return (_u32(y) * (_u32(height) & 0x7FF) + _u32(x)) & ((1 << AGEN_BITS) - 1)
+
+
+def texel_offset(s_bits, t_bits, width, height, wrap_s=GL_REPEAT, wrap_t=GL_REPEAT, **clamps):
+    """ The full texCoordOps -> texToInteger -> texAgen chain.
+
+    :param clamps: (Optional) min_s / max_s / min_t / max_t, see `tex_coord_ops()`
+    :return: (dict) {'s', 't', 'x', 'y', 'offset'} uint32 arrays """
+
+    s, t = tex_coord_ops(s_bits, t_bits, wrap_s, wrap_t, **clamps)
+    x, y = tex_to_integer(s, t, width, height)
+    return {'s': s, 't': t, 'x': x, 'y': y, 'offset': tex_agen(x, y, height)}
+
+
+def texture_address(s_bits, t_bits, width, height, base=0, **kwargs):
+    """ Byte address cache.sv looks up: tx_base + {10'h0, texture_idx}.
+    The offset is not scaled by the texel size.
+
+    :param kwargs: (Optional) Wrap modes and clamps, see `texel_offset()`
+    :return: (np.ndarray) uint32 addresses """
+
+    offset = texel_offset(s_bits, t_bits, width, height, **kwargs)['offset']
+    return (offset.astype(np.uint64) + int(base)).astype(np.uint32)
+
+
+def gl_wrap(bits, mode, clamp_min=CLAMP_MIN, clamp_max=CLAMP_MAX):
+    """ OpenGL semantics of a wrap mode on float24 coordinates, rounded
+    down to 0.15 fixed point (saturating at 0x7FFF), computed in float64.
+
+    :return: (np.ndarray) 15-bit coordinates """
+
+    x = (_u32(bits) << 8).view(np.float32).astype(np.float64)
+    bound = lambda c: (_u32(c) & 0x7FFFFF).astype(np.uint32) << 8
+    lo, hi = bound(clamp_min).view(np.float32), bound(clamp_max).view(np.float32)
+    mode = _u32(mode)
+    with np.errstate(invalid='ignore'):
+        repeat = x - np.floor(x)
+        period = x - 2.0 * np.floor(x / 2.0)
+        mirror = np.where(period < 1.0, period, 2.0 - period)
+        clamp = np.clip(x, lo, hi)
+        value = np.where(mode == GL_REPEAT, repeat, np.where(mode == GL_CLAMP, clamp, mirror))
+        return np.clip(np.floor(value * (1 << COORD_BITS)), 0, 0x7FFF).astype(np.uint32)
+
+
+def divergences(samples:int=1 << 16, lsb:int=1, rng=None) -> dict:
+    """ Wrap modes where texCoordOps.sv and `gl_wrap()` disagree by more
+    than `lsb` (modulo the period for repeat / mirror) on coordinates in
+    [-8, 8). Mirror differs for negative coordinates: the RTL reflects on
+    the parity of the magnitude's integer part instead of the floor's.
+
+    :return: (dict) {mode name: fraction of samples that differ} """
+
+    rng = rng or np.random.default_rng(0)
+    bits = (rng.uniform(-8.0, 8.0, samples).astype(np.float32).view(np.uint32) >> 8).astype(np.uint32)
+    out = {}
+    for name, mode in WRAP_MODES.items():
+        diff = wrap_coord(bits, mode).astype(np.int64) - gl_wrap(bits, mode)
+        if mode != GL_CLAMP:
+            diff %= 1 << COORD_BITS
+            diff = np.minimum(diff, (1 << COORD_BITS) - diff)
+        bad = np.abs(diff) > lsb
+        if bad.any():
+            out[name] = float(bad.mean())
+    return out
@@ -0,0 +1,357 @@
+import json
+import argparse
+import itertools
+from pathlib import Path
+
+import numpy as np
+
+from mods.iss_mods import float32_to_float24
+from mods.scene_mods import get_scene, triangle_areas, SYNTHETIC_SCENES
+from mods.render_mods import setup_triangles, rasterise_triangle
+from mods.texaddr_mods import WRAP_MODES, GL_REPEAT, texel_offset, tex_agen
+
+
+# cache.sv as written: 16 direct-mapped lines, index addr[10:7], tag addr[31:11]
+CACHE_DEFAULTS = dict(line_bytes=128, sets=16, ways=1)
+BUS_BYTES = 4           # tcache_d_data is 32 bits, one beat per word
+ADDRESS_BITS = 32
+
+# Texel orderings inside a texture. 'agen' is texAgen.sv as written
+# (y * tx_height + x); the others are what it could be changed to.
+LAYOUTS = ('agen', 'linear', 'tiled', 'morton')
+TILE = 4
+
+# Miss burst length histogram bins (consecutive misses in the access stream)
+BURST_BINS = (1, 2, 3, 5, 9, 17, np.inf)
+
+
+def _spread_bits(v):
+    """ 11-bit values -> bits spread to the even positions (Morton order). """
+
+    v = np.asarray(v, dtype=np.uint32) & 0x7FF
+    v = (v | v << 8) & 0x00FF00FF
+    v = (v | v << 4) & 0x0F0F0F0F
+    v = (v | v << 2) & 0x33333333
+    return (v | v << 1) & 0x55555555
+
+
+def texel_index(x, y, width:int, height:int, layout:str='agen', tile:int=TILE) -> np.ndarray:
+    """ Texel index of integer texture coordinates under a layout.
+
+    :param x: txWidth_o values
+    :param y: txHeight_o values
+    :param layout: (Optional) One of LAYOUTS
+    :param tile: (Optional) Tile edge of the 'tiled' layout, a power of two
+    :return: (np.ndarray) uint32 texel indices """
+
+    x = np.asarray(x, dtype=np.uint32)
+    y = np.asarray(y, dtype=np.uint32)
+    if layout == 'agen':
+        return tex_agen(x, y, height)
+    if layout == 'linear':
+        return y * np.uint32(width) + x
+    if layout == 'tiled':
+        tiles_x = -(-int(width) // tile)
+        within = (y % tile) * tile + x % tile
+        return ((y // tile) * tiles_x + x // tile) * tile * tile + within
+    if layout == 'morton':
+        return _spread_bits(x) | _spread_bits(y) << 1
+    raise ValueError(f"Unknown layout '{layout}', expected one of {LAYOUTS}")
+
+
+def trace_addresses(trace:dict, layout:str='agen', texel_bytes:int=1, tile:int=TILE) -> np.ndarray:
+    """ Byte addresses cache.sv would look up for a texture coordinate
+    trace: texCoordOps -> texToInteger -> layout -> tx_base + index *
+    texel_bytes. texel_bytes=1 is cache.sv as written (the offset is not
+    scaled); every draw samples its own texture, placed back to back.
+
+    :param trace: From `scene_trace()`, `plane_trace()` or `load_trace()`
+    :return: (np.ndarray) uint32 addresses """
+
+    width, height = int(trace['width']), int(trace['height'])
+    path = texel_offset(trace['s'], trace['t'], width, height, trace.get('wrap_s', GL_REPEAT),
+                        trace.get('wrap_t', GL_REPEAT))
+    index = texel_index(path['x'], path['y'], width, height, layout, tile).astype(np.uint64)
+    # Textures are 4 KiB aligned and as large as the highest texel the trace touches
+    footprint = (int(index.max(initial=0)) + 1) * texel_bytes
+    stride = -(-footprint // 4096) * 4096
+    base = np.asarray(trace.get('draw', np.zeros(len(index))), dtype=np.uint64) * np.uint64(stride)
+    return ((base + index * np.uint64(texel_bytes)) & 0xFFFFFFFF).astype(np.uint32)
+
+
+def _lru_hits(lines, sets, ways, epoch) -> np.ndarray:
+    """ Set-associative LRU replay. Back-to-back accesses to the same line
+    always hit and leave the LRU order unchanged, so only the first of
+    each run goes through the Python loop. """
+
+    hits = np.zeros(len(lines), dtype=bool)
+    first = np.ones(len(lines), dtype=bool)
+    first[1:] = (lines[1:] != lines[:-1]) | (epoch[1:] != epoch[:-1])
+    hits[~first] = True
+
+    where = np.flatnonzero(first)
+    state = [[] for _ in range(sets)]
+    current = -1
+    for i, line, ep in zip(where.tolist(), lines[where].tolist(), epoch[where].tolist()):
+        if ep != current:
+            state = [[] for _ in range(sets)]
+            current = ep
+        ways_of = state[line % sets]
+        if line in ways_of:
+            ways_of.remove(line)
+            hits[i] = True
+        elif len(ways_of) == ways:
+            ways_of.pop(0)
+        ways_of.append(line)
+    return hits
+
+
+def simulate(addresses, line_bytes:int=128, sets:int=16, ways:int=1, flush=None) -> np.ndarray:
+    """ Replays byte addresses through a cache.
+
+    :param addresses: uint32 byte addresses, in lookup order
+    :param line_bytes: (Optional) Line size, a power of two
+    :param sets: (Optional) Number of sets, a power of two
+    :param ways: (Optional) Associativity (LRU replacement)
+    :param flush: (Optional) Boolean per access, invalidates every line
+            before that access (cache_flush_i)
+    :return: (np.ndarray) Boolean hit per access """
+
+    lines = np.asarray(addresses, dtype=np.uint64) // np.uint64(line_bytes)
+    epoch = np.cumsum(flush, dtype=np.int64) if flush is not None else np.zeros(len(lines), dtype=np.int64)
+    if ways > 1:
+        return _lru_hits(lines.astype(np.int64), sets, ways, epoch)
+
+    # Direct mapped: an access hits when the previous access to its set
+    # (since the last flush) was to the same line. Repeats of the previous
+    # line always hit, so only the first access of each run is sorted.
+    first = np.ones(len(lines), dtype=bool)
+    first[1:] = (lines[1:] != lines[:-1]) | (epoch[1:] != epoch[:-1])
+    where = np.flatnonzero(first)
+    lines, epoch = lines[where], epoch[where]
+    index = (lines % np.uint64(sets)).astype(np.int64)
+    order = np.lexsort((where, index, epoch))
+    same_set = np.zeros(len(lines), dtype=bool)
+    same_set[1:] = (index[order][1:] == index[order][:-1]) & (epoch[order][1:] == epoch[order][:-1])
+    same_line = np.zeros(len(lines), dtype=bool)
+    same_line[1:] = lines[order][1:] == lines[order][:-1]
+    hits = ~first
+    hits[where[order]] = same_set & same_line
+    return hits
+
+
+def miss_bursts(hits) -> np.ndarray:
+    """ Lengths of the runs of consecutive misses. """
+
+    miss = np.concatenate([[False], ~np.asarray(hits, dtype=bool), [False]])
+    edges = np.flatnonzero(miss[1:] != miss[:-1])
+    return edges[1::2] - edges[0::2]
+
+
+def cache_stats(addresses, hits, line_bytes:int, sets:int, ways:int, flush=None) -> dict:
+    """ Hit rate, TileLink traffic and miss burst statistics of a replay.
+    Every miss is one Get of a full line, line_bytes / BUS_BYTES beats on
+    channel D. Cold misses are first touches of a line (per flush epoch). """
+
+    addresses = np.asarray(addresses, dtype=np.uint64)
+    accesses = len(addresses)
+    misses = int(accesses - np.count_nonzero(hits))
+    lines = addresses // np.uint64(line_bytes)
+    epoch = np.cumsum(flush, dtype=np.int64) if flush is not None else np.zeros(accesses, dtype=np.int64)
+    cold = len(np.unique(epoch << 32 | lines.astype(np.int64))) if accesses else 0
+    bursts = miss_bursts(hits)
+    counts, _ = np.histogram(bursts, bins=BURST_BINS)
+    offset_bits = int(np.log2(line_bytes * sets))
+    return {
+        'line_bytes': line_bytes,
+        'sets': sets,
+        'ways': ways,
+        'data_bytes': line_bytes * sets * ways,
+        'tag_bits': (ADDRESS_BITS - offset_bits + 1) * sets * ways,   # tag + valid per line
+        'accesses': accesses,
+        'hits': accesses - misses,
+        'misses': misses,
+        'hit_rate': (accesses - misses) / accesses if accesses else 0.0,
+        'cold_misses': cold,
+        'bytes_fetched': misses * line_bytes,
+        'beats': misses * line_bytes // BUS_BYTES,
+        'bytes_per_access': misses * line_bytes / accesses if accesses else 0.0,
+        'burst_max': int(bursts.max(initial=0)),
+        'burst_mean': float(bursts.mean()) if len(bursts) else 0.0,
+        'burst_p95': float(np.percentile(bursts, 95)) if len(bursts) else 0.0,
+        'bursts': {f'{int(lo)}-{hi - 1:g}' if hi - 1 != lo else f'{int(lo)}': int(n)
+                   for lo, hi, n in zip(BURST_BINS[:-1], BURST_BINS[1:], counts)},
+    }
+
+
+def run_trace(trace:dict, layout:str='agen', texel_bytes:int=1, flush_per_draw:bool=False, tile:int=TILE,
+              **cache) -> dict:
+    """ Address path + cache replay + statistics for one configuration.
+
+    :param cache: (Optional) line_bytes / sets / ways, defaults to CACHE_DEFAULTS
+    :return: (dict) `cache_stats()` plus the layout parameters """
+
+    cache = {**CACHE_DEFAULTS, **cache}
+    addresses = trace_addresses(trace, layout, texel_bytes, tile)
+    flush = None
+    if flush_per_draw and 'draw' in trace:
+        draw = np.asarray(trace['draw'])
+        flush = np.concatenate([[False], draw[1:] != draw[:-1]])
+    hits = simulate(addresses, flush=flush, **cache)
+    return {'layout': layout, 'texel_bytes': texel_bytes,
+            **cache_stats(addresses, hits, flush=flush, **cache)}
+
+
+def sweep(trace:dict, layouts=('agen',), line_bytes=(128,), sets=(16,), ways=(1,), texel_bytes=(1,),
+          flush_per_draw:bool=False) -> list:
+    """ `run_trace()` over the cartesian product of the parameters. """
+
+    results = []
+    for layout, tb, lb, s, w in itertools.product(layouts, texel_bytes, line_bytes, sets, ways):
+        results.append(run_trace(trace, layout, tb, flush_per_draw, line_bytes=lb, sets=s, ways=w))
+    return results
+
+
+def _trace(s, t, draw, width, height, wrap_s, wrap_t) -> dict:
+    return {
+        's': float32_to_float24(np.asarray(s, dtype=np.float32)),
+        't': float32_to_float24(np.asarray(t, dtype=np.float32)),
+        'draw': np.asarray(draw, dtype=np.uint32),
+        'width': int(width), 'height': int(height),
+        'wrap_s': WRAP_MODES.get(wrap_s, wrap_s), 'wrap_t': WRAP_MODES.get(wrap_t, wrap_t),
+    }
+
+
+def scene_trace(scene, width:int=64, height:int=64, repeat:float=1.0, wrap_s='repeat', wrap_t='repeat',
+                max_fragments:int=None) -> dict:
+    """ Texture coordinate trace of a scene, in the order the golden
+    renderer (genpix) emits fragments. Scenes carry no UVs, so every
+    triangle maps the texture once corner to corner ((0, 0), (r, 0),
+    (r, r) at its vertices, r = `repeat`), which makes the texel density
+    follow the triangle's screen size like an unmipmapped texture does.
+    Fragments are traced before the depth test.
+
+    :param scene: A `Scene` or a name for `get_scene()`
+    :param width: (Optional) Texture width in texels (tx_width)
+    :param height: (Optional) Texture height in texels (tx_height)
+    :param max_fragments: (Optional) Stop after this many fragments
+    :return: (dict) {'s', 't' (float24), 'draw', 'width', 'height', 'wrap_s', 'wrap_t'} """
+
+    scene = get_scene(scene) if isinstance(scene, str) else scene
+    corners = np.array([[0.0, 0.0], [repeat, 0.0], [repeat, repeat]])
+    s_out, t_out, draw_out = [], [], []
+    total = 0
+    for d in range(len(scene.draws)):
+        tris = np.asarray(scene.triangles(d), dtype=np.float64)
+        tris = tris[triangle_areas(tris) > 0]    # culled by setup.sv, as in the renderer
+        if not len(tris):
+            continue
+        setup = setup_triangles(tris)
+        for i in range(len(tris)):
+            xs, ys, w0, w1, w2, inside = rasterise_triangle(setup, i)
+            on_screen = inside & (xs >= 0) & (xs < scene.width) & (ys >= 0) & (ys < scene.height)
+            if not on_screen.any():
+                continue
+            w = np.stack([w0[on_screen], w1[on_screen], w2[on_screen]]).astype(np.float64)
+            w /= np.maximum(w.sum(axis=0), 1)
+            uv = w.T @ corners
+            s_out.append(uv[:, 0])
+            t_out.append(uv[:, 1])
+            draw_out.append(np.full(len(uv), d))
+            total += len(uv)
+            if max_fragments and total >= max_fragments:
+                break
+        if max_fragments and total >= max_fragments:
+            break
+    cat = lambda parts: np.concatenate(parts)[:max_fragments] if parts else np.zeros(0)
+    return _trace(cat(s_out), cat(t_out), cat(draw_out), width, height, wrap_s, wrap_t)
+
+
+def plane_trace(screen_width:int=320, screen_height:int=200, width:int=64, height:int=64,
+                texels_per_pixel:float=1.0, angle:float=0.0, wrap_s='repeat', wrap_t='repeat') -> dict:
+    """ A full-screen textured plane traversed in raster order, rotated by
+    `angle` degrees in texture space: 0 walks along texture rows, 90 down
+    its columns (the worst case for a row-major layout). """
+
+    ys, xs = np.mgrid[0:screen_height, 0:screen_width]
+    theta = np.deg2rad(angle)
+    u = (xs * np.cos(theta) - ys * np.sin(theta)) * texels_per_pixel
+    v = (xs * np.sin(theta) + ys * np.cos(theta)) * texels_per_pixel
+    return _trace((u / width).ravel(), (v / height).ravel(), np.zeros(u.size), width, height, wrap_s, wrap_t)
+
+
+def save_trace(path, trace:dict) -> Path:
+    """ Writes a trace (e.g. captured from a game) as .npz. """
+
+    path = Path(path)
+    np.savez_compressed(path, **{k: np.asarray(v) for k, v in trace.items()})
+    return path
+
+
+def load_trace(path) -> dict:
+    """ Reads a .npz trace. 's' / 't' are float24 bits; 'draw',
+    'wrap_s' / 'wrap_t' are optional, 'width' / 'height' required. """
+
+    with np.load(path) as data:
+        trace = {k: data[k] for k in data.files}
+    for key in ('width', 'height', 'wrap_s', 'wrap_t'):
+        if key in trace:
+            trace[key] = int(trace[key])
+    return trace
+
+
+def get_trace(source:str, width:int=64, height:int=64, **kwargs) -> dict:
+    """ A trace by .npz path, scene (see `get_scene()`) or 'plane[:angle]'. """
+
+    if source.endswith('.npz'):
+        return load_trace(source)
+    if source.startswith('plane'):
+        angle = float(source.split(':', 1)[1]) if ':' in source else 0.0
+        return plane_trace(width=width, height=height, angle=angle)
+    return scene_trace(source, width, height, **kwargs)
+
+
+def format_result(result:dict) -> str:
+    return (f"{result['layout']:<7} {result['texel_bytes']}B/texel {result['line_bytes']:>4}B x "
+            f"{result['sets']:>3} sets x {result['ways']} ways ({result['data_bytes'] / 1024:>5.1f} KiB): "
+            f"hit {result['hit_rate']:7.2%}  {result['bytes_per_access']:6.2f} B/lookup  "
+            f"{result['bytes_fetched'] / 1024:10.1f} KiB  bursts max {result['burst_max']} "
+            f"p95 {result['burst_p95']:g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trace-driven texture cache model (cache.sv address path)')
+    parser.add_argument('-s', '--source', default='corridor',
+                        help=f"*.npz trace, *.scene / *.obj, one of {list(SYNTHETIC_SCENES)} or 'plane[:angle]'")
+    parser.add_argument('--texture', default='64x64', help='Texture size WxH (scene / plane traces)')
+    parser.add_argument('--repeat', type=float, default=1.0, help='Texture repeats per triangle (scene traces)')
+    parser.add_argument('--max-fragments', type=int, default=None, help='Truncate scene traces')
+    parser.add_argument('-l', '--layout', nargs='*', default=['agen'], choices=LAYOUTS)
+    parser.add_argument('-b', '--line-bytes', nargs='*', type=int, default=[CACHE_DEFAULTS['line_bytes']])
+    parser.add_argument('-n', '--sets', nargs='*', type=int, default=[CACHE_DEFAULTS['sets']])
+    parser.add_argument('-w', '--ways', nargs='*', type=int, default=[CACHE_DEFAULTS['ways']])
+    parser.add_argument('-t', '--texel-bytes', nargs='*', type=int, default=[1],
+                        help='1 is cache.sv as written (unscaled texAgen offset)')
+    parser.add_argument('--flush-per-draw', action='store_true', help='cache_flush_i before every draw')
+    parser.add_argument('--save-trace', type=str, default=None, help='Write the trace to this .npz')
+    parser.add_argument('-o', '--output', type=str, default=None, help='Write the results as JSON')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.texture.lower().split('x'))
+    kwargs = {} if args.source.endswith('.npz') or args.source.startswith('plane') else \
+        {'repeat': args.repeat, 'max_fragments': args.max_fragments}
+    trace = get_trace(args.source, width, height, **kwargs)
+    if args.save_trace:
+        print(f'Wrote {save_trace(args.save_trace, trace)}')
+    print(f"{args.source}: {len(trace['s'])} lookups, {trace['width']}x{trace['height']} texture")
+
+    results = sweep(trace, args.layout, args.line_bytes, args.sets, args.ways, args.texel_bytes,
+                    args.flush_per_draw)
+    for result in results:
+        print(format_result(result))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+import json
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import cocotb
+from cocotb.triggers import RisingEdge, FallingEdge, ReadOnly
+
+from mods.perf_mods import read_int, report_dir
+
+
+# TileLink Uncached Heavyweight (TL-UH) opcodes
+A_PUT_FULL, A_PUT_PARTIAL, A_ARITHMETIC, A_LOGICAL, A_GET, A_INTENT = range(6)
+D_ACCESS_ACK, D_ACCESS_ACK_DATA, D_HINT_ACK = range(3)
+
+A_NAMES = {A_PUT_FULL: 'put_full', A_PUT_PARTIAL: 'put_partial', A_ARITHMETIC: 'arithmetic',
+           A_LOGICAL: 'logical', A_GET: 'get', A_INTENT: 'intent'}
+
+A_SIGNALS = ('opcode', 'param', 'size', 'address', 'mask', 'data', 'corrupt', 'valid')
+D_SIGNALS = ('opcode', 'param', 'size', 'denied', 'data', 'corrupt', 'valid')
+
+
+class PagedMemory:
+    """ Sparse byte-addressed memory: pages are allocated on first touch
+    and initialised by `fill`, so untouched memory reads back a known
+    pattern without backing the whole address space.
+
+    :param page_bits: (Optional) log2 of the page size in bytes
+    :param fill: (Optional) None for zeros, 'address' for every aligned
+            32-bit word holding its own address, or f(page base, page
+            bytes) -> uint8 array """
+
+    def __init__(self, page_bits:int=12, fill=None):
+        self.page_bits = page_bits
+        self.page_bytes = 1 << page_bits
+        self.fill = fill
+        self.pages = {}
+
+    def _page(self, number:int) -> np.ndarray:
+        page = self.pages.get(number)
+        if page is None:
+            base = number << self.page_bits
+            if self.fill is None:
+                page = np.zeros(self.page_bytes, dtype=np.uint8)
+            elif self.fill == 'address':
+                words = (base + 4 * np.arange(self.page_bytes // 4, dtype=np.uint64)) & 0xFFFFFFFF
+                page = words.astype('<u4').view(np.uint8).copy()
+            else:
+                page = np.asarray(self.fill(base, self.page_bytes), dtype=np.uint8).copy()
+            self.pages[number] = page
+        return page
+
+    def _spans(self, address:int, length:int):
+        """ (page, offset, start, stop) pieces of [address, address + length). """
+
+        done = 0
+        while done < length:
+            number, offset = divmod(address + done, self.page_bytes)
+            count = min(length - done, self.page_bytes - offset)
+            yield self._page(number), offset, done, done + count
+            done += count
+
+    def read(self, address:int, length:int) -> np.ndarray:
+        """ `length` bytes from `address` as a uint8 array. """
+
+        out = np.empty(length, dtype=np.uint8)
+        for page, offset, start, stop in self._spans(address, length):
+            out[start:stop] = page[offset:offset + stop - start]
+        return out
+
+    def write(self, address:int, data, mask=None):
+        """ Writes bytes, only where `mask` (bool per byte) is set. """
+
+        data = np.asarray(data, dtype=np.uint8)
+        mask = np.ones(len(data), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        for page, offset, start, stop in self._spans(address, len(data)):
+            keep = mask[start:stop]
+            page[offset:offset + stop - start][keep] = data[start:stop][keep]
+
+    def read_word(self, address:int, width:int=4) -> int:
+        return int.from_bytes(self.read(address, width).tobytes(), 'little')
+
+    def write_word(self, address:int, value:int, width:int=4):
+        self.write(address, np.frombuffer(int(value).to_bytes(width, 'little'), dtype=np.uint8))
+
+    def load(self, address:int, data):
+        """ Copies a bytes-like object or array (viewed as bytes) in. """
+
+        self.write(address, np.frombuffer(np.ascontiguousarray(data).tobytes(), dtype=np.uint8))
+
+
+class TileLinkSlave:
+    """ TileLink-UH slave (manager) agent backed by a `PagedMemory`.
+    Serves Get with AccessAckData and PutFullData / PutPartialData with
+    AccessAck, including multi-beat bursts (2^size bytes over a
+    bus_bytes-wide data bus), in order. Intent gets a HintAck; Arithmetic
+    / Logical and addresses outside `regions` are answered with denied.
+
+    a_ready is driven high with probability `a_ready_rate` every cycle;
+    each response waits `latency` cycles (an int or an inclusive (min,
+    max) range) after the last A beat, and a D beat is held until the
+    master's d_ready, so master back-pressure stalls the slave. Every
+    transaction is recorded with its beats, bytes and cycle stamps.
+
+    Usage:
+        mem = PagedMemory(fill='address')
+        slave = TileLinkSlave(dut, dut.core_clock_i, 'tcache', mem, latency=(4, 12)).start()
+        ...
+        slave.stop()
+        slave.write_json('test_name') """
+
+    def __init__(self, dut, clock, prefix:str, memory:PagedMemory=None, latency=1, a_ready_rate:float=1.0,
+                 d_gap_rate:float=0.0, bus_bytes:int=4, regions=None, rng=None):
+        self.dut = dut
+        self.clock = clock
+        self.memory = memory if memory is not None else PagedMemory()
+        self.latency = latency
+        self.a_ready_rate = a_ready_rate
+        self.d_gap_rate = d_gap_rate
+        self.bus_bytes = bus_bytes
+        self.regions = regions
+        self.rng = rng or np.random.default_rng()
+
+        self.a = {name: getattr(dut, f'{prefix}_a_{name}') for name in A_SIGNALS if hasattr(dut, f'{prefix}_a_{name}')}
+        self.a_ready = getattr(dut, f'{prefix}_a_ready')
+        self.d = {name: getattr(dut, f'{prefix}_d_{name}') for name in D_SIGNALS if hasattr(dut, f'{prefix}_d_{name}')}
+        self.d_ready = getattr(dut, f'{prefix}_d_ready')
+
+        self.transactions = []
+        self.cycle = 0
+        self._put = None            # Put burst being received
+        self._responses = deque()   # Transactions waiting for / on channel D
+        self._task = None
+
+    def start(self):
+        """ Starts responding in the background. """
+
+        self._task = cocotb.start_soon(self._run())
+        return self
+
+    def stop(self):
+        """ Stops responding and releases the channels. """
+
+        if self._task is not None:
+            self._task.kill()
+            self._task = None
+        self.a_ready.value = 0
+        self.d['valid'].value = 0
+
+    @property
+    def idle(self) -> bool:
+        """ No burst being received and no response outstanding. """
+
+        return self._put is None and not self._responses
+
+    async def wait_idle(self):
+        while not self.idle:
+            await RisingEdge(self.clock)
+
+    def _delay(self) -> int:
+        if isinstance(self.latency, (tuple, list)):
+            return int(self.rng.integers(self.latency[0], self.latency[1] + 1))
+        return int(self.latency)
+
+    def _beats(self, size:int) -> int:
+        return max(1, (1 << size) // self.bus_bytes)
+
+    def _allowed(self, address:int, length:int) -> bool:
+        if self.regions is None:
+            return True
+        return any(base <= address and address + length <= base + size for base, size in self.regions)
+
+    def _accept(self, beat:dict):
+        """ Handles one A beat. Put bursts complete on their last beat. """
+
+        opcode, size = beat['opcode'], beat['size']
+        if self._put is None:
+            length = 1 << size
+            # The burst base is aligned to its size, beats walk the bus words
+            base = beat['address'] & ~(length - 1) if length > self.bus_bytes else beat['address']
+            txn = {'opcode': A_NAMES.get(opcode, str(opcode)), 'a_opcode': opcode, 'address': beat['address'],
+                   'size': size, 'bytes': length, 'beats_a': 0, 'beats_d': 0,
+                   'denied': opcode in (A_ARITHMETIC, A_LOGICAL) or opcode > A_INTENT
+                             or not self._allowed(base, length),
+                   'base': base, 'a_first': self.cycle}
+            self.transactions.append(txn)
+        else:
+            txn = self._put
+
+        txn['beats_a'] += 1
+        if txn['a_opcode'] in (A_PUT_FULL, A_PUT_PARTIAL):
+            if not txn['denied']:
+                lane = (txn['base'] + (txn['beats_a'] - 1) * self.bus_bytes) & ~(self.bus_bytes - 1)
+                mask = [(beat['mask'] >> i) & 1 for i in range(self.bus_bytes)]
+                data = np.frombuffer(beat['data'].to_bytes(self.bus_bytes, 'little'), dtype=np.uint8)
+                self.memory.write(lane, data, mask)
+            if txn['beats_a'] < self._beats(txn['size']):
+                self._put = txn
+                return
+            self._put = None
+        txn['a_last'] = self.cycle
+        # The first D beat is driven from the next cycle on: latency 1 answers back to back
+        txn['ready_at'] = self.cycle + max(self._delay(), 1) - 1
+        self._responses.append(txn)
+
+    def _d_beat(self, txn:dict) -> dict:
+        """ Fields of the next D beat of a transaction. """
+
+        opcode = txn['a_opcode']
+        data = 0
+        if opcode == A_GET:
+            d_opcode = D_ACCESS_ACK_DATA
+            if not txn['denied']:
+                lane = (txn['base'] + txn['beats_d'] * self.bus_bytes) & ~(self.bus_bytes - 1)
+                data = self.memory.read_word(lane, self.bus_bytes)
+        elif opcode == A_INTENT:
+            d_opcode = D_HINT_ACK
+        elif opcode in (A_ARITHMETIC, A_LOGICAL):
+            d_opcode = D_ACCESS_ACK_DATA
+        else:
+            d_opcode = D_ACCESS_ACK
+        return {'opcode': d_opcode, 'param': 0, 'size': txn['size'], 'denied': int(txn['denied']),
+                'data': data, 'corrupt': int(txn['denied'] and d_opcode == D_ACCESS_ACK_DATA), 'valid': 1}
+
+    def _d_total(self, txn:dict) -> int:
+        return self._beats(txn['size']) if txn['a_opcode'] in (A_GET, A_ARITHMETIC, A_LOGICAL) else 1
+
+    async def _run(self):
+        self.a_ready.value = 0
+        self.d['valid'].value = 0
+        await FallingEdge(self.clock)
+        beat = None
+        while True:
+            # Drive this cycle's a_ready and D beat (held until d_ready)
+            a_ready = int(self.rng.random() < self.a_ready_rate)
+            self.a_ready.value = a_ready
+            if beat is None and self._responses and self._responses[0]['ready_at'] <= self.cycle \
+                    and not self.rng.random() < self.d_gap_rate:
+                beat = self._d_beat(self._responses[0])
+            for name, handle in self.d.items():
+                handle.value = beat[name] if beat is not None else 0
+
+            await RisingEdge(self.clock)
+            await ReadOnly()
+            self.cycle += 1
+
+            if beat is not None and read_int(self.d_ready):
+                txn = self._responses[0]
+                txn['beats_d'] += 1
+                txn.setdefault('d_first', self.cycle)
+                beat = None
+                if txn['beats_d'] == self._d_total(txn):
+                    txn['d_last'] = self.cycle
+                    txn['latency'] = txn['d_first'] - txn['a_last']
+                    self._responses.popleft()
+            if a_ready and read_int(self.a['valid']):
+                self._accept({name: read_int(self.a[name]) for name in ('opcode', 'size', 'address', 'mask', 'data')
+                              if name in self.a})
+
+            await FallingEdge(self.clock)
+
+    def stats(self) -> dict:
+        """ Totals per opcode: transactions, beats, bytes and D latency. """
+
+        done = [t for t in self.transactions if 'd_last' in t]
+        out = {'transactions': len(self.transactions), 'completed': len(done),
+               'denied': sum(t['denied'] for t in self.transactions),
+               'beats_a': sum(t['beats_a'] for t in self.transactions),
+               'beats_d': sum(t['beats_d'] for t in self.transactions),
+               'opcodes': {}}
+        for name in sorted({t['opcode'] for t in done}):
+            rows = [t for t in done if t['opcode'] == name]
+            latency = np.array([t['latency'] for t in rows])
+            out['opcodes'][name] = {
+                'count': len(rows),
+                'bytes': sum(t['bytes'] for t in rows),
+                'beats_a': sum(t['beats_a'] for t in rows),
+                'beats_d': sum(t['beats_d'] for t in rows),
+                'latency_mean': float(latency.mean()),
+                'latency_max': int(latency.max()),
+                'duration_mean': float(np.mean([t['d_last'] - t['a_first'] for t in rows])),
+            }
+        return out
+
+    def write_json(self, name:str, directory=None) -> Path:
+        """ Writes stats() and every transaction as tilelink_<name>.json next to results.xml. """
+
+        path = Path(directory or report_dir()) / f'tilelink_{name}.json'
+        path.write_text(json.dumps({'stats': self.stats(), 'transactions': self.transactions}, indent=1))
+        self.dut._log.info(f'TileLink report written to {path}')
+        return path
@@ -0,0 +1,251 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from mods.isa_mods import Assembler, TYPE_ALU, TYPE_FPU, TYPE_SFU, TYPE_NAMES, MEM_STORES
+from mods.iss_mods import LANES, float24_to_float32
+
+
+# One record per register write-back (or branch) of the core. Records are
+# kept per unit in retirement order, since the ALU (write-back 1 cycle
+# after dispatch) and FPU (3 cycles) pipelines retire out of program order
+# relative to each other.
+COMMIT_DTYPE = np.dtype([
+    ('seq', '<u4'),         # program index (reference) / commit count (RTL)
+    ('cycle', '<u8'),       # cycle of the write (RTL), 0 for the reference
+    ('unit', 'u1'),         # TYPE_ALU / TYPE_FPU / TYPE_MEM / TYPE_SFU
+    ('regfile', 'u1'),      # 0 integer, 1 float24, 2 none (branch)
+    ('dest', 'u1'),         # 6-bit register, bank in bit 5
+    ('taken', 'u1'),        # branch taken mask, one bit per lane
+    ('lanes', '<u4', (LANES,)),
+])
+REGFILE_INT, REGFILE_FP, REGFILE_NONE = 0, 1, 2
+
+
+class CommitTrace:
+    """ Growable binary commit trace. Appends go into a preallocated
+    structured array that doubles when full, saves are a single write.
+
+    :param capacity: (int) Initial number of records """
+
+    def __init__(self, capacity:int=4096):
+        self._data = np.zeros(capacity, dtype=COMMIT_DTYPE)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, seq, cycle, unit, regfile, dest, lanes, taken=0):
+        if self._len == len(self._data):
+            self._data = np.concatenate([self._data, np.zeros_like(self._data)])
+        rec = self._data[self._len]
+        rec['seq'] = seq
+        rec['cycle'] = cycle
+        rec['unit'] = unit
+        rec['regfile'] = regfile
+        rec['dest'] = dest
+        rec['taken'] = taken
+        rec['lanes'] = lanes
+        self._len += 1
+
+    @property
+    def records(self) -> np.ndarray:
+        return self._data[:self._len]
+
+    def save(self, path) -> Path:
+        """ Writes the raw records (np.fromfile-able with COMMIT_DTYPE). """
+
+        path = Path(path)
+        self.records.tofile(path)
+        return path
+
+
+def load_trace(path) -> np.ndarray:
+    return np.fromfile(path, dtype=COMMIT_DTYPE)
+
+
+def reference_trace(iss, program) -> tuple:
+    """ Runs a program on the ISS (warp 0) and records the commit each
+    instruction should produce. Stores and ALU writes to a0 / b0 produce
+    none: alu.sv never enables the write-back for destination index 0.
+
+    :param iss: (TauriISS) Simulator, its state is the initial state
+    :param program: uint32 words or assembly text
+    :return: (trace, words) COMMIT_DTYPE records and the program words """
+
+    if isinstance(program, str):
+        program = iss.assembler.assemble(program)
+    words = np.asarray(program, dtype=np.uint32)
+    trace = CommitTrace(len(words))
+    for seq, word in enumerate(words.tolist()):
+        fn = iss.decode(word)
+        taken = fn()
+        dest = (word >> 9) & 63
+        if taken is not None:
+            mask = int((taken[0].astype(int) << np.arange(LANES)).sum())   # bit i = lane i
+            trace.append(seq, 0, fn.unit, REGFILE_NONE, 0, 0, mask)
+        elif fn.name in MEM_STORES or (fn.unit == TYPE_ALU and not dest & 31):
+            continue
+        else:
+            fp = fn.unit in (TYPE_FPU, TYPE_SFU) or fn.name in ('fl24', 'tex2d', 'tex3d')
+            regs = iss.fp_regs if fp else iss.int_regs
+            trace.append(seq, 0, fn.unit, REGFILE_FP if fp else REGFILE_INT, dest, regs[dest >> 5, dest & 31, 0])
+    return trace.records.copy(), words
+
+
+def _unit_streams(records):
+    return {unit: records[records['unit'] == unit] for unit in TYPE_NAMES}
+
+
+def _commit_matches(rtl, ref) -> bool:
+    if ref['regfile'] == REGFILE_NONE:
+        return rtl['taken'] == ref['taken']
+    return (rtl['regfile'] == ref['regfile'] and rtl['dest'] == ref['dest']
+            and bool(np.all(rtl['lanes'] == ref['lanes'])))
+
+
+def _lane_values(lanes, regfile) -> list:
+    if regfile == REGFILE_FP:
+        return float24_to_float32(lanes & 0xFFFFFF).tolist()
+    return lanes.view(np.int32).tolist()
+
+
+def format_commit(rec, words=None, assembler=None) -> str:
+    """ One-line rendering of a commit record. """
+
+    unit = TYPE_NAMES[int(rec['unit'])]
+    if rec['regfile'] == REGFILE_NONE:
+        body = f"branch taken={int(rec['taken']):04b}"
+    else:
+        reg = f"{'ab'[rec['dest'] >> 5]}{rec['dest'] & 31}"
+        values = _lane_values(rec['lanes'], rec['regfile'])
+        body = f"{'fp ' if rec['regfile'] == REGFILE_FP else 'int'} {reg:<3} = {values}"
+    text = f"[{unit}] {body}"
+    if words is not None and assembler is not None and rec['seq'] < len(words):
+        text = f"#{int(rec['seq']):<6} {assembler.disassemble([words[rec['seq']]])[0]:<28} " + text
+    return text
+
+
+class LockstepChecker:
+    """ Compares RTL commits against a reference trace as they happen and
+    stops at the first divergence. Each unit is matched in its own
+    retirement order; the report gives the failing instruction and the
+    register context of both sides (reference replayed up to that
+    instruction, RTL shadowed from its own commits).
+
+    :param reference: COMMIT_DTYPE records from `reference_trace()`
+    :param words: (np.ndarray) Program words, for disassembly in reports """
+
+    def __init__(self, reference, words=None):
+        self.reference = reference
+        self.words = words
+        self.streams = _unit_streams(reference)
+        self.position = dict.fromkeys(TYPE_NAMES, 0)
+        self.rtl = CommitTrace()
+        self.extra = 0
+        self.mismatch = None
+        self.assembler = Assembler()
+        # Shadow of the RTL register files, rebuilt from its commits
+        self.rtl_regs = np.zeros((2, 2, 32, LANES), dtype=np.uint32)    # [regfile, bank, reg, lane]
+
+    @property
+    def done(self) -> bool:
+        return all(self.position[u] == len(s) for u, s in self.streams.items())
+
+    def commit(self, cycle, unit, regfile, dest, lanes, taken=0) -> bool:
+        """ Checks one RTL commit.
+
+        :return: (bool) True while RTL and reference agree """
+
+        self.rtl.append(len(self.rtl), cycle, unit, regfile, dest, lanes, taken)
+        rec = self.rtl.records[-1]
+        if self.mismatch is not None:
+            return False
+
+        stream, pos = self.streams[unit], self.position[unit]
+        if pos >= len(stream):
+            self.extra += 1
+        else:
+            ref = stream[pos]
+            self.position[unit] += 1
+            if not _commit_matches(rec, ref):
+                # Leave the shadow registers as they were before the failing write
+                self.mismatch = (rec.copy(), ref.copy())
+                return False
+        if regfile != REGFILE_NONE:
+            self.rtl_regs[regfile, dest >> 5, dest & 31] = lanes
+        return True
+
+    def reference_regs(self, upto_seq) -> np.ndarray:
+        """ Reference register files after every instruction before `upto_seq`. """
+
+        regs = np.zeros_like(self.rtl_regs)
+        for rec in self.reference[self.reference['seq'] < upto_seq]:
+            if rec['regfile'] != REGFILE_NONE:
+                regs[rec['regfile'], rec['dest'] >> 5, rec['dest'] & 31] = rec['lanes']
+        return regs
+
+    def report(self) -> str:
+        """ Human readable description of the first mismatch (empty when none). """
+
+        if self.mismatch is None:
+            return ''
+        rtl, ref = self.mismatch
+        seq = int(ref['seq'])
+        lines = [f"First divergence at cycle {int(rtl['cycle'])}, instruction #{seq}:",
+                 '  expected ' + format_commit(ref, self.words, self.assembler),
+                 '  got      ' + format_commit(rtl)]
+
+        # Register context: operands of the failing instruction and its destination
+        ref_regs = self.reference_regs(seq)
+        if self.words is not None:
+            word = int(self.words[seq])
+            regfile = int(ref['regfile']) if ref['regfile'] != REGFILE_NONE else REGFILE_INT
+            regs = [(0, (word >> 16) & 31), (1, (word >> 21) & 31), ((word >> 14) & 1, (word >> 9) & 31)]
+            lines.append('  register context before the instruction (reference | RTL):')
+            for bank, r in dict.fromkeys(regs):
+                ref_v, rtl_v = ref_regs[regfile, bank, r], self.rtl_regs[regfile, bank, r]
+                flag = '' if np.array_equal(ref_v, rtl_v) else '   <-- differs'
+                lines.append(f"    {'ab'[bank]}{r:<3} {_lane_values(ref_v, regfile)} | "
+                             f"{_lane_values(rtl_v, regfile)}{flag}")
+
+            start = max(seq - 4, 0)
+            lines.append('  program around it:')
+            for i, text in enumerate(self.assembler.disassemble(self.words[start:seq + 3]), start):
+                lines.append(f"    {'>' if i == seq else ' '} #{i:<6} {text}")
+        return '\n'.join(lines)
+
+
+def compare_traces(rtl, reference, words=None) -> LockstepChecker:
+    """ Offline lockstep check of two saved traces.
+
+    :return: (LockstepChecker) with `.mismatch` / `.report()` set """
+
+    checker = LockstepChecker(reference, words)
+    for rec in rtl:
+        if not checker.commit(int(rec['cycle']), int(rec['unit']), int(rec['regfile']),
+                              int(rec['dest']), rec['lanes'], int(rec['taken'])):
+            break
+    return checker
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff an RTL commit trace against a reference trace')
+    parser.add_argument('rtl', help='RTL trace (.trace)')
+    parser.add_argument('reference', help='Reference trace (.trace)')
+    parser.add_argument('-p', '--program', help='Program image, for disassembly')
+    args = parser.parse_args()
+
+    from mods.isa_mods import load_words
+    words = load_words(args.program) if args.program else None
+    checker = compare_traces(load_trace(args.rtl), load_trace(args.reference), words)
+    if checker.mismatch is None:
+        print(f'{len(checker.rtl)} commits match'
+              + (f', {checker.extra} extra RTL commits after the program' if checker.extra else ''))
+    else:
+        print(checker.report())
+
+
+if __name__ == '__main__':
+    main()
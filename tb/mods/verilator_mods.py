@@ -0,0 +1,157 @@
+import re
+import json
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+from collections import defaultdict
+
+
+# Structural coverage the runner's --coverage option builds with
+COVERAGE_ARGS = ['--coverage-line', '--coverage-toggle']
+
+# coverage.dat records: C '<\x01key\x02value...>' count
+_RECORD = re.compile(r"^C '(.*)' (\d+)$")
+
+
+def read_coverage(path) -> list:
+    """ Coverage points of a Verilator coverage.dat.
+
+    :return: (list) One dict per point with its keys ('page', 'f' file,
+             'l' line, 'o' comment, 'h' hierarchy, ...) and 'count' """
+
+    points = []
+    for line in Path(path).read_text(errors='replace').splitlines():
+        match = _RECORD.match(line)
+        if not match:
+            continue
+        fields = dict(item.split('\x02', 1) for item in match.group(1).split('\x01') if '\x02' in item)
+        fields['count'] = int(match.group(2))
+        points.append(fields)
+    return points
+
+
+def _merge_python(paths, out:Path) -> Path:
+    """ Sums counts of identical points, for hosts without verilator_coverage. """
+
+    counts = defaultdict(int)
+    for path in paths:
+        for line in Path(path).read_text(errors='replace').splitlines():
+            match = _RECORD.match(line)
+            if match:
+                counts[match.group(1)] += int(match.group(2))
+    with out.open('w') as f:
+        f.write('# SystemC::Coverage-3\n')
+        for key, count in counts.items():
+            f.write(f"C '{key}' {count}\n")
+    return out
+
+
+def merge_coverage(paths, out) -> Path:
+    """ Merges coverage.dat files (parallel runs, parameter sets) into
+    `out` with verilator_coverage --write, or by summing counts when the
+    tool is not installed. """
+
+    paths = [str(p) for p in paths]
+    if not paths:
+        raise FileNotFoundError('No coverage.dat to merge')
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if shutil.which('verilator_coverage') is None:
+        return _merge_python(paths, out)
+    subprocess.run(['verilator_coverage', '--write', str(out), *paths], check=True)
+    return out
+
+
+def annotate(dat, out_dir, min_count:int=1) -> Path:
+    """ Annotated copies of the RTL sources (verilator_coverage --annotate),
+    points hit fewer than `min_count` times flagged with '%'.
+
+    :return: (Path) The directory, None when verilator_coverage is missing """
+
+    if shutil.which('verilator_coverage') is None:
+        print('verilator_coverage not found, skipping annotated sources')
+        return None
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    subprocess.run(['verilator_coverage', '--annotate', str(out_dir), '--annotate-min', str(min_count), str(dat)],
+                   check=True)
+    return out_dir
+
+
+def summarise(points:list) -> dict:
+    """ Hit / total points per module and kind (line, toggle, branch ...),
+    with the never-hit source lines of each module.
+
+    :return: (dict) {module: {'line': {'hit', 'total', 'coverage'}, ..., 'missed_lines': [...]}} """
+
+    totals = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    missed = defaultdict(set)
+    for point in points:
+        kind, _, module = point.get('page', 'v_unknown/unknown').partition('/')
+        kind, module = point.get('t', kind.removeprefix('v_')), module or 'unknown'
+        entry = totals[module][kind]
+        entry[1] += 1
+        if point['count']:
+            entry[0] += 1
+        elif kind == 'line' and 'l' in point:
+            missed[module].add((Path(point.get('f', '')).name, int(point['l'])))
+
+    summary = {}
+    for module in sorted(totals):
+        summary[module] = {kind: {'hit': hit, 'total': total, 'coverage': hit / total if total else 1.0}
+                           for kind, (hit, total) in sorted(totals[module].items())}
+        summary[module]['missed_lines'] = [f'{name}:{line}' for name, line in sorted(missed[module])]
+    return summary
+
+
+def format_summary(summary:dict) -> str:
+    kinds = sorted({kind for entry in summary.values() for kind in entry if kind != 'missed_lines'})
+    width = max([len(m) for m in summary] + [6])
+    lines = [f"{'module':<{width}}  " + '  '.join(f'{kind:>18}' for kind in kinds)]
+    for module, entry in summary.items():
+        cells = []
+        for kind in kinds:
+            if kind in entry:
+                e = entry[kind]
+                cells.append(f"{e['coverage']:6.1%} {e['hit']:>5}/{e['total']:<5}")
+            else:
+                cells.append(f"{'-':>18}")
+        lines.append(f'{module:<{width}}  ' + '  '.join(cells))
+        if entry['missed_lines']:
+            shown = entry['missed_lines'][:12]
+            more = len(entry['missed_lines']) - len(shown)
+            lines.append(f"{'':<{width}}  missed lines: {', '.join(shown)}" + (f' (+{more})' if more else ''))
+    return '\n'.join(lines)
+
+
+def write_report(paths, out_dir) -> dict:
+    """ Merges `paths` into out_dir/coverage.dat and writes the per-module
+    summary (coverage_summary.json / .txt) and annotated sources
+    (annotated/) next to it.
+
+    :return: (dict) The summary """
+
+    out_dir = Path(out_dir)
+    merged = merge_coverage(paths, out_dir / 'coverage.dat')
+    summary = summarise(read_coverage(merged))
+    (out_dir / 'coverage_summary.json').write_text(json.dumps(summary, indent=2))
+    (out_dir / 'coverage_summary.txt').write_text(format_summary(summary) + '\n')
+    annotate(merged, out_dir / 'annotated')
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge and report Verilator line/toggle coverage')
+    parser.add_argument('paths', nargs='+', help='coverage.dat files (e.g. sim_build/*/coverage.dat)')
+    parser.add_argument('-o', '--output', type=str, default='reports/coverage',
+                        help='Report directory (merged coverage.dat, summaries, annotated sources)')
+    args = parser.parse_args()
+
+    summary = write_report(args.paths, args.output)
+    print(format_summary(summary))
+    print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,13 @@
 import shutil
 import argparse
+import itertools
 from pathlib import Path
 from datetime import datetime
 
 from single_test import single_test
 from mods.exception_mods import *
+from mods.verilator_mods import COVERAGE_ARGS, write_report, format_summary
+from mods import profile_mods
 
 
 def move_file(test_dir: Path, compute_unit_name: str, module_under_test: str) -> None:
@@ -45,12 +48,39 @@ def move_file(test_dir: Path, compute_unit_name: str, module_under_test: str) ->
     print(f'Waveform {timestamped_filename} saved and recorded.')
 
 
+def parse_params(items: list) -> list:
+    """
+    Expands -p/--param options into one parameter set per run.
+
+    Args:
+        items (list): 'NAME=VALUE' or 'NAME=V1,V2,...' strings.
+
+    Returns:
+        list: Parameter dicts, the cartesian product of all value lists
+              (a single empty dict when no parameter is given).
+    """
+    names, values = [], []
+    for item in items:
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Expected NAME=VALUE, got '{item}'")
+        names.append(name)
+        values.append(value.split(','))
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
 def main():
     parser = argparse.ArgumentParser(description='Cocotb Verilator runner')
     parser.add_argument('-n', '--name', type=str, required=True, 
                         help='Name of the module being tested (without .sv extension)')
     parser.add_argument('-t', '--trace', type=int, required=True, 
                         help='Enable trace waveform (1 or 0)')
+    parser.add_argument('-p', '--param', action='append', default=[],
+                        help="Module parameter 'NAME=VALUE'; 'NAME=V1,V2,...' runs once per value")
+    parser.add_argument('--coverage', action='store_true',
+                        help='Build with Verilator line/toggle coverage and report it under reports/<name>')
+    parser.add_argument('--profile', action='store_true',
+                        help='gprof the model and cProfile the testbench, report the time split under reports/<name>')
     args = parser.parse_args()
 
     module_under_test = args.name
@@ -125,27 +155,51 @@ def main():
     module_path = sv_file_path
     component_path = sv_file_path.parent
     test_files_dir = test_dir / compute_unit_name
-    module_params = {}
+    param_sets = parse_params(args.param)
+    build_dirs = []
 
     # ----------------------------------------------------------------
-    # 3) Invoke the single_test function
+    # 3) Invoke the single_test function, once per parameter set
+    #    (each in its own sim_build subfolder when there are several)
     # ----------------------------------------------------------------
-    single_test(
-        test_id=1,
-        dependencies=[compute_unit_name],
-        top_module=module_under_test,
-        test_module=test_module_name,  # Use flattened naming approach
-        module_params=module_params,
-        module_path=module_path,
-        component_path=component_path,
-        sim_build_dir=sim_build_dir,
-        test_files_dir=test_files_dir,
-        enable_trace=enable_trace,
-    )
+    for test_id, module_params in enumerate(param_sets, start=1):
+        build_dir = sim_build_dir
+        if len(param_sets) > 1:
+            build_dir = sim_build_dir / '_'.join(f'{k}{v}' for k, v in module_params.items())
+            build_dir.mkdir(parents=True, exist_ok=True)
+        build_dirs.append(build_dir)
+        single_test(
+            test_id=test_id,
+            dependencies=[compute_unit_name],
+            top_module=module_under_test,
+            test_module=test_module_name,  # Use flattened naming approach
+            module_params=module_params,
+            module_path=module_path,
+            component_path=component_path,
+            sim_build_dir=build_dir,
+            test_files_dir=test_files_dir,
+            enable_trace=enable_trace,
+            extra_build_args=COVERAGE_ARGS if args.coverage else [],
+            profile=args.profile,
+        )
+        if args.profile:
+            report_name = 'profile' if build_dir == sim_build_dir else f'profile_{build_dir.name}'
+            report = profile_mods.write_report(build_dir, current_dir / 'reports' / module_under_test, report_name)
+            print(profile_mods.format_report(report))
 
     # 4) Copy the VCD file after simulation completes if tracing is enabled
     if enable_trace:
         move_file(test_dir, compute_unit_name, module_under_test)
 
+    # 5) Merge the structural coverage of every parameter set into one report
+    if args.coverage:
+        coverage_files = [d / 'coverage.dat' for d in build_dirs if (d / 'coverage.dat').exists()]
+        if not coverage_files:
+            print('Warning: --coverage given but no run wrote coverage.dat.')
+        else:
+            reports_dir = current_dir / 'reports' / module_under_test
+            print(format_summary(write_report(coverage_files, reports_dir)))
+            print(f'Coverage report written to {reports_dir}')
+
 if __name__ == '__main__':
     main()
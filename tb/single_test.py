@@ -1,4 +1,4 @@
-import sys, shutil
+import sys, json, time, shutil
 from pathlib import Path
 from os import getenv, environ
 
@@ -21,6 +21,9 @@ def single_test(
     seed: int = None,           # Random seed for the test
     enable_trace: bool = False, # Enable waveform trace
     skip_build: bool = False,   # Skip the build process if True
+    profile: bool = False,      # cProfile the Python side (COCOTB_ENABLE_PROFILING)
+    skip_test: bool = False,    # Only build if True
+    testcase: str = None,       # Run only this cocotb test (default all)
 ):
     print(f"# ---------------------------------------")
     print(f"# Test {test_id}")
@@ -36,19 +39,35 @@ def single_test(
     print(f"Verilog sources:")
     print_list(verilog_sources)
     
+    # $readmemh paths are relative to the simulation's working directory
+    # (the testbench folder), copy the module's ROM images there
+    for mem in Path(module_path).parent.glob('**/*.mem'):
+        shutil.copy(str(mem), str(Path(test_files_dir) / mem.name))
+        print(f"Copied ROM image: {mem.name}")
+
     # Add the test files' directory to Python's sys.path
     sys.path.append(str(test_files_dir))
     print(f"Added to Python path: {test_files_dir}")
     
+    # Testbenches read the module parameters of this run as TB_PARAM_<NAME>
+    for param_name, param_value in module_params.items():
+        environ[f'TB_PARAM_{param_name}'] = str(param_value)
+
     # Set environment variables to control file output locations
     environ['PYTHONPYCACHEPREFIX'] = str(sim_build_dir / '__pycache__')
     environ['GMON_OUT_PREFIX'] = str(sim_build_dir)
+    if profile:
+        environ['COCOTB_ENABLE_PROFILING'] = '1'
+    else:
+        environ.pop('COCOTB_ENABLE_PROFILING', None)
+    timing = {'build_seconds': None, 'test_seconds': None}
     
     # Initialize the Verilator simulation runner
     runner = get_runner(getenv("SIM", "verilator"))
     # Build the simulation unless skipping the build
     if not skip_build:
         try:
+            build_start = time.perf_counter()
             runner.build(
                 verilog_sources=verilog_sources,
                 includes=[str(component_path.joinpath(f"{d}/rtl/")) for d in dependencies]
@@ -74,6 +93,7 @@ def single_test(
                 build_dir=sim_build_dir,
                 waves=enable_trace
             )
+            timing['build_seconds'] = time.perf_counter() - build_start
         except Exception as build_error:
             print(f"Error occurred during build: {build_error}")
             return {
@@ -83,23 +103,57 @@ def single_test(
                 "error": str(build_error)
             }
 
+    if skip_test:
+        (sim_build_dir / "timing.json").write_text(json.dumps(timing))
+        return
+
+    # Verilator --coverage models write coverage.dat into the test
+    # directory at exit, drop one left over from an earlier run
+    stale_coverage = test_files_dir / "coverage.dat"
+    if stale_coverage.exists():
+        stale_coverage.unlink()
+    for stale_profile in (sim_build_dir / "gmon.out", sim_build_dir / "test_profile.pstat"):
+        if profile and stale_profile.exists():
+            stale_profile.unlink()
+
     # Run the test
     try:
+        test_start = time.perf_counter()
         runner.test(
             hdl_toplevel=top_module,
             hdl_toplevel_lang="verilog",
             test_module=test_module,
+            testcase=testcase,
             seed=seed,
             results_xml=str(sim_build_dir / "results.xml"),
             build_dir=sim_build_dir,
             test_dir=str(test_files_dir),
             waves=enable_trace
         )
+        timing['test_seconds'] = time.perf_counter() - test_start
         
-        # Move profiling output if it exists
+        # Move profiling output if it exists. With GMON_OUT_PREFIX set the
+        # -prof-c model writes <sim_build_dir>.<pid> instead of gmon.out
         gmon_src = test_files_dir / "gmon.out"
+        prefixed = sorted((p for p in sim_build_dir.parent.glob(f"{sim_build_dir.name}.*") if p.is_file()),
+                          key=lambda p: p.stat().st_mtime)
+        if prefixed:
+            gmon_src = prefixed[-1]
         if gmon_src.exists():
             shutil.move(str(gmon_src), str(sim_build_dir / "gmon.out"))
+
+        # cocotb dumps the cProfile stats of the run into the test directory
+        pstat_src = test_files_dir / "test_profile.pstat"
+        if profile and pstat_src.exists():
+            shutil.move(str(pstat_src), str(sim_build_dir / "test_profile.pstat"))
+
+        # Move coverage output if it exists (runner --coverage)
+        coverage_src = test_files_dir / "coverage.dat"
+        if coverage_src.exists():
+            shutil.move(str(coverage_src), str(sim_build_dir / "coverage.dat"))
+
+        # Wall-clock split of the run, read by the profile report and tb/bench
+        (sim_build_dir / "timing.json").write_text(json.dumps(timing))
         
     except Exception as build_error:
         print(f"Error occurred while running Verilator simulation: {build_error}")
\ No newline at end of file
@@ -0,0 +1,134 @@
+import numpy as np
+
+from mods.isa_mods import parse_defines
+from mods.iss_mods import ALU_OPS, BRANCH_OPS
+
+
+# def.sv ALU_OPCODE_* name -> 7-bit opcode, and back
+OPCODES = parse_defines()['ALU']
+NAMES = {opc: name for name, opc in OPCODES.items()}
+
+# def.sv opcodes alu.sv computes differently from their names (result
+# select on opc[5:3]), as found by divergences(). test_alu_stream leaves
+# them out and test_alu_known_divergences is expected to fail on them
+# until the RTL is fixed.
+RTL_DIVERGENT = ('MAX', 'MAXU', 'MIN', 'MINU', 'LSL', 'LSR', 'ASR')
+
+def _bit(x, i):
+    return (x >> np.uint32(i)) & np.uint32(1)
+
+
+def bit_reverse(x):
+    """ Reverses the 32 bits of every element of a uint32 array. """
+
+    x = np.asarray(x, dtype=np.uint32)
+    x = ((x >> 1) & 0x55555555) | ((x & 0x55555555) << 1)
+    x = ((x >> 2) & 0x33333333) | ((x & 0x33333333) << 2)
+    x = ((x >> 4) & 0x0F0F0F0F) | ((x & 0x0F0F0F0F) << 4)
+    x = ((x >> 8) & 0x00FF00FF) | ((x & 0x00FF00FF) << 8)
+    return ((x >> 16) | (x << 16)).astype(np.uint32)
+
+
+def shifter(a, b, opc):
+    """ alu.sv barrel shifter: the operand is bit reversed when opc[0] is
+    0 (so a right shifter shifts left), and opc[1] fills the vacated bits
+    with a[31] (taken from the original operand, also when reversed). """
+
+    a = np.asarray(a, dtype=np.uint32)
+    shamt = np.asarray(b, dtype=np.uint32) & 31
+    opc = np.asarray(opc, dtype=np.uint32)
+    left = _bit(opc, 0) == 0
+    operand = np.where(left, bit_reverse(a), a)
+    fill = (_bit(opc, 1) & _bit(a, 31)).astype(bool)
+    # Vacated top bits: ~(0xFFFFFFFF >> shamt)
+    vacated = ~(np.uint32(0xFFFFFFFF) >> shamt)
+    result = (operand >> shamt) | np.where(fill, vacated, np.uint32(0))
+    return np.where(left, bit_reverse(result), result).astype(np.uint32)
+
+
+def compare(a, b, opc):
+    """ Comparator outputs of alu.sv.
+
+    :return: (max_sel, min_sel, eq) boolean arrays, `max_sel` picks a over
+            b in the max path (ge / geu on opc[0]), `min_sel` in the min path
+            (lt / ltu on opc[0]) """
+
+    a = np.asarray(a, dtype=np.uint32)
+    b = np.asarray(b, dtype=np.uint32)
+    signed = _bit(np.asarray(opc, dtype=np.uint32), 0) == 1
+    lt = a.view(np.int32) < b.view(np.int32)
+    ltu = a < b
+    min_sel = np.where(signed, lt, ltu)
+    return ~min_sel, min_sel, a == b
+
+
+def alu_rtl(a, b, opc, prev=None):
+    """ Cycle result of alu.sv for vectors of operands, bit exact with the
+    RTL as written (result select on opc[5:3], which differs from the
+    def.sv opcode names for MAX..MINU and the shifts).
+
+    :param a: uint32 array, first operand
+    :param b: uint32 array, second operand / immediate
+    :param opc: uint8 array (or scalar), 7-bit opcode
+    :param prev: (Optional) previous wb_result_o per element, kept for
+            opc[5:3] = 110 / 111, where the RTL case has no branch; when
+            None the previous element's result is used (streaming order)
+    :return: (result, branch_taken) uint32 and bool arrays """
+
+    a = np.asarray(a, dtype=np.uint32)
+    b = np.asarray(b, dtype=np.uint32)
+    opc = np.broadcast_to(np.asarray(opc, dtype=np.uint32), a.shape)
+    select = (opc >> 3) & 7     # xor, and, or, add/sub, shifter, min/max; 110 / 111 hold
+
+    max_sel, min_sel, eq = compare(a, b, opc)
+    add = np.where(_bit(opc, 0) == 1, a - b, a + b)
+    cond = np.where(_bit(opc, 1) == 1, np.where(max_sel, a, b), np.where(min_sel, a, b))
+    result = np.choose(np.minimum(select, 6), [a ^ b, a & b, a | b, add, shifter(a, b, opc), cond,
+                                               np.zeros_like(a)]).astype(np.uint32)
+
+    hold = select >= 6
+    if hold.any():
+        if prev is not None:
+            result[hold] = np.asarray(prev, dtype=np.uint32)[hold]
+        else:
+            # Forward fill from the last element that wrote a result (reset value 0)
+            idx = np.maximum.accumulate(np.where(hold, -1, np.arange(len(result))))
+            result = np.where(idx < 0, np.uint32(0), result[np.maximum(idx, 0)])
+
+    taken = np.choose((opc >> 1) & 3, [max_sel, min_sel, eq, ~eq])
+    return result, taken
+
+
+def alu_arch(a, b, name):
+    """ Architectural semantics of a def.sv ALU opcode, as used by the ISS.
+
+    :return: (result, branch_taken) uint32 and bool arrays, result is 0 for
+            branches and taken is False for everything else """
+
+    a = np.asarray(a, dtype=np.uint32)
+    b = np.asarray(b, dtype=np.uint32)
+    if name in BRANCH_OPS:
+        return np.zeros_like(a), BRANCH_OPS[name](a, b)
+    return ALU_OPS[name](a, b).astype(np.uint32), np.zeros(a.shape, dtype=bool)
+
+
+def divergences(samples:int=1 << 16, rng=None) -> dict:
+    """ Ops where alu.sv and the architectural semantics disagree on
+    random operands.
+
+    :return: (dict) {name: fraction of samples that differ} """
+
+    rng = rng or np.random.default_rng(0)
+    a = rng.integers(0, 1 << 32, samples, dtype=np.uint32)
+    b = rng.integers(0, 1 << 32, samples, dtype=np.uint32)
+    out = {}
+    for name, opc in OPCODES.items():
+        rtl, rtl_taken = alu_rtl(a, b, opc, prev=np.zeros_like(a))
+        ref, ref_taken = alu_arch(a, b, name)
+        if name in BRANCH_OPS:
+            bad = rtl_taken != ref_taken
+        else:
+            bad = rtl != ref
+        if bad.any():
+            out[name] = float(bad.mean())
+    return out
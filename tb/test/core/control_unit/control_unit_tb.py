@@ -0,0 +1,491 @@
+import os
+import json
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, FallingEdge, ReadOnly
+import numpy as np
+
+from mods.isa_mods import Assembler, TYPE_ALU, TYPE_FPU, TYPE_MEM, TYPE_SFU, parse_defines
+from mods.iss_mods import TauriISS, ALU_OPS, BRANCH_OPS, FPU_OPS, EXACT_SFU, LANES, \
+    float24_to_float32, float32_to_float24
+from mods.trace_mods import LockstepChecker, reference_trace, REGFILE_INT, REGFILE_FP, REGFILE_NONE
+from mods.randgen_mods import random_program, hazard_program
+from mods.regalloc_mods import BANK_SIZE, FILE_NAMES, NO_REG, register_name, parse_relaxed, format_relaxed, \
+    reallocate, live_ins
+from mods.perf_mods import report_dir
+
+
+DEFINES = parse_defines()
+ALU_NAMES = {opc: name for name, opc in DEFINES['ALU'].items()}
+FPU_NAMES = {opc: name for name, opc in DEFINES['FPU'].items()}
+SFU_NAMES = {opc: name for name, opc in DEFINES['SFU'].items()}
+
+MASK32 = (1 << 32) - 1
+MASK24 = (1 << 24) - 1
+
+STATE_IDLE = 0
+# Why the FIFO head did not issue in a cycle, see CoreHarness._classify()
+HAZARD_KINDS = ('alu_raw', 'fpu_raw', 'mem_sfu_busy', 'starved')
+
+
+def split_lanes(value:int, width:int) -> np.ndarray:
+    """ Splits a packed {lane3, lane2, lane1, lane0} bus into lanes. """
+
+    mask = (1 << width) - 1
+    return np.array([(value >> (width * i)) & mask for i in range(LANES)], dtype=np.uint32)
+
+
+def pack_lanes(lanes, width:int) -> int:
+    """ Inverse of `split_lanes()`. """
+
+    mask = (1 << width) - 1
+    return sum((int(v) & mask) << (width * i) for i, v in enumerate(lanes))
+
+
+def fp_prologue(regs:int) -> str:
+    """ Seeds distinct float24 values in a1..a{regs-1} / b1..b{regs-1}
+    (exp2(0) = 1, then running sums), since the register files reset to 0. """
+
+    lines = ['fbxp24 a1, a0', 'fadd24 b1, a1, b0']
+    for k in range(2, regs):
+        lines += [f'fadd24 a{k}, a{k - 1}, b{k - 1}', f'fadd24 b{k}, a{k}, b1']
+    return '\n'.join(lines)
+
+
+class CoreHarness:
+    """ Drives control_unit with a program and plays the ALU, FPU, SFU and
+    data cache around it, matching their pipeline depths (ALU write-back
+    one cycle after dispatch, FPU three cycles, as the hazard units
+    assume). Every register file write is turned into a commit for the
+    lockstep checker, and every cycle in which the FIFO head does not
+    issue is charged to a hazard kind.
+
+    Signals are sampled at ReadOnly after each edge and inputs are driven
+    on the falling edge, so every cycle costs two trigger waits. """
+
+    def __init__(self, dut, checker:LockstepChecker, memory_size:int=1 << 12):
+        self.dut = dut
+        self.checker = checker
+        self.memory = np.zeros(memory_size, dtype=np.uint8)
+        self.cycle = 0
+        self.stats = {
+            'cycles': 0,
+            'fed': 0,
+            'stall_cycles': 0,
+            'alu_dispatches': 0,
+            'fpu_dispatches': 0,
+            'spurious_alu_dispatches': 0,
+            'commits': 0,
+            'issued': 0,
+            'first_issue': None,
+            'last_issue': None,
+        }
+        self.hazard_cycles = dict.fromkeys(HAZARD_KINDS, 0)
+        self.int_wr_data = [dut.int_wr_data[i] for i in range(LANES)]
+        self.fp_wr_data = [dut.fp_wr_data[i] for i in range(LANES)]
+        self._beats = {}    # multi-beat MEM / SFU write-backs, merged per instruction
+
+    async def reset(self):
+        dut = self.dut
+        for name in ('rst_i', 'valid_i', 'instr_i', 'alu_wb_reg_wen_i', 'alu_wb_result_i', 'alu_wb_dest_i',
+                     'alu_wb_bank_i', 'alu_wb_valid_i', 'alu_wb_branch_exec_i', 'alu_wb_branch_taken_i',
+                     'fpu_result_i', 'sfu_core_result_i', 'sfu_core_valid_i', 'texture_i', 'texture_valid_i',
+                     'dc_data_i', 'dc_valid_i'):
+            getattr(dut, name).value = 0
+        dut.rst_i.value = 1
+        for _ in range(3):
+            await RisingEdge(dut.clk_i)
+        await FallingEdge(dut.clk_i)
+        dut.rst_i.value = 0
+
+    def _alu(self, opc, a, b):
+        name = ALU_NAMES.get(opc)
+        if name in BRANCH_OPS:
+            taken = BRANCH_OPS[name](a, b)
+            return np.zeros(LANES, dtype=np.uint32), int((taken.astype(int) << np.arange(LANES)).sum())
+        return (ALU_OPS[name](a, b) if name in ALU_OPS else np.zeros(LANES, dtype=np.uint32)), None
+
+    def _dc(self, op, addr, data):
+        """ Data cache model: dc_op [2] store, [1:0] byte / half / word. """
+
+        size = (1, 2, 4, 4)[op & 3]
+        addr = addr % (len(self.memory) - 3)
+        if op & 4:
+            self.memory[addr:addr + size] = [(data >> (8 * k)) & 0xFF for k in range(size)]
+            return 0
+        value = sum(int(self.memory[addr + k]) << (8 * k) for k in range(size))
+        if size < 4 and value >> (8 * size - 1):
+            value -= 1 << (8 * size)
+        return value & MASK32
+
+    def _commit(self, unit, regfile, dest, lanes, taken=0):
+        self.stats['commits'] += 1
+        return self.checker.commit(self.cycle, unit, regfile, dest, lanes, taken)
+
+    def _merge_beat(self, unit, regfile, dest, lanes):
+        """ MEM / SFU write one lane's response per beat; commit once all 4 landed. """
+
+        key = (unit, regfile, dest)
+        beats = self._beats.get(key, 0) + 1
+        if beats < LANES:
+            self._beats[key] = beats
+            return True
+        self._beats.pop(key, None)
+        return self._commit(unit, regfile, dest, lanes)
+
+    def _classify(self):
+        """ Issue accounting for the current cycle, sampled after the
+        inputs settled. The hazard units compare their own source fields
+        ([18:14] / [23:19]), so `alu_raw` / `fpu_raw` are the stalls the
+        RTL actually takes, not the architectural dependencies. """
+
+        dut = self.dut
+        if int(dut.sfifo_read.value):
+            self.stats['issued'] += 1
+            if self.stats['first_issue'] is None:
+                self.stats['first_issue'] = self.cycle
+            self.stats['last_issue'] = self.cycle
+            return
+        if int(dut.control_state.value) != STATE_IDLE:
+            kind = 'mem_sfu_busy'
+        elif int(dut.sfifo_empty.value):
+            kind = 'starved'
+        else:
+            kind = {0: 'alu_raw', 1: 'fpu_raw'}.get(int(dut.instr_type.value), 'mem_sfu_busy')
+        self.hazard_cycles[kind] += 1
+
+    async def run(self, words, max_cycles:int=None, drain:int=16, stop_on_mismatch:bool=True) -> dict:
+        """ Feeds the program and runs until the core went idle after the
+        last instruction, the checker fails, or `max_cycles` is reached.
+
+        :param stop_on_mismatch: (Optional) Stop at the first divergence,
+                throughput runs keep going to measure the whole program
+
+        :return: (dict) Harness statistics """
+
+        dut = self.dut
+        words = [int(w) for w in words]
+        max_cycles = max_cycles or 20 * len(words) + 200
+        alu_pipe = [None]           # results one cycle behind dispatch
+        fpu_pipe = [None, None]     # three cycles behind dispatch (valid_1..valid_3)
+        alu_exec = fpu_exec = False
+        sfu_reply = dc_reply = tex_reply = None
+        pc = 0
+        drained = 0
+
+        while self.cycle < max_cycles:
+            await RisingEdge(dut.clk_i)
+            await ReadOnly()
+            self.cycle += 1
+
+            # Dispatches registered on this edge
+            alu_new = fpu_new = None
+            if int(dut.alu_valid_o.value):
+                if alu_exec:
+                    a = split_lanes(dut.alu_a_o.value.integer, 32)
+                    b = split_lanes(dut.alu_b_o.value.integer, 32)
+                    result, taken = self._alu(int(dut.alu_opc_o.value), a, b)
+                    alu_new = (result, taken, int(dut.alu_dest_o.value), int(dut.alu_bank_o.value))
+                    self.stats['alu_dispatches'] += 1
+                else:
+                    # control_unit re-dispatches the FIFO head while the FIFO is empty
+                    self.stats['spurious_alu_dispatches'] += 1
+            if fpu_exec:
+                name = FPU_NAMES.get(int(dut.fpu_opcode_o.value))
+                a = split_lanes(dut.fpu_a_o.value.integer, 24)
+                b = split_lanes(dut.fpu_b_o.value.integer, 24)
+                fpu_new = FPU_OPS[name](a, b) if name in FPU_OPS else np.zeros(LANES, dtype=np.uint32)
+                self.stats['fpu_dispatches'] += 1
+            if int(dut.sfu_valid_o.value):
+                name = SFU_NAMES.get(int(dut.sfu_core_special_op_o.value))
+                x = float24_to_float32(np.array([dut.sfu_core_operand_o.value.integer], dtype=np.uint32))
+                with np.errstate(all='ignore'):
+                    sfu_reply = int(float32_to_float24(EXACT_SFU[name](x).astype(np.float32))[0])
+            if int(dut.dc_valid_o.value):
+                dc_reply = self._dc(int(dut.dc_op_o.value), dut.dc_addr_o.value.integer, dut.dc_data_o.value.integer)
+            if int(dut.texture_lkp_o.value):
+                tex_reply = 0
+            stalled = int(dut.stall_o.value)
+
+            await FallingEdge(dut.clk_i)
+
+            # Instruction feed
+            if pc < len(words) and not stalled:
+                dut.instr_i.value = words[pc]
+                dut.valid_i.value = 1
+                pc += 1
+                self.stats['fed'] += 1
+            else:
+                dut.valid_i.value = 0
+                self.stats['stall_cycles'] += bool(stalled)
+
+            # ALU write-back
+            alu_pipe.insert(0, alu_new)
+            wb = alu_pipe.pop()
+            dut.alu_wb_valid_i.value = wb is not None
+            if wb is not None:
+                result, taken, dest, bank = wb
+                dut.alu_wb_result_i.value = pack_lanes(result, 32)
+                dut.alu_wb_dest_i.value = dest
+                dut.alu_wb_bank_i.value = bank
+                dut.alu_wb_reg_wen_i.value = dest != 0
+                dut.alu_wb_branch_exec_i.value = 0xF if taken is not None else 0
+                dut.alu_wb_branch_taken_i.value = taken or 0
+
+            # FPU result, presented while the hazard unit's valid_3 is high
+            fpu_pipe.insert(0, fpu_new)
+            result = fpu_pipe.pop()
+            if result is not None:
+                dut.fpu_result_i.value = pack_lanes(result, 24)
+
+            # Single-cycle SFU / data cache / texture responses
+            dut.sfu_core_valid_i.value = sfu_reply is not None
+            if sfu_reply is not None:
+                dut.sfu_core_result_i.value = sfu_reply
+            dut.dc_valid_i.value = dc_reply is not None
+            if dc_reply is not None:
+                dut.dc_data_i.value = dc_reply
+            dut.texture_valid_i.value = tex_reply is not None
+            if tex_reply is not None:
+                dut.texture_i.value = tex_reply
+            sfu_reply = dc_reply = tex_reply = None
+
+            await ReadOnly()
+            alu_exec = bool(int(dut.alu_execute.value))
+            fpu_exec = bool(int(dut.fpu_execute.value))
+            idle = int(dut.sfifo_empty.value) and int(dut.control_state.value) == STATE_IDLE
+            if pc and not (pc == len(words) and idle):
+                self._classify()
+            if not self._sample_writes(wb) and stop_on_mismatch:
+                break
+            if pc == len(words) and idle:
+                drained += 1
+                if drained > drain:
+                    break
+            else:
+                drained = 0
+
+        self.stats['cycles'] = self.cycle
+        return self.stats
+
+    def _sample_writes(self, alu_wb) -> bool:
+        """ Turns the register file write ports into commits. """
+
+        dut = self.dut
+        ok = True
+        int_we = int(dut.int_we_a.value) | int(dut.int_we_b.value)
+        if int_we:
+            dest = (int(dut.int_we_b.value) != 0) << 5 | (int(dut.int_wr_source.value) & 31)
+            lanes = np.array([h.value.integer for h in self.int_wr_data], dtype=np.uint32)
+            if int(dut.dc_valid_i.value):
+                ok &= self._merge_beat(TYPE_MEM, REGFILE_INT, dest, lanes)
+            elif alu_wb is not None and alu_wb[1] is not None:
+                ok &= self._commit(TYPE_ALU, REGFILE_NONE, 0, np.zeros(LANES, dtype=np.uint32), alu_wb[1])
+            else:
+                ok &= self._commit(TYPE_ALU, REGFILE_INT, dest, lanes)
+
+        fp_we = int(dut.fp_we_a.value) | int(dut.fp_we_b.value)
+        if fp_we:
+            dest = (int(dut.fp_we_b.value) != 0) << 5 | (int(dut.fp_wr_source.value) & 31)
+            lanes = np.array([h.value.integer & MASK24 for h in self.fp_wr_data], dtype=np.uint32)
+            if int(dut.dc_valid_i.value) or int(dut.texture_valid_i.value):
+                ok &= self._merge_beat(TYPE_MEM, REGFILE_FP, dest, lanes)
+            elif int(dut.sfu_core_valid_i.value):
+                ok &= self._merge_beat(TYPE_SFU, REGFILE_FP, dest, lanes)
+            else:
+                ok &= self._commit(TYPE_FPU, REGFILE_FP, dest, lanes)
+        return ok
+
+
+@cocotb.test()
+async def test_control_unit_lockstep(dut):
+    """ Runs a random program through control_unit and checks every
+    register write-back against the ISS, stopping at the first divergence.
+
+    TB_PROGRAM_SIZE sets the program length, TB_UNITS the units drawn
+    from (comma separated, default ALU,FPU,SFU). """
+
+    clock = Clock(dut.clk_i, 10, units='ns')
+    cocotb.start_soon(clock.start())
+
+    size = int(os.getenv('TB_PROGRAM_SIZE', '500'))
+    units = tuple(os.getenv('TB_UNITS', 'ALU,FPU,SFU').split(','))
+    regs = 8
+    rng = np.random.default_rng(int(os.getenv('TB_SEED', '0')) or None)
+
+    assembler = Assembler()
+    prologue = assembler.assemble(fp_prologue(regs))
+    words = np.concatenate([prologue, random_program(size, units=units, regs=regs, rng=rng)])
+
+    iss = TauriISS(warps=1)
+    reference, words = reference_trace(iss, words)
+    checker = LockstepChecker(reference, words)
+    harness = CoreHarness(dut, checker)
+
+    await harness.reset()
+    stats = await harness.run(words)
+
+    # Keep both traces for offline diffing (python -m mods.trace_mods rtl.trace ref.trace)
+    out = report_dir()
+    checker.rtl.save(out / 'control_unit_rtl.trace')
+    reference.tofile(out / 'control_unit_ref.trace')
+
+    dut._log.info(f'{len(words)} instructions, {stats}')
+    if stats['spurious_alu_dispatches']:
+        dut._log.warning(f"{stats['spurious_alu_dispatches']} ALU dispatches without a FIFO entry were ignored")
+    if checker.extra:
+        dut._log.warning(f'{checker.extra} RTL commits beyond the reference stream')
+    assert checker.mismatch is None, checker.report()
+    assert checker.done, (f'Timed out: {sum(checker.position.values())} / {len(reference)} '
+                          f'reference commits seen in {stats["cycles"]} cycles')
+
+
+def scramble_banks(rows:list, keep, count:int, rng) -> dict:
+    """ Swaps `count` bank A registers with their bank B twins (index > 0,
+    neither side in `keep`), which breaks the bank rule of a program.
+
+    :return: (dict) {register id: register id}, both directions """
+
+    used = {row[k] for row in rows for k in ('dest', 'a', 'b')} - {NO_REG}
+    candidates = [r for r in sorted(used) if r & 31 and not r & 32 and r not in keep and r ^ 32 not in keep]
+    swap = rng.choice(candidates, min(count, len(candidates)), replace=False) if candidates else []
+    return {**{int(r): int(r) ^ 32 for r in swap}, **{int(r) ^ 32: int(r) for r in swap}}
+
+
+@cocotb.test()
+async def test_control_unit_regalloc(dut):
+    """ Scrambles the banks of a random program, runs it through the
+    re-allocation pass (mods/regalloc_mods.py) with its live-in registers
+    pinned and checks the result: no renamed destination lands on index 0
+    (alu.sv drops writes to dest 0), live-ins keep their names, the output
+    is encodable and ends in the same register values as the original on
+    the ISS. The re-allocated program then runs in lockstep.
+
+    TB_PROGRAM_SIZE sets the program length, TB_REGALLOC_SWAPS the number
+    of bank A / B register pairs swapped. """
+
+    clock = Clock(dut.clk_i, 10, units='ns')
+    cocotb.start_soon(clock.start())
+
+    size = int(os.getenv('TB_PROGRAM_SIZE', '500'))
+    swaps = int(os.getenv('TB_REGALLOC_SWAPS', '4'))
+    regs = 8
+    rng = np.random.default_rng(int(os.getenv('TB_SEED', '0')) or None)
+
+    assembler = Assembler()
+    words = np.concatenate([assembler.assemble(fp_prologue(regs)),
+                            random_program(size, units=('ALU', 'FPU', 'SFU'), regs=regs, rng=rng)])
+    source = '\n'.join(assembler.disassemble(words))
+    rows = parse_relaxed(source, assembler)
+    ids = {f'{FILE_NAMES[r >> 6]} {register_name(r)}': r for r in range(4 * BANK_SIZE)}
+    inputs = live_ins(source, assembler)
+    swap = scramble_banks(rows, {ids[name] for name in inputs}, swaps, rng)
+    scrambled = format_relaxed(rows, swap)
+
+    result = reallocate(scrambled, pinned=inputs, rng=rng, assembler=assembler)
+    renamed = {ids[new] for new in result['mapping'].values()}
+    dest_zero = [i for i, row in enumerate(parse_relaxed(result['source'], assembler))
+                 if row['dest'] in renamed and not row['dest'] & 31]
+    assert not dest_zero, f'Renamed destinations at index 0 in instructions {dest_zero[:10]}'
+    moved = sorted(set(inputs) & set(result['mapping']))
+    assert not moved, f'Live-in registers renamed: {moved}'
+    assert result['after']['encodable'], f"Re-allocation left {result['after']['conflicts']:g} " \
+                                         f"conflicts, {result['after']['misplaced']:g} misplaced"
+    dut._log.info(f"{len(swap) // 2} swapped pairs, stall cycles {result['before']['stall_cycles']:g} -> "
+                  f"{result['after']['stall_cycles']:g}, mapping {result['mapping']}")
+
+    # Register r of the original ends up as mapping(swap(r)) in the output
+    reallocated = assembler.assemble(result['source'])
+    before, after = TauriISS(warps=1), TauriISS(warps=1)
+    before.run(words)
+    after.run(reallocated)
+    for reg in sorted({row[k] for row in rows for k in ('dest', 'a', 'b')} - {NO_REG}):
+        name = f'{FILE_NAMES[reg >> 6]} {register_name(swap.get(reg, reg))}'
+        new = ids[result['mapping'].get(name, name)]
+        old_file = (before.int_regs, before.fp_regs)[reg >> 6]
+        new_file = (after.int_regs, after.fp_regs)[new >> 6]
+        assert (old_file[reg >> 5 & 1, reg & 31] == new_file[new >> 5 & 1, new & 31]).all(), \
+            f'{FILE_NAMES[reg >> 6]} {register_name(reg)} ends differently after re-allocation'
+
+    reference, reallocated = reference_trace(TauriISS(warps=1), reallocated)
+    checker = LockstepChecker(reference, reallocated)
+    harness = CoreHarness(dut, checker)
+
+    await harness.reset()
+    stats = await harness.run(reallocated)
+    assert checker.mismatch is None, checker.report()
+    assert checker.done, f'Timed out after {stats["cycles"]} cycles'
+
+
+# Hazard stress streams: name -> hazard_program() arguments
+HAZARD_STREAMS = {
+    'independent':   dict(raw_rate=0.0),
+    'alu_raw_d1':    dict(mix={'ALU': 1}, distance=1, raw_rate=0.9),
+    'alu_raw_d2':    dict(mix={'ALU': 1}, distance=2, raw_rate=0.9),
+    'alu_raw_d3':    dict(mix={'ALU': 1}, distance=3, raw_rate=0.9),
+    'fpu_raw_d1':    dict(mix={'FPU': 1}, distance=1, raw_rate=0.9),
+    'fpu_raw_d2':    dict(mix={'FPU': 1}, distance=2, raw_rate=0.9),
+    'fpu_raw_d3':    dict(mix={'FPU': 1}, distance=3, raw_rate=0.9),
+    'fpu_raw_d4':    dict(mix={'FPU': 1}, distance=4, raw_rate=0.9),
+    'bank_conflict': dict(bank_rate=0.9, raw_rate=0.0),
+    'interleaved':   dict(mix={'ALU': 1, 'FPU': 1, 'SFU': 1}, interleave=1.0, raw_rate=0.3),
+    'branch_bursts': dict(mix={'ALU': 2, 'FPU': 1}, branch_burst=0.1, burst_len=4, raw_rate=0.3),
+    # Shader-like: float heavy, short dependency chains, occasional SFU / memory
+    'shader':        dict(mix={'ALU': 0.25, 'FPU': 0.55, 'SFU': 0.1, 'MEM': 0.1}, distance=(1, 2, 3, 4),
+                          raw_rate=0.6, interleave=0.6, branch_burst=0.01),
+}
+
+
+@cocotb.test()
+async def test_control_unit_hazards(dut):
+    """ Measures issue rate (instructions / cycle) and stall cycles per
+    hazard kind on hazard-biased instruction streams. Results go to
+    control_unit_hazards.json next to results.xml.
+
+    TB_HAZARD_SIZE sets the stream length, TB_HAZARD_STREAMS selects
+    streams (comma separated names of HAZARD_STREAMS). Lockstep
+    divergences are reported but do not fail the test, correctness is
+    test_control_unit_lockstep's job. """
+
+    clock = Clock(dut.clk_i, 10, units='ns')
+    cocotb.start_soon(clock.start())
+
+    size = int(os.getenv('TB_HAZARD_SIZE', '400'))
+    names = os.getenv('TB_HAZARD_STREAMS', ','.join(HAZARD_STREAMS)).split(',')
+    rng = np.random.default_rng(int(os.getenv('TB_SEED', '0')) or None)
+
+    results = {}
+    for name in names:
+        words = hazard_program(size, rng=rng, **HAZARD_STREAMS[name])
+        reference, words = reference_trace(TauriISS(warps=1), words)
+        checker = LockstepChecker(reference, words)
+        harness = CoreHarness(dut, checker)
+        await harness.reset()
+        stats = await harness.run(words, stop_on_mismatch=False)
+
+        window = stats['last_issue'] - stats['first_issue'] + 1 if stats['issued'] else 0
+        results[name] = {
+            'instructions': len(words),
+            'issued': stats['issued'],
+            'cycles': window,
+            'ipc': stats['issued'] / window if window else 0.0,
+            'stall_cycles': harness.hazard_cycles,
+            'frontend_stall_cycles': stats['stall_cycles'],
+            'spurious_alu_dispatches': stats['spurious_alu_dispatches'],
+            'first_divergence': None if checker.mismatch is None else int(checker.mismatch[1]['seq']),
+        }
+
+    out = report_dir() / 'control_unit_hazards.json'
+    out.write_text(json.dumps(results, indent=2))
+
+    header = f"{'stream':<14} {'ipc':>5} " + ' '.join(f'{k:>12}' for k in HAZARD_KINDS) + f" {'diverges@':>9}"
+    lines = [header]
+    for name, r in results.items():
+        first = '-' if r['first_divergence'] is None else r['first_divergence']
+        lines.append(f"{name:<14} {r['ipc']:>5.2f} "
+                     + ' '.join(f"{r['stall_cycles'][k]:>12}" for k in HAZARD_KINDS) + f' {first:>9}')
+    dut._log.info('Issue rate per stream:\n' + '\n'.join(lines) + f'\nWritten to {out}')
+
+    for name, r in results.items():
+        assert r['issued'] == r['instructions'], \
+            f"{name}: {r['issued']} of {r['instructions']} instructions left the FIFO (deadlock?)"
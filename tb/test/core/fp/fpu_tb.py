@@ -5,6 +5,34 @@ import numpy as np
 from tqdm import tqdm
 
 from ref.fpu_ref import FPUREF
+from mods.coverage_mods import Coverage
+
+
+FPU_OPCODE_NAMES = {0b0000: 'add', 0b0100: 'sub', 0b0010: 'min', 0b0001: 'max', 0b1000: 'floor',
+                    0b1001: 'ceil', 0b0011: 'mul', 0b0101: 'abs', 0b0110: 'neg', 0b1010: 'sign'}
+
+# log2|x| ranges, zero falls in the first
+EXPONENT_EDGES = [-np.inf, -1e9, -8, 0, 4, 8, np.inf]
+EXPONENT_LABELS = ['zero', '<2^-8', '[2^-8, 1)', '[1, 2^4)', '[2^4, 2^8)', '>=2^8']
+
+
+def fpu_coverage() -> Coverage:
+    """ Opcodes against the exponent range and sign of each operand. """
+
+    cov = Coverage('fpu')
+    cov.point('opcode', 0, list(FPU_OPCODE_NAMES.values()), values=list(FPU_OPCODE_NAMES))
+    cov.point('exp_a', EXPONENT_EDGES, EXPONENT_LABELS)
+    cov.point('exp_b', EXPONENT_EDGES, EXPONENT_LABELS)
+    cov.point('signs', 4, ['+ +', '+ -', '- +', '- -'])
+    cov.cross('opcode_x_exp_a', 'opcode', 'exp_a')
+    cov.cross('opcode_x_exp_b', 'opcode', 'exp_b')
+    cov.cross('opcode_x_signs', 'opcode', 'signs')
+    return cov
+
+
+def log2_magnitude(x:float) -> float:
+    return float(np.log2(abs(x))) if x != 0 else -np.inf
+
 
 @cocotb.test()
 async def test_fpu_operations(dut):
@@ -34,6 +62,7 @@ async def test_fpu_operations(dut):
     ]
 
     single_operand_ops = {0b1000, 0b1001, 0b0101, 0b0110, 0b1010}
+    cov = fpu_coverage()
     mismatch_count = 0
     total_tests = 0
     max_tests_per_range = 10
@@ -82,6 +111,8 @@ async def test_fpu_operations(dut):
                         hw_val = FPUREF.float24_to_float32_bits(hw_raw)
 
                         ref_val = FPUREF.fpu_ref(a_float, b_float, opcode)
+                        cov.sample(opcode=opcode, exp_a=log2_magnitude(a_float), exp_b=log2_magnitude(b_float),
+                                   signs=2 * int(np.signbit(a_float)) + int(np.signbit(b_float)))
 
                         diff = abs(hw_val - ref_val)
                         TOL = 2
@@ -94,6 +125,7 @@ async def test_fpu_operations(dut):
 
                         pbar.update(1)
 
+    dut._log.info(f"Functional coverage {cov.coverage:.1%}, written to {cov.write()}")
     dut._log.info(f"FPU test completed: {mismatch_count} mismatches out of {total_tests} operations.")
     dut._log.info(f"Test passed: {mismatch_count/total_tests*100:.2f}%")
     assert mismatch_count == 0, f"Found {mismatch_count} mismatches in {total_tests} tests."
\ No newline at end of file
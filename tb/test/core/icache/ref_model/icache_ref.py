@@ -0,0 +1,25 @@
+import numpy as np
+
+
+# icache_controller.sv as written: 16 direct-mapped lines of 32 words,
+# set pc[10:7], tag pc[31:11]; a refill streams the whole line
+LINE_WORDS = 32
+LINE_BYTES = 4 * LINE_WORDS
+SETS = 16
+
+
+def instruction_words(pc) -> np.ndarray:
+    """ Instruction memory image: a distinct, address-derived 32-bit word
+    at every word address, so a fetch from the wrong address or a stale
+    line shows up as a mismatch. """
+
+    index = np.asarray(pc, dtype=np.uint64) >> np.uint64(2)
+    h = (index * np.uint64(0x9E3779B97F4A7C15)) & np.uint64(0xFFFFFFFFFFFFFFFF)
+    return ((h >> np.uint64(29)) ^ index).astype(np.uint32)
+
+
+def redirects(trace) -> np.ndarray:
+    """ Indices i where trace[i + 1] is not trace[i] + 4 (taken branches). """
+
+    trace = np.asarray(trace, dtype=np.int64)
+    return np.flatnonzero(trace[1:] != trace[:-1] + 4)
@@ -1,10 +1,276 @@
+import os
+import json
 import cocotb
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
+from cocotb.utils import get_sim_time
 from tqdm import tqdm
 import numpy as np
+from mods.bundle_mods import SignalBundle, expand_fields
+from mods.eventlog_mods import EventLog
+from mods.scene_mods import get_scene
+from mods.coverage_mods import Coverage
+from mods.randgen_mods import CoverageDirected
+from mods.perf_mods import report_dir
 from ref_model.clipper_ref import clip_triangle_float, compare_vertices, float_to_fixed_12_12, fixed_12_12_to_float
 
+# Port layout, declared once: 12 vertex coordinates + 4 plane coefficients in,
+# 6 clipped vertices out, all 24-bit 12.12 fixed point
+CLIPPER_INPUTS = (expand_fields('v{}_{}_i', range(3), 'xyzw', width=24, signed=True)
+                  + expand_fields('plane_{}_i', ['normal_x', 'normal_y', 'normal_z', 'offset'], width=24, signed=True))
+CLIPPER_OUTPUTS = expand_fields('clipped_v{}_{}_o', range(6), 'xyzw', width=24, signed=True)
+
+# Distance of the closest vertex to the plane (one 12.12 LSB is "on" it)
+DISTANCE_EDGES = [0, 1 / 4096, 1, 16, 256, np.inf]
+DISTANCE_LABELS = ['on plane', '< 1', '< 16', '< 256', 'far']
+# sin of the angle between an edge crossing the plane and the plane
+CROSSING_EDGES = [-1, 0, 1e-3, 1e-2, 0.1, 1.01]
+CROSSING_LABELS = ['no crossing', 'parallel', '< 0.01', '< 0.1', 'steep']
+# Triangle area over its longest edge squared (0.433 for equilateral)
+SHAPE_EDGES = [0, 1e-6, 1e-3, 1]
+SHAPE_LABELS = ['degenerate', 'sliver', 'regular']
+
+
+def clipper_coverage(name:str='clipper') -> Coverage:
+    """ Inside / outside patterns against how close the triangle is to
+    the plane, how shallow its crossing edges are and its shape. """
+
+    cov = Coverage(name)
+    cov.point('inside_mask', 8, [f'{m:03b}'[::-1] for m in range(8)])   # v0 v1 v2, 1 = inside
+    cov.point('inside_count', 4, ['0 inside', '1 inside', '2 inside', '3 inside'])
+    cov.point('min_distance', DISTANCE_EDGES, DISTANCE_LABELS)
+    cov.point('crossing', CROSSING_EDGES, CROSSING_LABELS)
+    cov.point('shape', SHAPE_EDGES, SHAPE_LABELS)
+    cov.cross('count_x_distance', 'inside_count', 'min_distance')
+    # Edges cross the plane exactly when some but not all vertices are inside
+    cov.cross('count_x_crossing', 'inside_count', 'crossing',
+              ignore=[(0, c) for c in range(1, 5)] + [(3, c) for c in range(1, 5)] + [(1, 0), (2, 0)])
+    cov.cross('count_x_shape', 'inside_count', 'shape')
+    return cov
+
+
+def clipper_samples(stimulus) -> dict:
+    """ Cover point values of stimulus rows (v0..v2 xyzw, plane normal,
+    offset), classified with the reference's rule (dot >= 0 is inside). """
+
+    stimulus = np.asarray(stimulus, dtype=float)
+    verts = stimulus[:, :12].reshape(-1, 3, 4)
+    dots = verts @ stimulus[:, 12:16, None]
+    dots = dots[..., 0]
+    inside = dots >= 0
+    xyz = verts[..., :3]
+
+    # Edges v0v1, v1v2, v2v0: the crossing ones and their slope to the plane
+    a, b = dots, np.roll(dots, -1, axis=1)
+    lengths = np.linalg.norm(np.roll(xyz, -1, axis=1) - xyz, axis=2)
+    crosses = (a >= 0) != (b >= 0)
+    slope = np.where(crosses, np.abs(a - b) / np.maximum(lengths, 1e-12), np.inf)
+    crossing = np.where(crosses.any(axis=1), slope.min(axis=1), -0.5)
+
+    area = 0.5 * np.linalg.norm(np.cross(xyz[:, 1] - xyz[:, 0], xyz[:, 2] - xyz[:, 0]), axis=1)
+    shape = area / np.maximum(lengths.max(axis=1) ** 2, 1e-12)
+    return {
+        'inside_mask': (inside * np.array([1, 2, 4])).sum(axis=1),
+        'inside_count': inside.sum(axis=1),
+        'min_distance': np.abs(dots).min(axis=1),
+        'crossing': crossing,
+        'shape': shape,
+    }
+
+
+# Stimulus generators for coverage-directed runs: f(count, rng) -> rows of
+# v0..v2 xyzw (w = 1) and a unit plane, on the 12.12 grid the DUT sees.
+# Vertices are built around the plane as point + a*u + b*v + distance*n.
+CLIPPER_RANGE = 1279.0
+
+
+def _quantise(rows):
+    return np.clip(np.round(rows * 4096.0) / 4096.0, -CLIPPER_RANGE - 1, CLIPPER_RANGE)
+
+
+def _random_planes(count, rng, axis_aligned=False):
+    """ (normal, u, v, offset): a unit normal, an in-plane basis and
+    offsets in [-1, 1). Axis-aligned normals keep exact distances after
+    quantisation. """
+
+    if axis_aligned:
+        normal = np.zeros((count, 3))
+        normal[np.arange(count), rng.integers(0, 3, count)] = rng.choice([-1.0, 1.0], count)
+    else:
+        normal = rng.normal(size=(count, 3))
+        normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+    helper = np.where(np.abs(normal[:, :1]) < 0.9, [[1.0, 0, 0]], [[0, 1.0, 0]])
+    u = np.cross(normal, helper)
+    u /= np.linalg.norm(u, axis=1, keepdims=True)
+    v = np.cross(normal, u)
+    offset = np.round(rng.uniform(-1.0, 1.0, count) * 4096.0) / 4096.0
+    return normal, u, v, offset
+
+
+def _rows(normal, offset, points):
+    """ Rows from (count, 3, 3) vertex positions and their plane. """
+
+    rows = np.ones((len(normal), 16))
+    rows[:, :12] = np.concatenate([points, np.ones(points.shape[:2] + (1,))], axis=2).reshape(-1, 12)
+    rows[:, 12:15] = normal
+    rows[:, 15] = offset
+    return _quantise(rows)
+
+
+def _around_plane(count, rng, distances, axis_aligned=False, spread=700.0):
+    """ Three vertices at signed `distances` (count, 3) from random planes,
+    scattered within +-`spread` along the plane. """
+
+    normal, u, v, offset = _random_planes(count, rng, axis_aligned)
+    ab = rng.uniform(-spread, spread, (count, 3, 2))
+    points = (-offset[:, None, None] * normal[:, None] + ab[..., :1] * u[:, None] + ab[..., 1:] * v[:, None]
+              + distances[..., None] * normal[:, None])
+    return _rows(normal, offset, points)
+
+
+def _log_distances(count, rng, low=1 / 4096, high=500.0):
+    return np.exp(rng.uniform(np.log(low), np.log(high), (count, 3)))
+
+
+def clipper_uniform(count, rng):
+    """ As test_clipper: vertices uniform in the coordinate range, a
+    uniform plane normalised. """
+
+    rows = np.ones((count, 16))
+    rows[:, :12] = rng.uniform(-CLIPPER_RANGE - 1, CLIPPER_RANGE, (count, 12))
+    rows[:, 3:12:4] = 1.0
+    normal = rng.uniform(-1.0, 1.0, (count, 3))
+    rows[:, 12:15] = normal / np.maximum(np.linalg.norm(normal, axis=1, keepdims=True), 1e-6)
+    rows[:, 15] = rng.uniform(-1.0, 1.0, count)
+    return _quantise(rows)
+
+
+def clipper_pattern(count, rng):
+    """ A random inside / outside pattern with log-uniform distances, so
+    near and far vertices are equally likely. """
+
+    inside = rng.integers(0, 2, (count, 3)).astype(bool)
+    return _around_plane(count, rng, np.where(inside, 1.0, -1.0) * _log_distances(count, rng))
+
+
+def clipper_on_plane(count, rng):
+    """ One vertex exactly on an axis-aligned plane, the others anywhere
+    around it. """
+
+    distances = rng.choice([-1.0, 1.0], (count, 3)) * _log_distances(count, rng)
+    distances[np.arange(count), rng.integers(0, 3, count)] = 0.0
+    return _around_plane(count, rng, distances, axis_aligned=True)
+
+
+def clipper_near_plane(count, rng):
+    """ The closest vertex within a few LSBs of a random plane, on either
+    side. """
+
+    distances = rng.choice([-1.0, 1.0], (count, 3)) * _log_distances(count, rng)
+    closest = np.arange(count), rng.integers(0, 3, count)
+    distances[closest] = rng.uniform(-4.0, 4.0, count) / 4096.0
+    return _around_plane(count, rng, distances)
+
+
+def clipper_shallow(count, rng):
+    """ An edge crossing the plane at a log-uniform slope down to 1e-5,
+    i.e. almost parallel to it. """
+
+    normal, u, v, offset = _random_planes(count, rng)
+    length = rng.uniform(200.0, 1200.0, count)
+    slope = np.exp(rng.uniform(np.log(1e-5), 0.0, count))
+    split = rng.uniform(0.1, 0.9, count)
+    centre = rng.uniform(-200.0, 200.0, (count, 2))
+    direction = rng.uniform(0, 2 * np.pi, count)
+    along = np.cos(direction)[:, None] * u + np.sin(direction)[:, None] * v
+    base = -offset[:, None] * normal + centre[:, :1] * u + centre[:, 1:] * v
+    third = rng.choice([-1.0, 1.0], count) * np.exp(rng.uniform(np.log(1 / 4096), np.log(400.0), count))
+    points = np.stack([
+        base - (split * length)[:, None] * along + (split * slope * length)[:, None] * normal,
+        base + ((1 - split) * length)[:, None] * along - ((1 - split) * slope * length)[:, None] * normal,
+        base + rng.uniform(-300.0, 300.0, count)[:, None] * (u - v) + third[:, None] * normal,
+    ], axis=1)
+    return _rows(normal, offset, points[np.arange(count)[:, None], rng.permuted(np.tile([0, 1, 2], (count, 1)), axis=1)])
+
+
+def clipper_thin(count, rng):
+    """ Collinear and sliver triangles: v2 on (or a log-uniform sliver off)
+    the line through v0 and v1. """
+
+    rows = clipper_pattern(count, rng)
+    verts = rows[:, :12].reshape(-1, 3, 4)[..., :3].copy()
+    edge = verts[:, 1] - verts[:, 0]
+    side = np.cross(edge, rng.normal(size=(count, 3)))
+    side /= np.maximum(np.linalg.norm(side, axis=1, keepdims=True), 1e-12)
+    width = np.where(rng.random(count) < 0.5, 0.0, np.exp(rng.uniform(np.log(1e-6), np.log(1e-3), count)))
+    width *= np.linalg.norm(edge, axis=1)
+    verts[:, 2] = verts[:, 0] + rng.uniform(-0.5, 1.5, count)[:, None] * edge + width[:, None] * side
+    return _rows(rows[:, 12:15], rows[:, 15], verts)
+
+
+CLIPPER_GENERATORS = {
+    'uniform': clipper_uniform,
+    'pattern': clipper_pattern,
+    'on_plane': clipper_on_plane,
+    'near_plane': clipper_near_plane,
+    'shallow': clipper_shallow,
+    'thin': clipper_thin,
+}
+
+
+async def clip_and_check(dut, inputs, outputs, row, fixed_row, hw_raw, log, iteration, tol) -> list:
+    """ Drives one stimulus row, waits for done_o and checks the outputs
+    against clip_triangle_float().
+
+    :return: (list) Names of the mismatch events logged, empty if it matched """
+
+    inputs.write(fixed_row)
+
+    # Pulse start_i for at least one clock so FSM sees it
+    dut.start_i.value = 1
+    await RisingEdge(dut.clk_i)
+    dut.start_i.value = 0
+
+    # Wait for done_o to go high
+    # This ensures the DUT has fully processed the input
+    while not dut.done_o.value:
+        await RisingEdge(dut.clk_i)
+
+    # Now capture outputs and compare to reference
+    ref_vertices, ref_num_triangles, ref_valid = clip_triangle_float(*row.tolist())
+
+    hw_valid = bool(dut.valid_o.value)
+    hw_num_triangles = int(dut.num_triangles_o.value)
+
+    # Check valid & num_triangles
+    if (hw_valid != ref_valid) or (hw_num_triangles != ref_num_triangles):
+        log.error('flags_mismatch', iteration=iteration, stimulus=row,
+                  hw_valid=hw_valid, hw_num_triangles=hw_num_triangles,
+                  ref_valid=ref_valid, ref_num_triangles=ref_num_triangles)
+        return ['flags_mismatch']
+
+    # If invalid, skip vertex checks
+    if not ref_valid:
+        return []
+
+    # Collect hardware vertices: first triangle, plus the second set
+    # if hardware says there are 2 triangles
+    outputs.read(hw_raw)
+    hw_vertices = [tuple(v) for v in (hw_raw / 4096.0).reshape(6, 4)[:3 * hw_num_triangles].tolist()]
+
+    # Compare hardware vs. reference
+    if len(hw_vertices) != len(ref_vertices):
+        log.error('vertex_count_mismatch', iteration=iteration,
+                  hw_count=len(hw_vertices), ref_count=len(ref_vertices))
+        return ['vertex_count_mismatch']
+    events = []
+    for i, (hw_v, ref_v) in enumerate(zip(hw_vertices, ref_vertices)):
+        if not compare_vertices(hw_v, ref_v, tol):
+            events.append('vertex_mismatch')
+            log.error('vertex_mismatch', iteration=iteration, vertex=i, hw=hw_v, ref=ref_v)
+    return events
+
+
 @cocotb.test()
 async def test_clipper(dut):
     """
@@ -34,161 +300,114 @@ async def test_clipper(dut):
     
     print(f"\nRunning clipper tests with {test_iters} random triangle configurations...")
 
-    rng = np.random.default_rng()
-    mismatches = 0
-    vertex_errors = []
-    vertex_count_mismatches = 0
-    num_tri_mismatches = 0
-
-    for test_count in tqdm(range(test_iters), desc="Testing Clipper"):
-        # Generate random triangle
-        v0_xf = rng.uniform(MIN_VAL, MAX_VAL)
-        v0_yf = rng.uniform(MIN_VAL, MAX_VAL)
-        v0_zf = rng.uniform(MIN_VAL, MAX_VAL)
-        v0_wf = 1.0
-
-        v1_xf = rng.uniform(MIN_VAL, MAX_VAL)
-        v1_yf = rng.uniform(MIN_VAL, MAX_VAL)
-        v1_zf = rng.uniform(MIN_VAL, MAX_VAL)
-        v1_wf = 1.0
-
-        v2_xf = rng.uniform(MIN_VAL, MAX_VAL)
-        v2_yf = rng.uniform(MIN_VAL, MAX_VAL)
-        v2_zf = rng.uniform(MIN_VAL, MAX_VAL)
-        v2_wf = 1.0
-
-        # Generate random plane
-        plane_normal_x = rng.uniform(-1.0, 1.0)
-        plane_normal_y = rng.uniform(-1.0, 1.0)
-        plane_normal_z = rng.uniform(-1.0, 1.0)
-        plane_offset   = rng.uniform(-1.0, 1.0)
-
-        # Normalize plane normal
-        norm = np.sqrt(plane_normal_x**2 + plane_normal_y**2 + plane_normal_z**2)
-        if norm < 1e-6:
-            # Degenerate normal, skip
-            continue
-
-        plane_normal_x /= norm
-        plane_normal_y /= norm
-        plane_normal_z /= norm
-
-        # Convert inputs to 12.12 fixed point
-        dut.v0_x_i.value = float_to_fixed_12_12(v0_xf) & 0xFFFFFF
-        dut.v0_y_i.value = float_to_fixed_12_12(v0_yf) & 0xFFFFFF
-        dut.v0_z_i.value = float_to_fixed_12_12(v0_zf) & 0xFFFFFF
-        dut.v0_w_i.value = float_to_fixed_12_12(v0_wf) & 0xFFFFFF
-
-        dut.v1_x_i.value = float_to_fixed_12_12(v1_xf) & 0xFFFFFF
-        dut.v1_y_i.value = float_to_fixed_12_12(v1_yf) & 0xFFFFFF
-        dut.v1_z_i.value = float_to_fixed_12_12(v1_zf) & 0xFFFFFF
-        dut.v1_w_i.value = float_to_fixed_12_12(v1_wf) & 0xFFFFFF
-
-        dut.v2_x_i.value = float_to_fixed_12_12(v2_xf) & 0xFFFFFF
-        dut.v2_y_i.value = float_to_fixed_12_12(v2_yf) & 0xFFFFFF
-        dut.v2_z_i.value = float_to_fixed_12_12(v2_zf) & 0xFFFFFF
-        dut.v2_w_i.value = float_to_fixed_12_12(v2_wf) & 0xFFFFFF
-
-        dut.plane_normal_x_i.value = float_to_fixed_12_12(plane_normal_x) & 0xFFFFFF
-        dut.plane_normal_y_i.value = float_to_fixed_12_12(plane_normal_y) & 0xFFFFFF
-        dut.plane_normal_z_i.value = float_to_fixed_12_12(plane_normal_z) & 0xFFFFFF
-        dut.plane_offset_i.value   = float_to_fixed_12_12(plane_offset)   & 0xFFFFFF
-
-        # 4) Pulse start_i for at least one clock so FSM sees it
-        dut.start_i.value = 1
-        await RisingEdge(dut.clk_i)
-        dut.start_i.value = 0
-
-        # 5) Wait for done_o to go high
-        #    This ensures the DUT has fully processed the input
-        while not dut.done_o.value:
-            await RisingEdge(dut.clk_i)
-
-        # 6) Now capture outputs and compare to reference
-        ref_vertices, ref_num_triangles, ref_valid = clip_triangle_float(
-            v0_xf, v0_yf, v0_zf, v0_wf,
-            v1_xf, v1_yf, v1_zf, v1_wf,
-            v2_xf, v2_yf, v2_zf, v2_wf,
-            plane_normal_x, plane_normal_y, plane_normal_z, plane_offset
-        )
-
-        hw_valid = bool(dut.valid_o.value)
-        hw_num_triangles = int(dut.num_triangles_o.value)
-
-        # Check valid & num_triangles
-        if (hw_valid != ref_valid) or (hw_num_triangles != ref_num_triangles):
-            mismatches += 1
-            num_tri_mismatches += 1
-            print(f"\n[ERROR] Output flags mismatch @ iteration {test_count}")
-            print(f"  HW:  valid={hw_valid}, num_triangles={hw_num_triangles}")
-            print(f"  REF: valid={ref_valid}, num_triangles={ref_num_triangles}")
-            continue
-
-        # If invalid, skip vertex checks
-        if not ref_valid:
-            continue
-
-        # Collect hardware vertices
-        hw_vertices = []
-
-        # First triangle outputs
-        hw_vertices.extend([
-            (fixed_12_12_to_float(dut.clipped_v0_x_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v0_y_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v0_z_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v0_w_o.value.signed_integer)),
-
-            (fixed_12_12_to_float(dut.clipped_v1_x_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v1_y_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v1_z_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v1_w_o.value.signed_integer)),
-
-            (fixed_12_12_to_float(dut.clipped_v2_x_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v2_y_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v2_z_o.value.signed_integer),
-             fixed_12_12_to_float(dut.clipped_v2_w_o.value.signed_integer))
-        ])
-
-        # If hardware says there are 2 triangles, read the second set
-        if hw_num_triangles == 2:
-            hw_vertices.extend([
-                (fixed_12_12_to_float(dut.clipped_v3_x_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v3_y_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v3_z_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v3_w_o.value.signed_integer)),
+    inputs = SignalBundle(dut, CLIPPER_INPUTS)
+    outputs = SignalBundle(dut, CLIPPER_OUTPUTS)
 
-                (fixed_12_12_to_float(dut.clipped_v4_x_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v4_y_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v4_z_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v4_w_o.value.signed_integer)),
+    # Generate all stimulus up front: 3 vertices (w = 1) and a random plane per row
+    rng = np.random.default_rng()
+    stimulus = np.empty((test_iters, 16))
+    stimulus[:, :12] = rng.uniform(MIN_VAL, MAX_VAL, (test_iters, 12))
+    stimulus[:, 3:12:4] = 1.0
+    stimulus[:, 12:16] = rng.uniform(-1.0, 1.0, (test_iters, 4))
+
+    # Normalize plane normal, skipping degenerate normals
+    norm = np.linalg.norm(stimulus[:, 12:15], axis=1)
+    usable = norm >= 1e-6
+    stimulus[usable, 12:15] /= norm[usable, None]
+
+    # Convert inputs to 12.12 fixed point in one pass
+    fixed_stimulus = np.round(stimulus * 4096.0).astype(np.int64)
+    hw_raw = np.zeros(len(outputs), dtype=np.int64)
+
+    with EventLog('test_clipper') as log:
+        cov = clipper_coverage()
+        samples = clipper_samples(stimulus)
+        mismatches = 0
+        vertex_errors = []
+        vertex_count_mismatches = 0
+        num_tri_mismatches = 0
+
+        for test_count in tqdm(range(test_iters), desc="Testing Clipper"):
+            if not usable[test_count]:
+                continue
 
-                (fixed_12_12_to_float(dut.clipped_v5_x_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v5_y_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v5_z_o.value.signed_integer),
-                 fixed_12_12_to_float(dut.clipped_v5_w_o.value.signed_integer))
-            ])
-
-        # Compare hardware vs. reference
-        if len(hw_vertices) != len(ref_vertices):
-            mismatches += 1
-            vertex_count_mismatches += 1
-            print(f"\n[ERROR] Vertex count mismatch @ iteration {test_count}")
-            print(f"  HW has {len(hw_vertices)} vertices, REF has {len(ref_vertices)}")
-        else:
-            for i, (hw_v, ref_v) in enumerate(zip(hw_vertices, ref_vertices)):
-                if not compare_vertices(hw_v, ref_v, TOL):
-                    mismatches += 1
-                    vertex_errors.append(test_count)
-                    print(f"\n[ERROR] Vertex {i} mismatch @ iteration {test_count}")
-                    print(f"  HW  = {hw_v}")
-                    print(f"  REF = {ref_v}")
+            events = await clip_and_check(dut, inputs, outputs, stimulus[test_count], fixed_stimulus[test_count],
+                                          hw_raw, log, test_count, TOL)
+            mismatches += len(events)
+            num_tri_mismatches += events.count('flags_mismatch')
+            vertex_count_mismatches += events.count('vertex_count_mismatch')
+            vertex_errors += [test_count] * events.count('vertex_mismatch')
+            # Only rows that were driven and checked count as covered
+            cov.sample(**{name: values[test_count] for name, values in samples.items()})
 
+    print(f"\nFunctional coverage {cov.coverage:.1%}, written to {cov.write()}")
     print(f"\nTest completed: {mismatches} mismatch(es) in {test_iters} iterations.")
     print(f"  Vertex count mismatches: {vertex_count_mismatches}")
     print(f"  Vertex mismatches: {len(vertex_errors)}")
     print(f"  Num_Triangle mismatches: {num_tri_mismatches}")
+    if mismatches:
+        print(f"  Details: python mods/eventlog_mods.py {log.path}")
+    assert mismatches == 0, f"{mismatches} mismatch(es) found."
+
+
+@cocotb.test()
+async def test_clipper_directed(dut):
+    """
+    Coverage-directed clipper stimulus: each batch of TB_CLIPPER_BATCH rows
+    is picked by CoverageDirected from the CLIPPER_GENERATORS candidates
+    most likely to reach unhit bins (on-plane vertices, near-parallel
+    crossings, degenerate triangles), until clipper coverage closes or
+    TB_CLIPPER_DIRECTED_ITERS rows ran. Uniform stimulus from the same
+    seed is classified alongside for comparison in clipper_directed.json.
+    """
+
+    clock = Clock(dut.clk_i, 10, units='ns')
+    cocotb.start_soon(clock.start())
+    dut.reset_n.value = 0
+    dut.start_i.value = 0
+    for _ in range(5):
+        await RisingEdge(dut.clk_i)
+    dut.reset_n.value = 1
+    await RisingEdge(dut.clk_i)
+
+    TOL = 10
+    budget = int(os.environ.get('TB_CLIPPER_DIRECTED_ITERS', 2000))
+    batch = int(os.environ.get('TB_CLIPPER_BATCH', 32))
+    seed = int(os.getenv('TB_SEED', '0')) or None
+
+    inputs = SignalBundle(dut, CLIPPER_INPUTS)
+    outputs = SignalBundle(dut, CLIPPER_OUTPUTS)
+    hw_raw = np.zeros(len(outputs), dtype=np.int64)
+    with EventLog('test_clipper_directed') as log:
+        cov = clipper_coverage('clipper_directed')
+        directed = CoverageDirected(cov, clipper_samples, CLIPPER_GENERATORS, rng=np.random.default_rng(seed))
+
+        mismatches = 0
+        while cov.coverage < 1.0 and directed.rows < budget:
+            first = directed.rows
+            rows = directed.next(batch)
+            fixed_rows = np.round(rows * 4096.0).astype(np.int64)
+            for i in range(len(rows)):
+                mismatches += len(await clip_and_check(dut, inputs, outputs, rows[i], fixed_rows[i], hw_raw,
+                                                       log, first + i, TOL))
+            directed.commit(rows)
+
+        # Uniform stimulus for the same number of rows, classified only
+        uniform = clipper_coverage()
+        uniform.sample_batch(**clipper_samples(clipper_uniform(directed.rows, np.random.default_rng(seed))))
+
+    report = {**directed.report(), 'uniform_coverage': uniform.coverage,
+              'holes': {name: cov.holes(name) for name in list(cov.points) + list(cov.crosses) if cov.holes(name)}}
+    out = report_dir() / 'clipper_directed.json'
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\nDirected coverage {cov.coverage:.1%} in {directed.rows} rows "
+          f"(uniform {uniform.coverage:.1%}), written to {cov.write()} and {out}")
+    print(f"  Generator weights: " + ', '.join(f'{k} {v:.2f}' for k, v in report['weights'].items()))
+    if mismatches:
+        print(f"Mismatch details: python mods/eventlog_mods.py {log.path}")
     assert mismatches == 0, f"{mismatches} mismatch(es) found."
 
+
 @cocotb.test()
 async def test_clipper_dot_product_direct(dut):
     """Test dot product calculation with a single known case."""
@@ -1422,3 +1641,64 @@ async def test_clipper_two_inside_case(dut):
     print(f"\nTest completed: {mismatches} mismatch(es) in {NUM_TESTS} tests.")
     assert mismatches == 0, f"{mismatches} mismatch(es) found."
 
+@cocotb.test()
+async def test_clipper_scene(dut):
+    """
+    Replay the triangles and clip planes of a captured / synthetic scene
+    (TB_SCENE, default 'corridor') through the clipper, so the mix of
+    inside / outside / straddling cases matches a real frame.
+    TB_SCENE_TRIS caps the number of triangles replayed.
+    """
+
+    clock = Clock(dut.clk_i, 10, units='ns')
+    cocotb.start_soon(clock.start())
+
+    dut.reset_n.value = 0
+    dut.start_i.value = 0
+    for _ in range(5):
+        await RisingEdge(dut.clk_i)
+    dut.reset_n.value = 1
+    await RisingEdge(dut.clk_i)
+
+    scene = get_scene(os.environ.get('TB_SCENE', 'corridor'))
+    max_tris = int(os.environ.get('TB_SCENE_TRIS', 500))
+    TOL = 10
+
+    # One transaction per (triangle, clip plane of its draw)
+    jobs = []
+    for d in range(len(scene.draws)):
+        planes = scene.draw_planes(d)
+        for tri in scene.triangles(d):
+            for plane in planes:
+                jobs.append((tri, plane))
+    stride = max(len(jobs) // (max_tris * 6), 1)
+    jobs = jobs[::stride]
+
+    # One clip_and_check() row per job: 12 vertex coordinates + 4 plane coefficients
+    rows = np.array([np.concatenate([tri.ravel(), plane]) for tri, plane in jobs], dtype=np.float64).reshape(-1, 16)
+    fixed_rows = np.round(rows * 4096.0).astype(np.int64)
+    dots = np.einsum('nvk,nk->nv', rows[:, :12].reshape(-1, 3, 4), rows[:, 12:])
+    case_counts = np.bincount((dots >= 0).sum(axis=1), minlength=4).tolist()  # by number of vertices inside
+
+    inputs = SignalBundle(dut, CLIPPER_INPUTS)
+    outputs = SignalBundle(dut, CLIPPER_OUTPUTS)
+    hw_raw = np.zeros(len(outputs), dtype=np.int64)
+
+    print(f"\nReplaying {len(jobs)} triangle/plane pairs from scene with {scene.num_triangles} triangles...")
+
+    mismatches = 0
+    start = get_sim_time('ns')
+    with EventLog('test_clipper_scene') as log:
+        for i in tqdm(range(len(rows)), desc="Scene Clipper"):
+            mismatches += bool(await clip_and_check(dut, inputs, outputs, rows[i], fixed_rows[i], hw_raw,
+                                                    log, i, TOL))
+            while dut.curr_state.value != 0:
+                await RisingEdge(dut.clk_i)
+    cycles = (get_sim_time('ns') - start) / 10
+
+    print(f"\nScene test completed: {mismatches} mismatch(es) in {len(jobs)} transactions.")
+    print(f"  Inside-count distribution (0/1/2/3): {case_counts}")
+    print(f"  Cycles per triangle/plane pair: {cycles / max(len(jobs), 1):.2f}")
+    if mismatches:
+        print(f"Mismatch details: python mods/eventlog_mods.py {log.path}")
+    assert mismatches == 0, f"{mismatches} mismatch(es) found."
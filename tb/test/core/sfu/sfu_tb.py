@@ -0,0 +1,205 @@
+import os
+import json
+from collections import deque, Counter
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, FallingEdge, ReadOnly
+import numpy as np
+
+from mods.isa_mods import parse_defines
+from mods.iss_mods import float24_to_float32, float32_to_float24
+from mods.sfuacc_mods import TableModel, ulp_error, MANT_BITS
+from mods.eventlog_mods import EventLog
+from mods.perf_mods import report_dir
+
+
+SFU_OPCODES = parse_defines()['SFU']   # {'RSQRT': 0b000, ...}
+
+# Operand ranges per operation, where the results are meaningful
+OPERAND_RANGES = {
+    'RSQRT': (2.0 ** -20, 2.0 ** 20),
+    'RECIP': (-(2.0 ** 20), 2.0 ** 20),
+    'LOG2':  (2.0 ** -20, 2.0 ** 20),
+    'EXP':   (-24.0, 24.0),
+    'SIN':   (-8 * np.pi, 8 * np.pi),
+    'ATAN':  (-64.0, 64.0),
+}
+
+
+def make_stream(count:int, ops=None, rng=None) -> dict:
+    """ Random SFU operations with operands drawn log-uniformly (RSQRT,
+    LOG2) or uniformly inside OPERAND_RANGES.
+
+    :return: (dict) {'names', 'opcodes', 'operands' (float24 bits)} """
+
+    rng = rng or np.random.default_rng()
+    ops = list(ops or SFU_OPCODES)
+    names = np.array(ops)[rng.integers(0, len(ops), count)]
+    values = np.empty(count, dtype=np.float64)
+    for name in ops:
+        rows = names == name
+        lo, hi = OPERAND_RANGES[name]
+        if lo > 0:
+            values[rows] = np.exp2(rng.uniform(np.log2(lo), np.log2(hi), rows.sum()))
+        else:
+            values[rows] = rng.uniform(lo, hi, rows.sum())
+    return {
+        'names': names,
+        'opcodes': np.array([SFU_OPCODES[n] for n in names], dtype=np.uint32),
+        'operands': float32_to_float24(values.astype(np.float32)),
+    }
+
+
+def expected_results(stream:dict, model:TableModel) -> np.ndarray:
+    """ Table model results for a stream, in float64 before the final
+    float24 truncation (operands flushed to zero when denormal, as in
+    `TableModel.evaluate24()`). """
+
+    bits = stream['operands']
+    x = float24_to_float32(np.where((bits >> MANT_BITS) & 0xFF, bits, bits & 0x800000)).astype(np.float64)
+    expected = np.zeros(len(bits), dtype=np.float64)
+    for name in SFU_OPCODES:
+        rows = stream['names'] == name
+        if rows.any():
+            expected[rows] = model.evaluate(name, x[rows])
+    return expected
+
+
+def within_bound(names, got, expected, bound:float) -> np.ndarray:
+    """ Whether float24 results `got` are within `bound` ULPs of the table
+    model. The model reduces arguments exactly in float64, sfu.sv in fixed
+    point, so results are not expected to be bit exact. SIN is measured in
+    ULPs of 1.0 (2^-15 absolute), since its phase is reduced to a fixed
+    number of fraction bits and loses relative precision near its zeros.
+    Non-finite results must match exactly (NaN any payload). """
+
+    got = np.asarray(got, dtype=np.uint32)
+    value = float24_to_float32(got).astype(np.float64)
+    error = ulp_error(got, expected)
+    sin = np.asarray(names) == 'SIN'
+    error[sin] = np.abs(value[sin] - expected[sin]) * 2.0 ** MANT_BITS
+    finite = np.isfinite(expected)
+    special = (np.isnan(value) & np.isnan(expected)) | (value == expected)
+    return np.where(finite, np.isfinite(value) & (error <= bound), special)
+
+
+@cocotb.test(expect_fail=True)
+async def test_sfu_stream(dut):
+    """ Streams SFU operations back-to-back, matches every core_valid to
+    the oldest in-flight operation and checks it against the table model
+    built from the same ROM images, within TB_SFU_ULP ULPs (default 2, see
+    `within_bound()`). flush_i fires at random points;
+    operations issued up to and including the flush cycle are dropped and
+    must not produce a result.
+
+    Reports sustained operations / cycle and the latency distribution
+    (sfu_throughput.json next to results.xml). TB_SFU_OPS sets the stream
+    length, TB_SFU_BUBBLE the probability of an idle input cycle and
+    TB_SFU_FLUSH the per-cycle flush probability.
+
+    Expected to fail: sfu.sv only instantiates the ROMs so far and never
+    drives core_valid / core_result. """
+
+    clock = Clock(dut.core_clock_i, 10, units='ns')
+    cocotb.start_soon(clock.start())
+
+    count = int(os.getenv('TB_SFU_OPS', '20000'))
+    bubble = float(os.getenv('TB_SFU_BUBBLE', '0'))
+    flush_rate = float(os.getenv('TB_SFU_FLUSH', '0.002'))
+    drain = int(os.getenv('TB_SFU_DRAIN', '64'))
+    bound = float(os.getenv('TB_SFU_ULP', '2'))
+    rng = np.random.default_rng(int(os.getenv('TB_SEED', '0')) or None)
+
+    stream = make_stream(count, rng=rng)
+    expected = expected_results(stream, TableModel())
+    opcodes, operands = stream['opcodes'].tolist(), stream['operands'].tolist()
+
+    with EventLog('test_sfu_stream') as log:
+        in_flight = deque()         # (index, capture cycle)
+        latencies = Counter()
+        results = mismatches = unexpected = squashed = flushes = 0
+        first_issue = last_result = None
+        cycle = 0
+        issued = 0
+        idle_cycles = 0
+        flush_at = None
+
+        dut.valid.value = 0
+        dut.flush_i.value = 0
+        dut.core_operand.value = 0
+        dut.core_special_op.value = 0
+        await FallingEdge(dut.core_clock_i)
+
+        while issued < count or (in_flight and idle_cycles < drain):
+            # Inputs driven now are captured by the next rising edge
+            capture = cycle + 1
+            issue = issued < count and rng.random() >= bubble
+            flush = rng.random() < flush_rate
+            dut.valid.value = int(issue)
+            if issue:
+                dut.core_special_op.value = opcodes[issued]
+                dut.core_operand.value = operands[issued]
+                in_flight.append((issued, capture))
+                first_issue = capture if first_issue is None else first_issue
+                issued += 1
+            dut.flush_i.value = int(flush)
+            flush_at = capture if flush else None
+
+            await RisingEdge(dut.core_clock_i)
+            await ReadOnly()
+            cycle += 1
+
+            if flush_at == cycle:
+                # Everything captured up to this edge is squashed
+                flushes += 1
+                while in_flight and in_flight[0][1] <= cycle:
+                    in_flight.popleft()
+                    squashed += 1
+
+            if int(dut.core_valid.value):
+                result = int(dut.core_result.value)
+                last_result = cycle
+                if not in_flight:
+                    unexpected += 1
+                    log.error('unexpected_result', cycle=cycle, result=result)
+                else:
+                    index, captured = in_flight.popleft()
+                    results += 1
+                    latencies[cycle - captured] += 1
+                    name = stream['names'][index]
+                    if not within_bound([name], [result], expected[index:index + 1], bound)[0]:
+                        mismatches += 1
+                        log.error('result_mismatch', cycle=cycle, index=index, op=str(name),
+                                  operand=float(float24_to_float32(operands[index])), got=result,
+                                  got_value=float(float24_to_float32(result)), expected_value=float(expected[index]),
+                                  ulp_bound=bound)
+            idle_cycles = 0 if issued < count else idle_cycles + 1
+
+            await FallingEdge(dut.core_clock_i)
+        dut.valid.value = 0
+        dut.flush_i.value = 0
+
+    window = last_result - first_issue + 1 if results else cycle
+    report = {
+        'issued': issued,
+        'results': results,
+        'squashed': squashed,
+        'lost': len(in_flight),
+        'flushes': flushes,
+        'mismatches': mismatches,
+        'unexpected_results': unexpected,
+        'cycles': window,
+        'ops_per_cycle': results / window if window else 0.0,
+        'latency': {str(k): v for k, v in sorted(latencies.items())},
+    }
+    out = report_dir() / 'sfu_throughput.json'
+    out.write_text(json.dumps(report, indent=2))
+    dut._log.info(f"{results} results in {window} cycles ({report['ops_per_cycle']:.3f} ops/cycle), "
+                  f"latency {dict(sorted(latencies.items()))}, {flushes} flushes squashed {squashed} ops")
+
+    if mismatches or unexpected:
+        print(f"Mismatch details: python mods/eventlog_mods.py {log.path}")
+    assert results, f'sfu.sv never raised core_valid in {cycle} cycles'
+    assert not in_flight, f'{len(in_flight)} operations never completed (drained {drain} cycles)'
+    assert unexpected == 0, f'{unexpected} results without an operation in flight (after a flush?)'
+    assert mismatches == 0, f'{mismatches} / {results} results off the table model by more than {bound} ULP'
@@ -0,0 +1,300 @@
+import os
+import json
+from collections import deque, Counter
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, FallingEdge, ReadOnly
+import numpy as np
+
+from mods.texaddr_mods import CLAMP_MIN, CLAMP_MAX, texture_address
+from mods.texcache_mods import CACHE_DEFAULTS, get_trace, simulate
+from mods.tilelink_mods import PagedMemory, TileLinkSlave
+from mods.eventlog_mods import EventLog
+from mods.perf_mods import read_int, report_dir
+
+
+TEX_BASE = 0x0010_0000
+DC_BASE = 0x0020_0000
+
+PORTS = ('texture', 'dc')
+
+
+def memory_fill(base:int, length:int) -> np.ndarray:
+    """ Deterministic, address-dependent initial memory contents. """
+
+    index = np.arange(base, base + length, dtype=np.uint64)
+    return ((index * np.uint64(0x9E3779B1) + (index >> np.uint64(7))) >> np.uint64(11) & np.uint64(0xFF)).astype(np.uint8)
+
+
+def make_dc_stream(count:int, span:int=4096, sequential:float=0.5, store_rate:float=0.3, rng=None) -> dict:
+    """ Data-cache requests inside [DC_BASE, DC_BASE + span): runs of
+    sequential words mixed with random accesses, each aligned to its size.
+    dc_op_i follows isa_mods.MEM_OPCODES[4:2]: [2] store, [1:0] log2 size.
+
+    :return: (dict) {'op' (dc_op_i), 'addr', 'data', 'store' (bool), 'size' (bytes)} """
+
+    rng = rng or np.random.default_rng()
+    store = rng.random(count) < store_rate
+    size_log2 = rng.choice(3, count, p=[0.2, 0.2, 0.6])
+    walk = np.cumsum(np.full(count, 4)) % span
+    addr = np.where(rng.random(count) < sequential, walk, rng.integers(0, span, count))
+    addr = DC_BASE + (addr & ~((1 << size_log2) - 1))
+    return {
+        'op': (store.astype(np.uint32) << 2) | size_log2.astype(np.uint32),
+        'addr': addr.astype(np.uint32),
+        'data': rng.integers(0, 1 << 32, count, dtype=np.uint32),
+        'store': store,
+        'size': (1 << size_log2).astype(int),
+    }
+
+
+def make_texture_stream(count:int, source:str='plane:30', width:int=64, height:int=64) -> dict:
+    """ Texture lookups from a texcache_mods trace, repeated up to `count`.
+
+    :return: (dict) {'s', 't' (float24), 'addr', 'width', 'height', 'wrap_s', 'wrap_t'} """
+
+    trace = get_trace(source, width, height)
+    reps = -(-count // max(len(trace['s']), 1))
+    s = np.tile(trace['s'], reps)[:count]
+    t = np.tile(trace['t'], reps)[:count]
+    return {
+        's': s, 't': t,
+        'addr': texture_address(s, t, trace['width'], trace['height'], TEX_BASE,
+                                wrap_s=trace['wrap_s'], wrap_t=trace['wrap_t']),
+        'width': trace['width'], 'height': trace['height'],
+        'wrap_s': trace['wrap_s'], 'wrap_t': trace['wrap_t'],
+    }
+
+
+def expected_texel(memory:PagedMemory, addr:int) -> int:
+    """ texture_o for a lookup at byte address `addr`, as far as the RTL
+    and ISA.txt define it:
+
+    - the address is cache.sv's full_address, tx_base + {10'h0, texAgen
+      offset}, not scaled by a texel size (`texture_address()`)
+    - texture_o is 24 bits wide and tex2d writes it to a float24 register,
+      so the texel is read the way ISA.txt defines fl24: the 4 bytes at
+      the address (little endian, as the TileLink data beats), without
+      their low 8 bits. Textures stored with fs24 read back exactly.
+
+    cache.sv does not fetch texels yet; if it settles on another texel
+    size or layout, this is the one place to change. """
+
+    return memory.read_word(addr) >> 8
+
+
+def sign_extend(value:int, size:int) -> int:
+    bits = 8 * size
+    value &= (1 << bits) - 1
+    return (value - (1 << bits) if value >> (bits - 1) else value) & 0xFFFFFFFF
+
+
+@cocotb.test(expect_fail=True)
+async def test_cache_contention(dut):
+    """ Drives interleaved texel lookups and data-cache requests into
+    cache.sv with a TileLink-UH slave behind it, checks every texture_o /
+    dc_data_o against an architectural memory model and reports latency
+    and hit rate per port.
+
+    Each port pulses a request and keeps at most TB_CACHE_OUTSTANDING
+    in flight (1, as control_unit does); idle ports issue with
+    probability TB_CACHE_LOAD, split between the ports by TB_CACHE_MIX
+    (fraction of texture requests). cache_flush_i fires with probability
+    TB_CACHE_FLUSH per cycle (one flush at a time) and once at the end,
+    after which the dirty data must have reached memory. Texture data
+    is read-only and disjoint from the data-cache region, but both share
+    the 16-line tag array. Hit rates come from the texcache_mods model
+    of the issue order; TileLink Gets are counted by the slave.
+
+    texture_o is checked against `expected_texel()`, dc loads are sign
+    extended. A request unanswered after TB_CACHE_TIMEOUT cycles ends the
+    test.
+
+    Expected to fail: cache.sv never drives `busy` and its lookup FSM
+    states are empty, so no request is answered and the test times out. """
+
+    clock = Clock(dut.core_clock_i, 10, units='ns')
+    cocotb.start_soon(clock.start())
+
+    count = int(os.getenv('TB_CACHE_REQUESTS', '20000'))
+    mix = float(os.getenv('TB_CACHE_MIX', '0.7'))
+    load = float(os.getenv('TB_CACHE_LOAD', '0.8'))
+    outstanding = int(os.getenv('TB_CACHE_OUTSTANDING', '1'))
+    flush_rate = float(os.getenv('TB_CACHE_FLUSH', '0.0005'))
+    timeout = int(os.getenv('TB_CACHE_TIMEOUT', '2000'))
+    latency = tuple(int(v) for v in os.getenv('TB_CACHE_MEM_LATENCY', '4,12').split(','))
+    width, height = (int(v) for v in os.getenv('TB_CACHE_TEXTURE', '64x64').lower().split('x'))
+    rng = np.random.default_rng(int(os.getenv('TB_SEED', '0')) or None)
+
+    tex = make_texture_stream(int(count * mix) + 1, os.getenv('TB_CACHE_TRACE', 'plane:30'), width, height)
+    dc = make_dc_stream(count - int(count * mix) + 1, rng=rng)
+    totals = {'texture': len(tex['addr']), 'dc': len(dc['addr'])}
+
+    golden = PagedMemory(fill=memory_fill)
+    backing = PagedMemory(fill=memory_fill)
+    slave = TileLinkSlave(dut, dut.core_clock_i, 'tcache', backing, latency=latency, rng=rng).start()
+
+    dut.texture_wrapS_mode_i.value = tex['wrap_s']
+    dut.texture_wrapT_mode_i.value = tex['wrap_t']
+    dut.texture_min_s_clamp_i.value = CLAMP_MIN
+    dut.texture_max_s_clamp_i.value = CLAMP_MAX
+    dut.texture_min_t_clamp_i.value = CLAMP_MIN
+    dut.texture_max_t_clamp_i.value = CLAMP_MAX
+    dut.tx_width.value = tex['width']
+    dut.tx_height.value = tex['height']
+    dut.tx_base.value = TEX_BASE
+    dut.texture_lkp_i.value = 0
+    dut.dc_valid_i.value = 0
+    dut.cache_flush_i.value = 0
+
+    with EventLog('test_cache_contention') as log:
+        in_flight = {port: deque() for port in PORTS}      # (index, issue cycle, expected or None)
+        issued = dict.fromkeys(PORTS, 0)
+        latencies = {port: Counter() for port in PORTS}
+        mismatches = dict.fromkeys(PORTS, 0)
+        unexpected = dict.fromkeys(PORTS, 0)
+        order = []                                         # (port, address) in issue order, for the hit model
+        flush_marks = []                                   # len(order) at every flush
+        flush_latency = []
+        flush_pending = None
+        timed_out = None
+        cycle = 0
+
+        await FallingEdge(dut.core_clock_i)
+
+        def done():
+            # Everything answered and the final flush (after the last request) acknowledged
+            drained = all(issued[p] == totals[p] and not in_flight[p] for p in PORTS)
+            return drained and flush_pending is None and flush_marks[-1:] == [len(order)]
+
+        while not done():
+            capture = cycle + 1
+            # Texture port
+            lkp = issued['texture'] < totals['texture'] and len(in_flight['texture']) < outstanding \
+                and rng.random() < load * mix
+            dut.texture_lkp_i.value = int(lkp)
+            if lkp:
+                i = issued['texture']
+                dut.texture_s_i.value = int(tex['s'][i])
+                dut.texture_t_i.value = int(tex['t'][i])
+                addr = int(tex['addr'][i])
+                in_flight['texture'].append((i, capture, expected_texel(golden, addr)))
+                order.append(('texture', addr))
+                issued['texture'] += 1
+
+            # Data-cache port
+            req = issued['dc'] < totals['dc'] and len(in_flight['dc']) < outstanding \
+                and rng.random() < load * (1 - mix)
+            dut.dc_valid_i.value = int(req)
+            if req:
+                i = issued['dc']
+                addr, size = int(dc['addr'][i]), int(dc['size'][i])
+                dut.dc_addr_i.value = addr
+                dut.dc_data_i.value = int(dc['data'][i])
+                dut.dc_op_i.value = int(dc['op'][i])
+                if dc['store'][i]:
+                    golden.write_word(addr, int(dc['data'][i]) & ((1 << 8 * size) - 1), size)
+                    expected = None
+                else:
+                    expected = sign_extend(golden.read_word(addr, size), size)
+                in_flight['dc'].append((i, capture, expected))
+                order.append(('dc', addr))
+                issued['dc'] += 1
+
+            # Flush mid-stream, and once everything has been issued
+            last = all(issued[p] == totals[p] for p in PORTS) and not any(in_flight.values())
+            flush = flush_pending is None and (rng.random() < flush_rate or (last and flush_marks[-1:] != [len(order)]))
+            dut.cache_flush_i.value = int(flush)
+            if flush:
+                flush_pending = capture
+                flush_marks.append(len(order))
+
+            await RisingEdge(dut.core_clock_i)
+            await ReadOnly()
+            cycle += 1
+
+            for port, valid, data in (('texture', dut.texture_valid_o, dut.texture_o),
+                                      ('dc', dut.dc_valid_o, dut.dc_data_o)):
+                if not read_int(valid):
+                    continue
+                if not in_flight[port]:
+                    unexpected[port] += 1
+                    log.error('unexpected_response', port=port, cycle=cycle)
+                    continue
+                index, issued_at, expected = in_flight[port].popleft()
+                latencies[port][cycle - issued_at] += 1
+                got = read_int(data)
+                if expected is not None and got != expected:
+                    mismatches[port] += 1
+                    stream = tex if port == 'texture' else dc
+                    log.error('data_mismatch', port=port, cycle=cycle, index=index, addr=int(stream['addr'][index]),
+                              got=got, expected=expected)
+            if flush_pending is not None and read_int(dut.cache_flush_resp):
+                flush_latency.append(cycle - flush_pending)
+                flush_pending = None
+
+            oldest = [(q[0][1], port) for port, q in in_flight.items() if q]
+            if flush_pending is not None:
+                oldest.append((flush_pending, 'flush'))
+            stale = [(at, port) for at, port in oldest if cycle - at > timeout]
+            if stale:
+                timed_out = stale[0][1]
+                log.error('timeout', port=timed_out, cycle=cycle, issued_at=stale[0][0],
+                          in_flight={p: len(q) for p, q in in_flight.items()})
+                break
+
+            await FallingEdge(dut.core_clock_i)
+
+        dut.texture_lkp_i.value = 0
+        dut.dc_valid_i.value = 0
+        dut.cache_flush_i.value = 0
+        slave.stop()
+
+        # After the final flush every dc store has to be in memory
+        stale_bytes = 0
+        if timed_out is None:
+            span = int(dc['addr'].max()) + 4 - DC_BASE
+            written = backing.read(DC_BASE, span) != golden.read(DC_BASE, span)
+            stale_bytes = int(written.sum())
+            if stale_bytes:
+                log.error('memory_mismatch', bytes=stale_bytes, first=DC_BASE + int(np.flatnonzero(written)[0]))
+
+    # Hit rate of the cache organisation on the issue order (shared tag array, flush epochs)
+    ports = np.array([p for p, _ in order])
+    addresses = np.array([a for _, a in order], dtype=np.uint32)
+    flush = np.zeros(len(order), dtype=bool)
+    flush[[m for m in flush_marks if m < len(order)]] = True
+    hits = simulate(addresses, flush=flush, **CACHE_DEFAULTS) if len(order) else np.zeros(0, dtype=bool)
+
+    report = {'cycles': cycle, 'flushes': len(flush_marks), 'flush_latency': flush_latency,
+              'timed_out': timed_out, 'stale_bytes': stale_bytes, 'tilelink': slave.stats(), 'ports': {}}
+    for port in PORTS:
+        lat = np.repeat(list(latencies[port]), list(latencies[port].values())) if latencies[port] else np.zeros(0)
+        mine = ports == port
+        report['ports'][port] = {
+            'issued': issued[port],
+            'responses': int(len(lat)),
+            'mismatches': mismatches[port],
+            'unexpected': unexpected[port],
+            'model_hit_rate': float(hits[mine].mean()) if mine.any() else 0.0,
+            'latency_mean': float(lat.mean()) if len(lat) else None,
+            'latency_p95': float(np.percentile(lat, 95)) if len(lat) else None,
+            'latency_max': int(lat.max()) if len(lat) else None,
+            'latency': {str(k): v for k, v in sorted(latencies[port].items())},
+            'per_cycle': len(lat) / cycle if cycle else 0.0,
+        }
+    out = report_dir() / 'cache_contention.json'
+    out.write_text(json.dumps(report, indent=2))
+    slave.write_json('test_cache_contention')
+    for port, stats in report['ports'].items():
+        dut._log.info(f"{port}: {stats['responses']}/{stats['issued']} responses, model hit rate "
+                      f"{stats['model_hit_rate']:.1%}, latency mean {stats['latency_mean']} max {stats['latency_max']}")
+    dut._log.info(f"{cycle} cycles, {len(flush_marks)} flushes, {report['tilelink']['transactions']} TileLink transactions")
+
+    failures = sum(mismatches.values()) + sum(unexpected.values())
+    if failures or timed_out or stale_bytes:
+        print(f"Mismatch details: python mods/eventlog_mods.py {log.path}")
+    assert timed_out is None, f'{timed_out} request unanswered for {timeout} cycles (cache.sv never responded?)'
+    assert sum(unexpected.values()) == 0, f'responses without a request: {unexpected}'
+    assert failures == 0, f'data mismatches: {mismatches}'
+    assert stale_bytes == 0, f'{stale_bytes} bytes of dc stores missing from memory after the final flush'
@@ -1,8 +1,13 @@
+import os
 import cocotb
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge, Timer
 import random
 
+from mods.perf_mods import PerfMonitor
+from mods.scene_mods import get_scene, triangle_areas
+from mods.render_mods import setup_triangles, rasterise_triangle
+
 #
 # Utility functions
 #
@@ -44,6 +49,11 @@ def float_to_17_signed(value: float) -> int:
     val_int = max(min_val, min(val_int, max_val))
     return val_int & ((1 << 17) - 1)  # lower 17 bits
 
+GENPIX_STAGES = {
+    'genpix': {'state': 'rasterizer_state', 'states': {0: 'IDLE', 1: 'PIXEL_OUT', 2: 'COMPLETE'}},
+    'output': {'valid': 'valid_o', 'busy': 'busy_i', 'fragment': 'valid_o'},
+}
+
 #
 # Main test
 #
@@ -84,6 +94,8 @@ async def test_genpix(dut):
     dut.reset_i.value = 0
     await RisingEdge(dut.clock_i)
 
+    perf = PerfMonitor(dut, dut.clock_i, GENPIX_STAGES).start()
+
     # Number of random tests
     NUM_TESTS = 20
 
@@ -159,4 +171,80 @@ async def test_genpix(dut):
                       f"(w0_row={w0_row_val:.2f}, w1_row={w1_row_val:.2f}, w2_row={w2_row_val:.2f}) "
                       f"x-range=({x_min}, {x_max}), y-range=({y_min}, {y_max})")
 
+    perf.stop()
+    perf.write_json('test_genpix')
     dut._log.info("All tests completed successfully!")
+
+
+@cocotb.test()
+async def test_genpix_scene(dut):
+    """
+    Drive genpix with the setup.sv values of real scene triangles
+    (TB_SCENE, default 'corridor'; TB_SCENE_TRIS caps the count) and
+    compare the number of valid_o fragments against the reference
+    renderer, reporting fragments per cycle for the scene's size mix.
+    """
+    clock = Clock(dut.clock_i, 10, units="ns")
+    cocotb.start_soon(clock.start())
+
+    dut.reset_i.value = 1
+    dut.valid_i.value = 0
+    dut.busy_i.value = 0
+    for _ in range(5):
+        await RisingEdge(dut.clock_i)
+    dut.reset_i.value = 0
+    await RisingEdge(dut.clock_i)
+
+    scene = get_scene(os.environ.get('TB_SCENE', 'corridor'))
+    max_tris = int(os.environ.get('TB_SCENE_TRIS', 200))
+    perf = PerfMonitor(dut, dut.clock_i, GENPIX_STAGES).start()
+
+    tris = scene.triangles()
+    tris = tris[triangle_areas(tris) > 0]
+    tris = tris[::max(len(tris) // max_tris, 1)][:max_tris]
+    setup = setup_triangles(tris)
+
+    widths = {
+        'area': 24, 'dl_w0_col': 17, 'dl_w1_col': 17, 'dl_w2_col': 17,
+        'dl_w0_row': 17, 'dl_w1_row': 17, 'dl_w2_row': 17,
+        'w0_row': 25, 'w1_row': 25, 'w2_row': 25,
+        'x_min': 12, 'y_min': 12, 'x_max': 12, 'y_max': 12,
+    }
+
+    mismatches = 0
+    total_cycles = 0
+    total_fragments = 0
+
+    for i in range(len(tris)):
+        for name, width in widths.items():
+            getattr(dut, f'{name}_i').value = int(setup[name][i]) & ((1 << width) - 1)
+
+        *_, inside = rasterise_triangle(setup, i)
+        budget = len(inside) + 16
+
+        dut.valid_i.value = 1
+        await RisingEdge(dut.clock_i)
+        dut.valid_i.value = 0
+
+        fragments = 0
+        cycles = 0
+        while cycles < budget:
+            await RisingEdge(dut.clock_i)
+            cycles += 1
+            if dut.valid_o.value:
+                fragments += 1
+            if dut.busy_o.value == 0:
+                break
+
+        total_cycles += cycles
+        total_fragments += fragments
+        if fragments != int(inside.sum()) or cycles >= budget:
+            mismatches += 1
+            dut._log.warning(f"[TRI {i}] fragments HW={fragments} REF={int(inside.sum())}, "
+                             f"cycles={cycles} (bbox {len(inside)} pixels)")
+
+    perf.stop()
+    perf.write_json('test_genpix_scene')
+    dut._log.info(f"Scene replay: {len(tris)} triangles, {total_fragments} fragments in {total_cycles} cycles "
+                  f"({total_fragments / max(total_cycles, 1):.3f} fragments/cycle)")
+    assert mismatches == 0, f"{mismatches} of {len(tris)} triangles mismatched the reference renderer."
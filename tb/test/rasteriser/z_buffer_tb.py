@@ -1,3 +1,4 @@
+import os
 import cocotb
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
@@ -7,6 +8,9 @@ import numpy as np
 
 # Make sure these imports match your actual file locations/names
 from ref_model.z_buffer_ref import SoftwareZBuffer, MemoryBuffer
+from mods.perf_mods import PerfMonitor
+from mods.eventlog_mods import EventLog
+from mods.coverage_mods import Coverage
 
 # Add flush method to SoftwareZBuffer
 def flush(self):
@@ -15,6 +19,34 @@ def flush(self):
 
 SoftwareZBuffer.flush = flush
 
+# Map depth function to OpenGL enum name
+DEPTH_FUNC_NAMES = {
+    0: "GL_NEVER",
+    1: "GL_LESS",
+    2: "GL_LEQUAL",
+    3: "GL_GREATER",
+    4: "GL_GEQUAL",
+    5: "GL_EQUAL",
+    6: "GL_NOTEQUAL",
+    7: "GL_ALWAYS"
+}
+
+
+def z_buffer_coverage() -> Coverage:
+    """ Depth functions against how the incoming z relates to the stored
+    one, and against what is stored (cleared, zero or a written value). """
+
+    cov = Coverage('z_buffer')
+    cov.point('z_depth_func', 8, list(DEPTH_FUNC_NAMES.values()))
+    cov.point('relation', 3, ['z < stored', 'z == stored', 'z > stored'])
+    cov.point('stored', 3, ['cleared (max)', 'zero', 'written'])
+    cov.point('depth_pass', 2, ['fail', 'pass'])
+    cov.point('after_flush', 2, ['no', 'yes'])
+    cov.cross('func_x_relation', 'z_depth_func', 'relation')
+    cov.cross('func_x_stored', 'z_depth_func', 'stored')
+    return cov
+
+
 @cocotb.test()
 async def test_new_z_buffer(dut):
     """
@@ -69,211 +101,182 @@ async def test_new_z_buffer(dut):
         5: "DONE"
     }
 
-    for i in tqdm(range(num_tests), desc="ZBuffer Tests"):
-        # Generate random test values
-        px = random.randint(0, x_res - 1)
-        py = random.randint(0, y_res - 1)
-        pz = random.randint(0, (1 << z_size) - 1)
-        # Test all depth functions in sequence
-        z_func = random.randint(0, 7)
-
-        # Set DUT inputs
-        dut.pixel_x_i.value = px
-        dut.pixel_y_i.value = py
-        dut.pixel_z_i.value = pz
-        dut.z_depth_func_i.value = z_func
-
-        # Calculate address
-        addr = szbuf.addr_from_xy(px, py)
-
-        # Read old_z from reference model before the update
-        old_z = szbuf.mem_read(addr)
-
-        # Read old_z from hardware buffer before the update
-        old_hw_z = mem_buf.mem_read(addr)
-
-        # Evaluate pass_ref using old_z (the old stored Z)
-        pass_ref = szbuf.depth_func_pass(pz, old_z, z_func)
-
-        # Update the software reference model
-        szbuf.mem_write(addr, pz, z_func)
-
-        # Start the DUT operation
-        dut.start_i.value = 1
-        await RisingEdge(dut.clk_i)
-        dut.start_i.value = 0
-
-        # Keep running until DUT is done
-        while not dut.done_o.value:
-
-            ''' Debugging signals for handshake signals '''
-            # print(f"Read Ready = {dut.data_r_ready.value}, Read Valid = {dut.data_r_valid.value}")
-            # print(f"Write Ready = {dut.data_w_ready.value}, Write Valid = {dut.data_w_valid.value}\n")
-            # print(f"State = {state_dict[int(dut.curr_state.value)]}")
-            # print(f"DUT Depth Pass = {bool(dut.depth_pass_o.value)}")
-            # print(f"DUT depth_comparison_result = {bool(dut.depth_comparison_result.value)}\n")
-            
-            # If DUT wants to read from memory
-            if dut.data_r_ready.value:
-                # print(f"DUT has requested read at address {dut.buf_addr.value}")
-                hw_addr = dut.buf_addr.value
-                # Provide data from MemoryBuffer
-                dut.buf_data_r.value = int(mem_buf.mem_read(hw_addr))
-                # Signal that data_r is valid for this cycle
-                dut.data_r_valid.value = 1
-                await RisingEdge(dut.clk_i)
-                # Deassert after one cycle
-                dut.data_r_valid.value = 0
-            else:
-                await RisingEdge(dut.clk_i)
+    # Cycle accounting for the z_buffer FSM and its memory handshakes
+    perf = PerfMonitor(dut, dut.clk_i, {
+        'z_buffer': {'state': 'curr_state', 'states': state_dict, 'fragment': 'done_o'},
+        'mem_read': {'valid': 'data_r_ready', 'ready': 'data_r_valid'},
+        'mem_write': {'valid': 'data_w_valid', 'ready': 'data_w_ready'},
+    }).start()
 
-            # If DUT wants to write to memory
-            if dut.data_w_valid.value:
-                # print(f"DUT has requested write at address {dut.buf_addr.value}")
-                # Acknowledge write request
-                dut.data_w_ready.value = 1
-                await RisingEdge(dut.clk_i)
-                dut.data_w_ready.value = 0  # Deassert after one cycle
-                # Perform the write
-                hw_addr = dut.buf_addr.value
-                data_to_write = dut.buf_data_w.value
-                mem_buf.mem_write(hw_addr, data_to_write)
-
-        # Compare final hardware memory vs. software reference
-        hw_z = mem_buf.mem_read(addr)
-        ref_z = szbuf.mem_read(addr)
-
-        if hw_z != ref_z:
-            mismatches += 1
-            print("----------------------------------------")
-            # Check if previous test was a flush
-            prev_was_flush = (i > 0) and ((i-1) in flush_tests)
-            print(f"Previous test was {'a flush' if prev_was_flush else 'not a flush'}")
-            
-            # Print current state information
-            print(f"Current state: {state_dict[int(dut.curr_state.value)]}")
-            print(f"Flush done: {dut.flush_done_o.value}")
-            print(f"Start signal: {dut.start_i.value}")
-            print(f"Done signal: {dut.done_o.value}")
-            # Map depth function to OpenGL enum name
-            depth_func_names = {
-                0: "GL_NEVER",
-                1: "GL_LESS",
-                2: "GL_LEQUAL",
-                3: "GL_GREATER",
-                4: "GL_GEQUAL",
-                5: "GL_EQUAL",
-                6: "GL_NOTEQUAL",
-                7: "GL_ALWAYS"
-            }
-            print(f"Test {i + 1} failed at (x, y) = ({px}, {py}) with depth function = {depth_func_names[z_func]}")
-            print("----------------------------------------")
-            print(f"input_z   = {pz}")
-            print(f"old dut_z = {old_hw_z}  (hw model before update)")
-            print(f"old_z     = {old_z}  (ref model before update)")
-            print(f"pass_ref  = {pass_ref}, pass_dut = {bool(dut.depth_pass_o.value)}")
-            print(f"hw_buf_z  = {hw_z}")
-            print(f"ref_buf_z = {ref_z}")
-
-            print("\nMemoryBuffer State:")
-            for yy in range(y_res):
-                row_start = yy * x_res
-                row_values = mem_buf.memory[row_start : row_start + x_res]
-                print(f"Row {yy}: {row_values}")
-
-            print("\nSoftwareZBuffer State:")
-            for yy in range(y_res):
-                row_start = yy * x_res
-                row_values = szbuf.memory[row_start : row_start + x_res]
-                print(f"Row {yy}: {row_values}")
-            print("----------------------------------------")
-
-        ''' RANDOM FLUSH OPERATION '''
-        # Only allow flush if previous operation wasn't a flush
-        if (i > num_tests * 0.1 and 
-            random.random() < flush_probability and
-            not dut.flush_done_o.value):
-            # Start flush operation
-            dut.flush_i.value = 1
+    with EventLog('test_new_z_buffer') as log:
+        cov = z_buffer_coverage()
+        patience = int(os.getenv('TB_COVERAGE_PATIENCE', '0'))   # stop once no new bin is hit for this many tests
+        z_max = (1 << z_size) - 1
+        debug = log.enabled('debug')  # Skip sampling debug-only signals entirely when off
+
+        for i in tqdm(range(num_tests), desc="ZBuffer Tests"):
+            # Generate random test values
+            px = random.randint(0, x_res - 1)
+            py = random.randint(0, y_res - 1)
+            pz = random.randint(0, (1 << z_size) - 1)
+            # Test all depth functions in sequence
+            z_func = random.randint(0, 7)
+
+            # Set DUT inputs
+            dut.pixel_x_i.value = px
+            dut.pixel_y_i.value = py
+            dut.pixel_z_i.value = pz
+            dut.z_depth_func_i.value = z_func
+
+            # Calculate address
+            addr = szbuf.addr_from_xy(px, py)
+
+            # Read old_z from reference model before the update
+            old_z = szbuf.mem_read(addr)
+
+            # Read old_z from hardware buffer before the update
+            old_hw_z = mem_buf.mem_read(addr)
+
+            # Evaluate pass_ref using old_z (the old stored Z)
+            pass_ref = szbuf.depth_func_pass(pz, old_z, z_func)
+            cov.sample(z_depth_func=z_func, relation=(pz > old_z) - (pz < old_z) + 1,
+                       stored=0 if old_z == z_max else 1 if old_z == 0 else 2, depth_pass=int(bool(pass_ref)),
+                       after_flush=int(i > 0 and (i - 1) in flush_tests))
+
+            # Update the software reference model
+            szbuf.mem_write(addr, pz, z_func)
+
+            # Start the DUT operation
             dut.start_i.value = 1
             await RisingEdge(dut.clk_i)
             dut.start_i.value = 0
+
+            # Keep running until DUT is done
+            while not dut.done_o.value:
+
+                ''' Debugging signals for handshake signals '''
+                if debug:
+                    log.debug('handshake', test=i, state=state_dict[int(dut.curr_state.value)],
+                              r_ready=int(dut.data_r_ready.value), r_valid=int(dut.data_r_valid.value),
+                              w_valid=int(dut.data_w_valid.value), w_ready=int(dut.data_w_ready.value),
+                              depth_pass=int(dut.depth_pass_o.value),
+                              depth_comparison_result=int(dut.depth_comparison_result.value))
             
-            # Wait for flush to complete with debug logging
-            flush_cycles = 0
-            
-            while not dut.flush_done_o.value:
-                await RisingEdge(dut.clk_i)
-                flush_cycles += 1
-                
-                # ''' Debugging signals for flush operation '''
-                # print(f"\nFlush cycle {flush_cycles}, state = {state_dict[int(dut.curr_state.value)]}")
-                # print("MemoryBuffer State during flush:")
-                # for yy in range(y_res):
-                #     row_start = yy * x_res
-                #     row_values = mem_buf.memory[row_start : row_start + x_res]
-                #     print(f"Row {yy}: {row_values}")
-                
-                # print(f"dut.buf_addr = {int(dut.buf_addr.value)}")
-                # print(f"flush counter = {int(dut.flush_counter.value)}")
-                # print(f"Write Valid = {dut.data_w_valid.value}, Write Ready = {dut.data_w_ready.value}")
-                
-                # print(f"Current address: {int(dut.buf_addr.value)}")
-                # print(f"data_w_valid: {dut.data_w_valid.value}")
-                # print(f"data_w_ready: {dut.data_w_ready.value}")
-                # print(f"flush_done_o: {dut.flush_done_o.value}")
-                # print(f"X_RES*Y_RES = {dut.X_RES.value * dut.Y_RES.value}")
-                
+                # If DUT wants to read from memory
+                if dut.data_r_ready.value:
+                    hw_addr = dut.buf_addr.value
+                    # Provide data from MemoryBuffer
+                    dut.buf_data_r.value = int(mem_buf.mem_read(hw_addr))
+                    # Signal that data_r is valid for this cycle
+                    dut.data_r_valid.value = 1
+                    await RisingEdge(dut.clk_i)
+                    # Deassert after one cycle
+                    dut.data_r_valid.value = 0
+                else:
+                    await RisingEdge(dut.clk_i)
+
+                # If DUT wants to write to memory
                 if dut.data_w_valid.value:
-                    # print(f"DUT has requested write at address {int(dut.buf_addr.value)}")
                     # Acknowledge write request
                     dut.data_w_ready.value = 1
                     await RisingEdge(dut.clk_i)
-                    # print(f"data_w_ready: {dut.data_w_ready.value}")
                     dut.data_w_ready.value = 0  # Deassert after one cycle
                     # Perform the write
                     hw_addr = dut.buf_addr.value
                     data_to_write = dut.buf_data_w.value
                     mem_buf.mem_write(hw_addr, data_to_write)
+
+            # Compare final hardware memory vs. software reference
+            hw_z = mem_buf.mem_read(addr)
+            ref_z = szbuf.mem_read(addr)
+
+            if hw_z != ref_z:
+                mismatches += 1
+                # Check if previous test was a flush
+                prev_was_flush = (i > 0) and ((i-1) in flush_tests)
+                log.error('depth_mismatch', test=i + 1, x=px, y=py, z_func=DEPTH_FUNC_NAMES[z_func],
+                          prev_was_flush=prev_was_flush,
+                          state=state_dict[int(dut.curr_state.value)],
+                          flush_done=int(dut.flush_done_o.value), start=int(dut.start_i.value),
+                          done=int(dut.done_o.value),
+                          input_z=pz, old_hw_z=old_hw_z, old_ref_z=old_z,
+                          pass_ref=pass_ref, pass_dut=bool(dut.depth_pass_o.value),
+                          hw_buf_z=hw_z, ref_buf_z=ref_z,
+                          hw_buffer=mem_buf.memory.reshape(y_res, x_res).copy(),
+                          ref_buffer=np.reshape(szbuf.memory, (y_res, x_res)).copy())
+
+            ''' RANDOM FLUSH OPERATION '''
+            # Only allow flush if previous operation wasn't a flush
+            if (i > num_tests * 0.1 and 
+                random.random() < flush_probability and
+                not dut.flush_done_o.value):
+                # Start flush operation
+                dut.flush_i.value = 1
+                dut.start_i.value = 1
+                await RisingEdge(dut.clk_i)
+                dut.start_i.value = 0
+            
+                # Wait for flush to complete with debug logging
+                flush_cycles = 0
+            
+                while not dut.flush_done_o.value:
+                    await RisingEdge(dut.clk_i)
+                    flush_cycles += 1
                 
-                # Timeout check
-                if flush_cycles > 20:  # Adjust timeout as needed
-                    print("\nFlush operation timed out!")
-                    print("Final MemoryBuffer State:")
-                    for yy in range(y_res):
-                        row_start = yy * x_res
-                        row_values = mem_buf.memory[row_start : row_start + x_res]
-                        print(f"Row {yy}: {row_values}")
-                    assert False, f"Flush operation timed out after {flush_cycles} cycles (total flushes so far: {times_of_flushes})"
+                    ''' Debugging signals for flush operation '''
+                    if debug:
+                        log.debug('flush_cycle', cycle=flush_cycles, state=state_dict[int(dut.curr_state.value)],
+                                  buf_addr=int(dut.buf_addr.value), flush_counter=int(dut.flush_counter.value),
+                                  w_valid=int(dut.data_w_valid.value), w_ready=int(dut.data_w_ready.value),
+                                  buffer=mem_buf.memory.reshape(y_res, x_res).copy())
+                
+                    if dut.data_w_valid.value:
+                        # Acknowledge write request
+                        dut.data_w_ready.value = 1
+                        await RisingEdge(dut.clk_i)
+                        dut.data_w_ready.value = 0  # Deassert after one cycle
+                        # Perform the write
+                        hw_addr = dut.buf_addr.value
+                        data_to_write = dut.buf_data_w.value
+                        mem_buf.mem_write(hw_addr, data_to_write)
+                
+                    # Timeout check
+                    if flush_cycles > 20:  # Adjust timeout as needed
+                        log.error('flush_timeout', cycles=flush_cycles, buffer=mem_buf.memory.reshape(y_res, x_res).copy())
+                        assert False, f"Flush operation timed out after {flush_cycles} cycles (total flushes so far: {times_of_flushes})"
             
-            # Verify flush completed correctly
-            flush_errors = 0
-            for addr in range(x_res * y_res):
-                hw_z = mem_buf.mem_read(addr)
-                if hw_z != (1 << z_size) - 1:
-                    print(f"Flush verification failed at addr {addr}: got {hw_z} expected {(1 << z_size) - 1}")
-                    flush_errors += 1
-            assert flush_errors == 0, f"Flush failed at {flush_errors} addresses"
+                # Verify flush completed correctly
+                bad_addrs = np.flatnonzero(mem_buf.memory != (1 << z_size) - 1)
+                flush_errors = len(bad_addrs)
+                if flush_errors:
+                    log.error('flush_verify', addrs=bad_addrs, values=mem_buf.memory[bad_addrs],
+                              expected=(1 << z_size) - 1)
+                assert flush_errors == 0, f"Flush failed at {flush_errors} addresses"
             
-            # Reset flush signal and wait for DUT to return to IDLE
-            dut.flush_i.value = 0
-            while dut.curr_state.value != 0:  # Wait until back in IDLE state
-                await RisingEdge(dut.clk_i) #! This is a blocking wait - crucial for correct operation, expect the DRAM to act the same
+                # Reset flush signal and wait for DUT to return to IDLE
+                dut.flush_i.value = 0
+                while dut.curr_state.value != 0:  # Wait until back in IDLE state
+                    await RisingEdge(dut.clk_i) #! This is a blocking wait - crucial for correct operation, expect the DRAM to act the same
             
-            # Also flush the reference model
-            szbuf.flush()
-            times_of_flushes += 1
-            flush_tests.append(i)  # Record this test index as a flush
+                # Also flush the reference model
+                szbuf.flush()
+                times_of_flushes += 1
+                flush_tests.append(i)  # Record this test index as a flush
             
-            # Debug print flush completion
-            # print(f"\nFlush completed at test {i}, total flushes: {times_of_flushes}")
-            # print("MemoryBuffer after flush:")
-            # for yy in range(y_res):
-            #     row_start = yy * x_res
-            #     row_values = mem_buf.memory[row_start : row_start + x_res]
-            #     print(f"Row {yy}: {row_values}")
+                log.debug('flush_done', test=i, total_flushes=times_of_flushes)
+
+            if patience and cov.saturated(patience):
+                dut._log.info(f'Coverage saturated at {cov.coverage:.1%} after {i + 1} tests')
+                break
+
+
+        perf.stop()
+        perf.write_json('test_new_z_buffer')
 
+    dut._log.info(f"Functional coverage {cov.coverage:.1%}, written to {cov.write()}")
 
     # Final test result
     print(f"Test completed with {times_of_flushes} flush operations.")
+    if mismatches:
+        print(f"Mismatch details: python mods/eventlog_mods.py {log.path}")
     assert mismatches == 0, f"Test failed with {mismatches} mismatches out of {num_tests} tests."